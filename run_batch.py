@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+"""
+SpotLight Batch Launcher
+Run detection over image folders, globs and video files
+"""
+
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from batch import main
+
+if __name__ == '__main__':
+    print("🔦 SpotLight Batch - Offline Object Detection")
+    print("=" * 45)
+    sys.exit(main())
@@ -13,6 +13,6 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 from realtime_all_items import main
 
 if __name__ == '__main__':
-    print("🔦 SpotLight CLI - Real-time Object Detection")
-    print("=" * 45)
-    main()
\ No newline at end of file
+    print("🔦 SpotLight CLI - Real-time Object Detection", file=sys.stderr)
+    print("=" * 45, file=sys.stderr)
+    sys.exit(main())
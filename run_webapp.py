@@ -4,30 +4,62 @@ SpotLight Web Application Launcher
 Run this script to start the web interface
 """
 
+import argparse
 import sys
 import os
 
 # Add src to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-from webapp import app, init_camera, init_model
+from webapp import app, init_camera, init_detection_log, init_model_in_background, shutdown
+from sources import parse_source_specs
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='SpotLight web application')
+    parser.add_argument('--source', action='append',
+                        help='camera index, video file, image directory, URL or synthetic[:WxH][@fps]; '
+                             'repeat or comma-separate for several (default: SPOTLIGHT_SOURCES or 0)')
+    parser.add_argument('--fast', action='store_true', help='replay files as fast as possible instead of in real time')
+    parser.add_argument('--read-ahead', type=int, help='frames to decode ahead for file sources')
+    parser.add_argument('--server', choices=('flask', 'asgi'), default=os.environ.get('SPOTLIGHT_SERVER', 'flask'),
+                        help='flask: one thread per connection; asgi: streams on an event loop '
+                             '(needs starlette, a2wsgi and uvicorn)')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('SPOTLIGHT_PORT', 8080)))
+    args = parser.parse_args()
+    
+    source_specs = parse_source_specs(','.join(args.source)) if args.source else None
+    source_options = {}
+    if args.fast:
+        source_options['realtime'] = False
+    if args.read_ahead is not None:
+        source_options['read_ahead'] = args.read_ahead
+    
     print("🔦 SpotLight - Real-time Object Detection")
     print("=" * 40)
-    print("Initializing camera and model...")
+    print("Initializing camera...")
     
     try:
-        init_camera()
-        init_model()
-        print("✅ Initialization complete!")
-        print("\n📱 Starting web server...")
-        print("🌐 Open http://localhost:8080 in your browser")
+        init_detection_log()
+        init_camera(source_specs, source_options)
+        # The model loads and warms up while the server is already answering;
+        # /health returns 503 until it is ready
+        init_model_in_background()
+        print(f"\n📱 Starting web server ({args.server})...")
+        print(f"🌐 Open http://localhost:{args.port} in your browser")
         print("\nPress Ctrl+C to stop the server")
         
-        app.run(debug=False, threaded=True, port=8080, host='0.0.0.0')
+        if args.server == 'asgi':
+            import uvicorn
+            from asgi import create_app
+            # Video streams never end on their own, so don't wait long for them on Ctrl+C
+            uvicorn.run(create_app(), host='0.0.0.0', port=args.port, log_level='warning',
+                        timeout_graceful_shutdown=2)
+        else:
+            app.run(debug=False, threaded=True, port=args.port, host='0.0.0.0')
     except KeyboardInterrupt:
         print("\n\n👋 Shutting down SpotLight...")
     except Exception as e:
         print(f"\n❌ Error: {e}")
-        print("Please check that your camera is connected and you have the required dependencies installed.")
\ No newline at end of file
+        print("Please check that your camera is connected and you have the required dependencies installed.")
+    finally:
+        shutdown()
\ No newline at end of file
@@ -0,0 +1,85 @@
+"""
+Compare inference backends on the same frame set.
+
+Runs every requested backend (PyTorch, ONNX Runtime, OpenVINO) over the
+same frames and reports single-frame latency and batched throughput.
+Exported models are cached, so only the first run pays for the export.
+
+Usage:
+    python scripts/benchmark_backends.py --model yolov8m.pt --backends torch onnx openvino
+    python scripts/benchmark_backends.py --frames /path/to/video.mp4 --threads 4 --batch 4
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from backends import BACKENDS, create_backend
+from detector import DetectorConfig
+from classes import class_table
+from benchmark_frames import load_frames
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def bench_backend(backend, config, frames, batch_size):
+    # Warm-up so lazy initialization isn't timed
+    backend.predict(frames[:1], config)
+
+    latencies = []
+    for frame in frames:
+        start = time.perf_counter()
+        backend.predict([frame], config)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    batches = [frames[i:i + batch_size] for i in range(0, len(frames), batch_size)]
+    start = time.perf_counter()
+    for batch in batches:
+        backend.predict(batch, config)
+    throughput = len(frames) / (time.perf_counter() - start)
+
+    return {
+        'mean_ms': float(np.mean(latencies)),
+        'p50_ms': percentile(latencies, 50),
+        'p95_ms': percentile(latencies, 95),
+        'throughput_fps': throughput,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default='yolov8m.pt')
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument('--frames', default=None, help='video file or image directory (default: random frames)')
+    parser.add_argument('--count', type=int, default=20, help='frames to run')
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--batch', type=int, default=4, help='batch size for the throughput run')
+    parser.add_argument('--threads', type=int, default=None, help='intra-op threads per backend')
+    parser.add_argument('--int8', action='store_true', help='use INT8-quantized exports')
+    args = parser.parse_args()
+
+    frames = load_frames(args.frames, args.count, 640, 480)
+    config = DetectorConfig(class_table, imgsz=args.imgsz)
+
+    print(f"{len(frames)} frames, imgsz={args.imgsz}, batch={args.batch}, threads={args.threads or 'default'}\n")
+    print(f"{'backend':>10} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'batch fps':>10}")
+    for name in args.backends:
+        try:
+            backend = create_backend(name, args.model, args.imgsz, args.threads, args.int8)
+        except ImportError as e:
+            print(f"{name:>10}  skipped ({e})")
+            continue
+        result = bench_backend(backend, config, frames, args.batch)
+        print(f"{name:>10} {result['mean_ms']:9.1f} {result['p50_ms']:9.1f} "
+              f"{result['p95_ms']:9.1f} {result['throughput_fps']:10.1f}")
+
+
+if __name__ == '__main__':
+    main()
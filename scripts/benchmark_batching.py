@@ -0,0 +1,72 @@
+"""
+Benchmark batched vs. serial inference across several sources.
+
+Simulates N sources by feeding the same frames to the model either one
+call per source (serial) or one model([...]) call per tick (batched), the
+way the web app's multi-source pipeline does.
+
+Usage:
+    python scripts/benchmark_batching.py --sources 4 --ticks 20
+    python scripts/benchmark_batching.py --frames /path/to/video.mp4 --model yolov8n.pt
+"""
+
+import argparse
+import time
+
+import torch
+from ultralytics import YOLO
+
+from benchmark_frames import load_frames
+
+
+def run_serial(model, ticks):
+    for tick in ticks:
+        for frame in tick:
+            with torch.no_grad():
+                model(frame, verbose=False)
+
+
+def run_batched(model, ticks):
+    for tick in ticks:
+        with torch.no_grad():
+            model(tick, verbose=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default='yolov8m.pt')
+    parser.add_argument('--sources', type=int, default=4, help='number of simulated sources')
+    parser.add_argument('--ticks', type=int, default=10, help='pipeline ticks to time')
+    parser.add_argument('--frames', default=None, help='video file or image directory (default: random frames)')
+    parser.add_argument('--width', type=int, default=640)
+    parser.add_argument('--height', type=int, default=480)
+    args = parser.parse_args()
+
+    print(f"Loading {args.model}...")
+    model = YOLO(args.model)
+
+    frames = load_frames(args.frames, args.sources * args.ticks, args.width, args.height)
+    if len(frames) < args.sources:
+        print("Not enough frames to fill one tick")
+        return
+    ticks = [frames[i:i + args.sources] for i in range(0, len(frames) - args.sources + 1, args.sources)]
+
+    # Warm up both code paths so lazy initialization isn't timed
+    run_serial(model, ticks[:1])
+    run_batched(model, ticks[:1])
+
+    results = {}
+    for name, runner in (('serial', run_serial), ('batched', run_batched)):
+        start = time.perf_counter()
+        runner(model, ticks)
+        elapsed = time.perf_counter() - start
+        total = len(ticks) * args.sources
+        results[name] = total / elapsed
+        print(f"{name:>8}: {total} frames in {elapsed:.2f}s "
+              f"-> {results[name]:.1f} frames/s, {1000 * elapsed / len(ticks):.1f} ms/tick")
+
+    print(f"\nBatched speedup with {args.sources} sources: {results['batched'] / results['serial']:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
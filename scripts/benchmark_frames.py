@@ -0,0 +1,32 @@
+"""
+Test frames for the benchmark scripts.
+
+Only needs numpy and OpenCV, so benchmarks of the ONNX Runtime and
+OpenVINO backends don't pull in torch just to read a video.
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from sources import open_source
+
+
+def load_frames(spec, count, width, height):
+    """Up to count frames from a source spec, or random noise of width x height if spec is None"""
+    if spec is None:
+        rng = np.random.default_rng(0)
+        return [rng.integers(0, 255, (height, width, 3), dtype=np.uint8) for _ in range(count)]
+
+    source = open_source(spec, realtime=False)
+    frames = []
+    while len(frames) < count:
+        success, frame = source.read()
+        if not success:
+            break
+        frames.append(frame)
+    source.release()
+    return frames
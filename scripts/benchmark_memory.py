@@ -0,0 +1,145 @@
+"""
+Memory and allocation cost of the capture -> draw -> encode -> serve path.
+
+Replays frames through what the pipeline does for every frame and every
+viewer, once the way it used to (a fresh array per read, frame.copy() for
+the overlay, imencode().tobytes() and one multipart concatenation per
+client) and once with pooled frame buffers, reused encode buffers and a
+single multipart part shared by all clients. No model is involved. Each
+mode runs in a fresh process and reports throughput, steady-state RSS,
+RSS growth, minor page faults per frame (touching newly mapped memory)
+and the peak of short-lived allocations per frame (tracemalloc).
+
+Usage:
+    python scripts/benchmark_memory.py --width 1920 --height 1080 --clients 8
+    python scripts/benchmark_memory.py --frames recording.mp4 --count 600 --resize 640
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from buffers import FramePool
+from encoding import EncodeTier, JpegEncoder, mjpeg_part
+from overlay import draw_detections
+from sources import open_source
+
+DETECTIONS = [
+    {'name': name, 'confidence': 0.8, 'bbox': [40 + 90 * i, 60, 120 + 90 * i, 200], 'color': '#2196F3'}
+    for i, name in enumerate(('person', 'cup', 'laptop', 'chair', 'bottle'))
+]
+
+
+def rss_mb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+
+
+def minor_faults():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_minflt
+
+
+def legacy_step(source, tier, clients):
+    """The per-frame path before buffer reuse"""
+    success, frame = source.read()
+    annotated = frame.copy()
+    draw_detections(annotated, DETECTIONS)
+    if tier.width:
+        height = round(annotated.shape[0] * tier.width / annotated.shape[1])
+        annotated = cv2.resize(annotated, (tier.width, height), interpolation=cv2.INTER_AREA)
+    ret, buffer = cv2.imencode('.jpg', annotated, [cv2.IMWRITE_JPEG_QUALITY, tier.quality])
+    jpeg = buffer.tobytes()
+    return sum(len(b'--frame\r\n' b'Content-Type: image/jpeg\r\n\r\n' + jpeg + b'\r\n') for _ in range(clients))
+
+
+def pooled_step(source, tier, clients, encoder, draw_pool):
+    """The per-frame path with pooled buffers, handed back when done, and shared multipart parts"""
+    success, frame = source.read()
+    annotated = draw_pool.copy(frame)
+    draw_detections(annotated, DETECTIONS)
+    resized = encoder.resize(annotated, tier)
+    part = mjpeg_part(encoder.encode(resized, tier))
+    if resized is not annotated:
+        encoder.recycle(resized)
+    draw_pool.release(annotated)
+    source.recycle(frame)
+    return sum(len(part) for _ in range(clients))
+
+
+def run_mode(mode, spec, count, warmup, tier_args, clients):
+    source = open_source(spec, realtime=False)
+    tier = EncodeTier(*tier_args)
+    if mode == 'before':
+        source.pool = FramePool(0) if source.pool is not None else None
+        step = lambda: legacy_step(source, tier, clients)
+    else:
+        encoder, draw_pool = JpegEncoder(use_turbo=False), FramePool(4)
+        step = lambda: pooled_step(source, tier, clients, encoder, draw_pool)
+
+    for _ in range(warmup):
+        step()
+    rss_start, faults_start, samples = rss_mb(), minor_faults(), []
+    start = time.perf_counter()
+    for i in range(count):
+        step()
+        if i % 10 == 0:
+            samples.append(rss_mb())
+    elapsed = time.perf_counter() - start
+    faults = minor_faults() - faults_start
+
+    # Separate pass, tracemalloc slows everything down
+    tracemalloc.start()
+    peaks = []
+    for _ in range(min(count, 50)):
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        step()
+        peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+    return {
+        'fps': count / elapsed,
+        'rss_mb': float(np.median(samples)),
+        'rss_growth_mb': rss_mb() - rss_start,
+        'faults_per_frame': faults / count,
+        'peak_kb_per_frame': float(np.median(peaks)) / 1024,
+        'pool': source.pool.get_stats() if source.pool is not None else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--frames', default=None, help='video file or image directory (default: synthetic frames)')
+    parser.add_argument('--width', type=int, default=1280, help='synthetic frame width')
+    parser.add_argument('--height', type=int, default=720, help='synthetic frame height')
+    parser.add_argument('--count', type=int, default=300, help='frames to time per mode')
+    parser.add_argument('--warmup', type=int, default=30)
+    parser.add_argument('--clients', type=int, default=4, help='viewers of the same stream')
+    parser.add_argument('--quality', type=int, default=None, help='JPEG quality (default 95)')
+    parser.add_argument('--resize', type=int, default=None, help='stream width in pixels (default: full size)')
+    args = parser.parse_args()
+
+    spec = args.frames or f"synthetic:{args.width}x{args.height}"
+    print(f"{spec}, {args.count} frames, {args.clients} clients, tier {EncodeTier(args.quality, args.resize)}, "
+          f"encoder {JpegEncoder(use_turbo=False).name}\n")
+    print(f"{'mode':>7} {'fps':>8} {'RSS MB':>8} {'growth MB':>10} {'faults/frame':>13} {'peak KB/frame':>14}")
+    context = multiprocessing.get_context('spawn')
+    for mode in ('before', 'after'):
+        with context.Pool(1) as pool:
+            result = pool.apply(run_mode, (mode, spec, args.count, args.warmup,
+                                           (args.quality, args.resize), args.clients))
+        print(f"{mode:>7} {result['fps']:8.1f} {result['rss_mb']:8.1f} {result['rss_growth_mb']:10.1f} "
+              f"{result['faults_per_frame']:13.1f} {result['peak_kb_per_frame']:14.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,206 @@
+"""
+Reproducible benchmark of the per-frame detection hot path.
+
+Replays a recorded video, an image directory or synthetic footage (the
+`synthetic` source's moving shapes) through the same calls the web app and the CLI make for every frame:
+backend predict (preprocess / inference / postprocess), building the
+detection records, drawing the overlay and JPEG encoding. Drawing and
+post-processing only do real work when the model finds something, so the
+number of detections is reported too; use real footage for those. Reports
+p50/p95/p99 latency and throughput per stage for each model, and writes
+everything to a JSON file that can be diffed between commits.
+
+Usage:
+    python scripts/benchmark_pipeline.py --models n s m --frames recording.mp4
+    python scripts/benchmark_pipeline.py --models n --count 100 -o before.json
+    python scripts/benchmark_pipeline.py --models n --count 100 -o after.json --compare before.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from backends import BACKENDS, create_backend
+from classes import class_table
+from detector import DetectorConfig
+from encoding import EncodeTier, JpegEncoder
+from overlay import draw_detections
+from postprocess import build_detections
+from benchmark_frames import load_frames
+
+STAGES = ('preprocess', 'inference', 'postprocess', 'drawing', 'encode', 'total')
+
+
+def model_weights(name):
+    """'n', 's', 'm' are shorthand for the YOLOv8 checkpoints; anything else is a path"""
+    return f"yolov8{name}.pt" if name in ('n', 's', 'm', 'l', 'x') else name
+
+
+def summarize(samples):
+    ms = np.asarray(samples) * 1000
+    return {
+        'p50_ms': round(float(np.percentile(ms, 50)), 3),
+        'p95_ms': round(float(np.percentile(ms, 95)), 3),
+        'p99_ms': round(float(np.percentile(ms, 99)), 3),
+        'mean_ms': round(float(ms.mean()), 3),
+        'throughput_fps': round(len(ms) / (ms.sum() / 1000), 1) if ms.sum() else None,
+    }
+
+
+def bench_model(backend, config, frames, encoder, tier, warmup):
+    for frame in frames[:warmup]:
+        backend.predict([frame], config)
+
+    samples = {stage: [] for stage in STAGES}
+    detections_seen = 0
+    for frame in frames:
+        frame_start = time.perf_counter()
+        (xyxy, conf, cls), = backend.predict([frame], config)
+        timings = backend.last_timings
+
+        start = time.perf_counter()
+        detections = build_detections(class_table, xyxy, conf, cls, config.conf, config.category)
+        build_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        annotated = frame.copy()
+        draw_detections(annotated, detections)
+        draw_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        encoder.encode(encoder.resize(annotated, tier), tier)
+        encode_time = time.perf_counter() - start
+
+        samples['preprocess'].append(timings['preprocess'])
+        samples['inference'].append(timings['inference'])
+        samples['postprocess'].append(timings['postprocess'] + build_time)
+        samples['drawing'].append(draw_time)
+        samples['encode'].append(encode_time)
+        samples['total'].append(time.perf_counter() - frame_start)
+        detections_seen += len(detections)
+
+    return {
+        'stages': {stage: summarize(values) for stage, values in samples.items()},
+        'detections': detections_seen,
+    }
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, cwd=os.path.dirname(__file__)).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'opencv': cv2.__version__,
+        'numpy': np.__version__,
+    }
+
+
+def compare(result, baseline, threshold):
+    """Print p50/p95 changes against a previous run; returns the number of regressions"""
+    regressions = 0
+    print(f"\nCompared with {baseline['environment'].get('commit') or 'baseline'}:")
+    changed = sorted(key for key, value in result['settings'].items() if baseline['settings'].get(key) != value)
+    if changed:
+        print(f"  (settings differ: {', '.join(changed)}; numbers may not be comparable)")
+    for model, data in result['models'].items():
+        old = baseline['models'].get(model)
+        if old is None:
+            continue
+        for stage, values in data['stages'].items():
+            for key in ('p50_ms', 'p95_ms'):
+                before, after = old['stages'].get(stage, {}).get(key), values[key]
+                if not before:
+                    continue
+                change = (after - before) / before
+                flag = ''
+                if change > threshold:
+                    flag = '  REGRESSION'
+                    regressions += 1
+                print(f"  {model:>12} {stage:>11} {key:>6}: {before:8.2f} -> {after:8.2f} ms ({change:+.0%}){flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--models', nargs='+', default=['n', 's', 'm'],
+                        help="model sizes (n, s, m, ...) or weight paths")
+    parser.add_argument('--backend', default='torch', choices=BACKENDS)
+    parser.add_argument('--frames', default=None, help='video file, image directory or source spec (default: synthetic)')
+    parser.add_argument('--count', type=int, default=50, help='frames to time per model')
+    parser.add_argument('--warmup', type=int, default=3, help='untimed frames per model')
+    parser.add_argument('--width', type=int, default=640, help='synthetic frame width')
+    parser.add_argument('--height', type=int, default=480, help='synthetic frame height')
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--conf', type=float, default=None, help='confidence threshold (default: the app default)')
+    parser.add_argument('--threads', type=int, default=None)
+    parser.add_argument('--quality', type=int, default=None, help='JPEG quality (default 95)')
+    parser.add_argument('-o', '--output', default='benchmark.json')
+    parser.add_argument('--compare', metavar='JSON', help='earlier result to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10, help='relative slowdown reported as a regression')
+    args = parser.parse_args()
+
+    # Synthetic frames come from a fixed seed, so every run sees the same pixels
+    frames = load_frames(args.frames or f"synthetic:{args.width}x{args.height}", args.count, args.width, args.height)
+    if not frames:
+        print("No frames to benchmark")
+        return 1
+    config = DetectorConfig(class_table, imgsz=args.imgsz,
+                            **({'conf': args.conf} if args.conf is not None else {}))
+    encoder = JpegEncoder()
+    tier = EncodeTier(args.quality)
+
+    result = {
+        'environment': environment(),
+        'settings': {
+            'backend': args.backend, 'frames': args.frames or 'synthetic', 'count': len(frames),
+            'frame_size': list(frames[0].shape[1::-1]), 'imgsz': args.imgsz, 'conf': config.conf,
+            'threads': args.threads, 'encoder': encoder.name, 'tier': str(tier),
+        },
+        'models': {},
+    }
+
+    print(f"{len(frames)} frames {frames[0].shape[1]}x{frames[0].shape[0]}, backend={args.backend}, "
+          f"encoder={encoder.name}\n")
+    print(f"{'model':>12} {'stage':>11} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'fps':>8}")
+    for name in args.models:
+        weights = model_weights(name)
+        backend = create_backend(args.backend, weights, args.imgsz, args.threads)
+        data = bench_model(backend, config, frames, encoder, tier, args.warmup)
+        result['models'][name] = data
+        for stage, values in data['stages'].items():
+            print(f"{name:>12} {stage:>11} {values['p50_ms']:9.2f} {values['p95_ms']:9.2f} "
+                  f"{values['p99_ms']:9.2f} {values['throughput_fps'] or 0:8.1f}")
+        print(f"{name:>12} {data['detections']} detections")
+        if not data['detections']:
+            print(f"{'':>12} (nothing detected: drawing and postprocess timed empty work, try --frames or --conf)")
+
+    with open(args.output, 'w') as f:
+        json.dump(result, f, indent=2, sort_keys=True)
+        f.write('\n')
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(result, baseline, args.threshold):
+            return 2
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+Micro-benchmark for per-frame post-processing of YOLO results.
+
+Compares the original per-box Python loop (tensor indexing per box plus a
+linear category scan) against the vectorized path in src/postprocess.py on
+synthetic results with many boxes. No model or camera needed.
+
+Usage:
+    python scripts/benchmark_postprocess.py --boxes 150 --iterations 2000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+from ultralytics.engine.results import Boxes
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from classes import categories, category_colors, class_table, items_to_detect
+from postprocess import build_detections, boxes_to_arrays
+
+def get_category(class_id):
+    """The original linear category scan"""
+    for cat, items in categories.items():
+        if class_id in items:
+            return cat
+    return 'Other'
+
+
+def legacy_postprocess(boxes, filter_category=None):
+    """The per-box loop webapp.generate_frames used before vectorization"""
+    detected_items = []
+    for box in boxes:
+        cls_id = int(box.cls[0])
+        conf = float(box.conf[0])
+        if cls_id in items_to_detect and conf > 0.4:
+            category = get_category(cls_id)
+            if filter_category and category != filter_category:
+                continue
+            x1, y1, x2, y2 = map(int, box.xyxy[0])
+            detected_items.append({
+                'name': items_to_detect[cls_id],
+                'category': category,
+                'confidence': round(conf, 2),
+                'bbox': [x1, y1, x2, y2],
+                'color': category_colors.get(category, '#FFFFFF')
+            })
+    return detected_items
+
+
+def vectorized_postprocess(table, boxes, filter_category=None):
+    xyxy, conf, cls = boxes_to_arrays(boxes)
+    return build_detections(table, xyxy, conf, cls, 0.4, filter_category)
+
+
+def make_boxes(count, seed=0):
+    rng = np.random.default_rng(seed)
+    xy = rng.uniform(0, 600, (count, 2))
+    wh = rng.uniform(10, 200, (count, 2))
+    data = np.column_stack([
+        xy, xy + wh,
+        rng.uniform(0.05, 1.0, count),
+        rng.integers(0, 80, count),
+    ]).astype(np.float32)
+    return Boxes(torch.from_numpy(data), (1080, 1920))
+
+
+def time_it(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--boxes', type=int, default=150, help='boxes per frame')
+    parser.add_argument('--iterations', type=int, default=1000)
+    parser.add_argument('--filter', default=None, help='category filter to apply')
+    args = parser.parse_args()
+
+    table = class_table
+    boxes = make_boxes(args.boxes)
+
+    legacy = legacy_postprocess(boxes, args.filter)
+    vectorized = vectorized_postprocess(table, boxes, args.filter)
+    assert legacy == vectorized, "vectorized results differ from the legacy loop"
+    print(f"{args.boxes} boxes/frame -> {len(vectorized)} detections kept")
+
+    legacy_us = time_it(lambda: legacy_postprocess(boxes, args.filter), args.iterations)
+    vectorized_us = time_it(lambda: vectorized_postprocess(table, boxes, args.filter), args.iterations)
+
+    print(f"    legacy loop: {legacy_us:9.1f} us/frame")
+    print(f"     vectorized: {vectorized_us:9.1f} us/frame")
+    print(f"        speedup: {legacy_us / vectorized_us:9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Tiled / ROI inference versus downscaling the full frame.
+
+Runs the same high-resolution frames through the plain backend (the whole
+frame letterboxed down to --imgsz) and through TiledBackend with and
+without the extra full-frame pass, plus ROI-only runs when --roi is given.
+Reports per-frame latency, throughput, model inputs per frame and how many
+detections are small (under --small pixels on the longer side), which is
+where tiling should help.
+
+Usage:
+    python scripts/benchmark_tiling.py --frames hallway_4k.mp4 --model yolov8m.pt
+    python scripts/benchmark_tiling.py --width 3840 --height 2160 --count 10 --roi 0,0.3,1,1
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from backends import BACKENDS, create_backend
+from classes import class_table
+from detector import DetectorConfig
+from tiling import TiledBackend, parse_rois
+from benchmark_frames import load_frames
+
+
+def bench(backend, config, frames, small):
+    # Warm-up so lazy initialization isn't timed
+    backend.predict(frames[:1], config)
+
+    latencies, detections, small_detections = [], 0, 0
+    for frame in frames:
+        start = time.perf_counter()
+        (xyxy, conf, cls), = backend.predict([frame], config)
+        latencies.append((time.perf_counter() - start) * 1000)
+        sizes = np.maximum(xyxy[:, 2] - xyxy[:, 0], xyxy[:, 3] - xyxy[:, 1])
+        detections += len(conf)
+        small_detections += int((sizes < small).sum())
+    return {
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'fps': 1000 * len(latencies) / sum(latencies),
+        'detections': detections / len(frames),
+        'small': small_detections / len(frames),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default='yolov8m.pt')
+    parser.add_argument('--backend', default='torch', choices=BACKENDS)
+    parser.add_argument('--frames', default=None, help='video file or image directory (default: synthetic frames)')
+    parser.add_argument('--count', type=int, default=20)
+    parser.add_argument('--width', type=int, default=1920, help='synthetic frame width')
+    parser.add_argument('--height', type=int, default=1080, help='synthetic frame height')
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--tile', type=int, default=None, help='tile size (default: --imgsz)')
+    parser.add_argument('--overlap', type=float, default=0.2)
+    parser.add_argument('--roi', help="also time ROI-only runs, 'x1,y1,x2,y2;...'")
+    parser.add_argument('--threads', type=int, default=None)
+    parser.add_argument('--conf', type=float, default=0.25)
+    parser.add_argument('--small', type=int, default=48, help='pixel size counted as a small object')
+    args = parser.parse_args()
+
+    frames = load_frames(args.frames, args.count, args.width, args.height)
+    if not frames:
+        print("No frames to benchmark")
+        return 1
+    config = DetectorConfig(class_table, conf=args.conf, imgsz=args.imgsz)
+    backend = create_backend(args.backend, args.model, args.imgsz, args.threads)
+    tile = args.tile or args.imgsz
+
+    modes = [
+        ('downscale', backend),
+        ('tiles', TiledBackend(backend, tile, args.overlap, full_frame=False)),
+        ('tiles+full', TiledBackend(backend, tile, args.overlap, full_frame=True)),
+    ]
+    if args.roi:
+        rois = parse_rois(args.roi)
+        modes += [
+            ('roi', TiledBackend(backend, None, rois=rois)),
+            ('roi tiles+full', TiledBackend(backend, tile, args.overlap, rois=rois)),
+        ]
+
+    height, width = frames[0].shape[:2]
+    print(f"{len(frames)} frames {width}x{height}, {args.model} on {args.backend}, imgsz {args.imgsz}, "
+          f"tile {tile}, overlap {args.overlap:.0%}\n")
+    print(f"{'mode':>15} {'inputs':>7} {'p50 ms':>9} {'p95 ms':>9} {'fps':>7} {'dets/frame':>11} {'small':>7}")
+    for name, mode in modes:
+        inputs = len(mode.views(width, height)) if isinstance(mode, TiledBackend) else 1
+        result = bench(mode, config, frames, args.small)
+        print(f"{name:>15} {inputs:>7} {result['p50_ms']:9.1f} {result['p95_ms']:9.1f} {result['fps']:7.2f} "
+              f"{result['detections']:11.1f} {result['small']:7.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""
+Inference throughput in one process versus a pool of worker processes.
+
+Two workloads, each run in-process and with 1..N workers (the cores split
+evenly between them):
+- live: one frame per source per tick through predict(), like the web app
+  with several sources
+- batch: batches submitted back to back with a few in flight, like the
+  batch tool
+
+Usage:
+    python scripts/benchmark_workers.py --model yolov8n.pt --workers 1 2 4 --sources 4
+    python scripts/benchmark_workers.py --frames recording.mp4 --count 64 --batch-size 4
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import deque
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from backends import BACKENDS, create_backend
+from classes import class_table
+from detector import DetectorConfig
+from workers import InferencePool
+from benchmark_frames import load_frames
+
+
+def run_live(backend, config, frames, sources):
+    start = time.perf_counter()
+    for i in range(0, len(frames) - sources + 1, sources):
+        backend.predict(frames[i:i + sources], config)
+    return (len(frames) // sources * sources) / (time.perf_counter() - start)
+
+
+def run_batch(pool, frames, batch_size, in_flight):
+    pending = deque()
+    start = time.perf_counter()
+    for i in range(0, len(frames), batch_size):
+        pending.append(pool.submit(frames[i:i + batch_size]))
+        while len(pending) >= in_flight:
+            pending.popleft().result()
+    while pending:
+        pending.popleft().result()
+    return len(frames) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default='yolov8n.pt')
+    parser.add_argument('--backend', default='torch', choices=BACKENDS)
+    parser.add_argument('--frames', default=None, help='video file or image directory (default: synthetic frames)')
+    parser.add_argument('--count', type=int, default=48)
+    parser.add_argument('--width', type=int, default=640)
+    parser.add_argument('--height', type=int, default=480)
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--sources', type=int, default=4, help='frames per tick in the live workload')
+    parser.add_argument('--batch-size', type=int, default=4)
+    parser.add_argument('--dispatch', default='least-loaded', choices=('least-loaded', 'round-robin'))
+    args = parser.parse_args()
+
+    frames = load_frames(args.frames, args.count, args.width, args.height)
+    if not frames:
+        print("No frames to benchmark")
+        return 1
+    config = DetectorConfig(class_table, imgsz=args.imgsz)
+    cores = os.cpu_count() or 1
+    print(f"{len(frames)} frames {frames[0].shape[1]}x{frames[0].shape[0]}, {args.model} on {args.backend}, "
+          f"{cores} cores\n")
+    print(f"{'setup':>22} {'live fps':>9} {'batch fps':>10} {'speedup':>8}")
+
+    backend = create_backend(args.backend, args.model, args.imgsz, cores)
+    backend.predict(frames[:1], config)
+    live = run_live(backend, config, frames, args.sources)
+    start = time.perf_counter()
+    for i in range(0, len(frames), args.batch_size):
+        backend.predict(frames[i:i + args.batch_size], config)
+    baseline = len(frames) / (time.perf_counter() - start)
+    print(f"{'1 process':>22} {live:9.1f} {baseline:10.1f} {1.0:7.2f}x")
+    del backend
+
+    for workers in args.workers:
+        settings = {'name': args.backend, 'weights': args.model, 'threads': max(1, cores // workers)}
+        with InferencePool(workers, settings, class_table, config, slots=2 * max(args.batch_size, args.sources),
+                           slot_bytes=frames[0].nbytes, dispatch=args.dispatch) as pool:
+            pool.warm_up(frames[:1], config)
+            live = run_live(pool, config, frames, args.sources)
+            batch = run_batch(pool, frames, args.batch_size, 2 * workers)
+        label = f"{workers} workers x {settings['threads']} thr"
+        print(f"{label:>22} {live:9.1f} {batch:10.1f} {batch / baseline:7.2f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
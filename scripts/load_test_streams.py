@@ -0,0 +1,187 @@
+"""
+Connection scaling of the threaded Flask server versus the ASGI server.
+
+Starts the web app with each server on a synthetic source (or tests an
+already running one with --url), opens N concurrent /video_feed streams
+from one asyncio client and holds them for --duration seconds. While they
+are open it times small /health requests. Reports per step: streams that
+connected, frames per second each viewer received, the server's thread
+count, RSS and CPU, and the /health latency under load. Streaming needs
+no model, so the model is not loaded unless --model is given.
+
+Usage:
+    python scripts/load_test_streams.py --clients 10 50 100 200
+    python scripts/load_test_streams.py --servers asgi --clients 500 --width 160 --quality 30
+    python scripts/load_test_streams.py --url http://camera-box:8080 --clients 50
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+from urllib.parse import urlsplit
+
+import numpy as np
+import psutil
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+
+async def open_stream(host, port, path):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode())
+    await writer.drain()
+    status = await reader.readline()
+    if b' 200 ' not in status:
+        writer.close()
+        raise ConnectionError(status.decode(errors='replace').strip())
+    return reader, writer
+
+
+async def viewer(host, port, path, stop, counts, index):
+    """Read one multipart stream until stop is set, counting parts"""
+    try:
+        reader, writer = await asyncio.wait_for(open_stream(host, port, path), 10)
+    except (OSError, asyncio.TimeoutError, ConnectionError):
+        counts[index] = None
+        return
+    tail = b''
+    try:
+        while not stop.is_set():
+            chunk = await reader.read(65536)
+            if not chunk:
+                break
+            data = tail + chunk
+            counts[index] += data.count(b'--frame\r\n')
+            tail = data[-8:]
+    except OSError:
+        pass
+    finally:
+        writer.close()
+
+
+async def probe(host, port, stop, latencies):
+    """Time /health while the streams are open"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            reader, writer = await asyncio.wait_for(open_stream(host, port, '/health'), 5)
+            writer.close()
+        except ConnectionError:
+            # 503 while the model loads still measures the round trip
+            pass
+        except (OSError, asyncio.TimeoutError):
+            latencies.append(float('inf'))
+            continue
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(0.2)
+
+
+async def run_step(host, port, path, clients, duration, process):
+    stop = asyncio.Event()
+    counts = [0] * clients
+    latencies = []
+    tasks = [asyncio.create_task(viewer(host, port, path, stop, counts, i)) for i in range(clients)]
+    await asyncio.sleep(1)  # let everyone connect
+    counts[:] = [None if count is None else 0 for count in counts]
+    cpu_start = sum(process.cpu_times()[:2]) if process else None
+    prober = asyncio.create_task(probe(host, port, stop, latencies))
+
+    await asyncio.sleep(duration)
+    threads = process.num_threads() if process else None
+    rss = process.memory_info().rss / 2**20 if process else None
+    cpu = (sum(process.cpu_times()[:2]) - cpu_start) / duration if process else None
+    stop.set()
+    await asyncio.gather(prober, *tasks)
+
+    connected = [count for count in counts if count is not None]
+    return {
+        'connected': len(connected),
+        'fps': float(np.median(connected)) / duration if connected else 0.0,
+        'threads': threads,
+        'rss_mb': rss,
+        'cpu': cpu,
+        'health_ms': float(np.median(latencies)) * 1000 if latencies else float('inf'),
+    }
+
+
+def serve(server, port, source, model):
+    """The server process: what run_webapp.py does, with the model optional"""
+    import webapp
+    webapp.init_detection_log()
+    webapp.init_camera([('cam0', source)])
+    if model:
+        webapp.init_model_in_background(weights=model)
+    if server == 'asgi':
+        import uvicorn
+        from asgi import create_app
+        uvicorn.run(create_app(), host='127.0.0.1', port=port, log_level='warning', timeout_graceful_shutdown=2)
+    else:
+        webapp.app.run(threaded=True, port=port, host='127.0.0.1')
+
+
+def start_server(server, port, source, model):
+    command = [sys.executable, __file__, '--serve', server, '--port', str(port), '--source', source]
+    if model:
+        command += ['--model', model]
+    process = subprocess.Popen(command, env=dict(os.environ, SPOTLIGHT_HISTORY_DB='off'),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/sources", timeout=1)
+            return process
+        except OSError:
+            if process.poll() is not None:
+                break
+            time.sleep(0.5)
+    process.kill()
+    raise RuntimeError(f"The {server} server did not come up on port {port}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--servers', nargs='+', default=['flask', 'asgi'], choices=('flask', 'asgi'))
+    parser.add_argument('--url', help='test this running server instead of starting one')
+    parser.add_argument('--clients', type=int, nargs='+', default=[10, 50, 100, 200])
+    parser.add_argument('--duration', type=float, default=10, help='seconds per step')
+    parser.add_argument('--source', default='synthetic:640x480@30')
+    parser.add_argument('--model', help='also load this model in the server (default: none)')
+    parser.add_argument('--port', type=int, default=8097)
+    parser.add_argument('--quality', type=int, default=50)
+    parser.add_argument('--width', type=int, default=320)
+    parser.add_argument('--serve', choices=('flask', 'asgi'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        return serve(args.serve, args.port, args.source, args.model)
+
+    path = f"/video_feed?overlay=client&quality={args.quality}&width={args.width}"
+    targets = [(urlsplit(args.url).netloc, None)] if args.url else [(None, server) for server in args.servers]
+    print(f"{args.source}, {path}, {args.duration:g}s per step\n")
+    print(f"{'server':>8} {'clients':>8} {'connected':>10} {'fps/client':>11} {'threads':>8} {'RSS MB':>7} "
+          f"{'CPU':>6} {'/health ms':>11}")
+    for netloc, server in targets:
+        process = start_server(server, args.port, args.source, args.model) if server else None
+        host, _, port = (netloc or f"127.0.0.1:{args.port}").partition(':')
+        try:
+            for clients in args.clients:
+                result = asyncio.run(run_step(host, int(port or 80), path, clients, args.duration,
+                                              psutil.Process(process.pid) if process else None))
+                print(f"{server or 'url':>8} {clients:>8} {result['connected']:>10} {result['fps']:>11.1f} "
+                      f"{result['threads'] or '-':>8} {result['rss_mb'] or 0:>7.0f} {result['cpu'] or 0:>6.0%} "
+                      f"{result['health_ms']:>11.1f}")
+        finally:
+            if process is not None:
+                process.terminate()
+                try:
+                    process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,206 @@
+"""
+SpotLight ASGI Server
+Event-loop serving of the video and event streams, with the Flask app for everything else
+"""
+
+import asyncio
+import contextlib
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Mount, Route
+
+import webapp
+from encoding import BOUNDARY, EncodeTier
+from events import IdleMessages
+
+
+class _Client:
+    """One viewer: keeps only the newest frame, like LatestFrameQueue"""
+
+    def __init__(self):
+        self.frame = None
+        self.dropped = 0
+        self.ready = asyncio.Event()
+
+    def offer(self, frame):
+        if self.frame is not None:
+            self.dropped += 1
+        self.frame = frame
+        self.ready.set()
+
+    def take(self):
+        frame, self.frame = self.frame, None
+        self.ready.clear()
+        return frame
+
+
+class FrameRelay:
+    """
+    Subscribes to one FrameBroadcaster on behalf of every event-loop client
+    of that output. The encode thread hands each frame over with a single
+    call_soon_threadsafe, and the loop passes the same bytes to all
+    clients, so hundreds of viewers cost no threads and one wakeup per
+    frame. It unsubscribes when its last client leaves.
+    """
+
+    def __init__(self, loop, broadcaster, key, relays):
+        self.loop = loop
+        self.broadcaster = broadcaster
+        self.key = key
+        self.relays = relays
+        self.members = set()
+        self.closed_dropped = 0
+
+    @property
+    def clients(self):
+        return len(self.members)
+
+    @property
+    def dropped(self):
+        return self.closed_dropped + sum(client.dropped for client in list(self.members))
+
+    def put(self, frame):
+        # Called on the encode thread
+        try:
+            self.loop.call_soon_threadsafe(self._deliver, frame)
+        except RuntimeError:
+            pass  # the loop is closed; the server is shutting down
+
+    def _deliver(self, frame):
+        for client in self.members:
+            client.offer(frame)
+
+    def join(self):
+        client = _Client()
+        self.members.add(client)
+        if len(self.members) == 1:
+            self.broadcaster.subscribe(self)
+        return client
+
+    def leave(self, client):
+        self.members.discard(client)
+        self.closed_dropped += client.dropped
+        if not self.members:
+            self.broadcaster.unsubscribe(self)
+            del self.relays[self.key]
+
+
+_relays = {}  # (source id, raw, tier) -> FrameRelay, only touched on the event loop
+
+
+async def frame_parts(source_id, raw, tier, timeout=0.5):
+    """Multipart parts for one viewer until the stream stops or the client goes away"""
+    stream = webapp.pipeline.streams[source_id]
+    key = (source_id, raw, tier)
+    relay = _relays.get(key)
+    if relay is None:
+        relay = _relays[key] = FrameRelay(asyncio.get_running_loop(), stream.broadcaster(raw, tier), key, _relays)
+    client = relay.join()
+    try:
+        while stream.running:
+            if client.frame is None:
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(client.ready.wait(), timeout)
+            if client.frame is not None:
+                yield client.take()
+    finally:
+        relay.leave(client)
+
+
+class Wakeup:
+    """
+    A future that is resolved and replaced whenever detections are
+    published, shared by all SSE clients on the loop: one thread-safe
+    wakeup per publish however many clients wait on it.
+    """
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.future = loop.create_future()
+
+    def notify(self):
+        # Called on the detection thread
+        try:
+            self.loop.call_soon_threadsafe(self._fire)
+        except RuntimeError:
+            pass  # the loop is closed; the server is shutting down
+
+    def _fire(self):
+        future, self.future = self.future, self.loop.create_future()
+        future.set_result(None)
+
+
+_wakeups = {}  # event loop -> Wakeup
+
+
+async def event_messages(last_seq, timeout=1.0):
+    """SSE text for one client; a publish wakes the loop instead of a waiting thread"""
+    loop = asyncio.get_running_loop()
+    wakeup = _wakeups.get(loop)
+    if wakeup is None:
+        wakeup = _wakeups[loop] = Wakeup(loop)
+        webapp.events.add_listener(wakeup.notify)
+
+    idle = IdleMessages(webapp.heartbeat)
+    extra = {'default': webapp.default_source}
+    cursor = last_seq
+    while True:
+        # Take the future before reading, so a publish in between isn't missed
+        published = wakeup.future
+        text, cursor = webapp.events.read(cursor, extra)
+        if not text:
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(asyncio.shield(published), timeout)
+            text, cursor = webapp.events.read(cursor, extra)
+        yield text or idle.next()
+
+
+async def video_feed(request):
+    source_id = request.path_params.get('source_id') or webapp.default_source
+    if webapp.pipeline is None or source_id not in webapp.pipeline.streams:
+        return PlainTextResponse(f"Unknown source: {source_id}", status_code=404)
+    try:
+        tier = EncodeTier.from_args(request.query_params)
+    except ValueError:
+        return PlainTextResponse("quality and width must be integers", status_code=400)
+    raw = request.query_params.get('overlay') == 'client'
+    return StreamingResponse(frame_parts(source_id, raw, tier),
+                             media_type=f'multipart/x-mixed-replace; boundary={BOUNDARY}')
+
+
+async def detection_events(request):
+    last_id = request.headers.get('Last-Event-ID') or request.query_params.get('since', '')
+    return StreamingResponse(event_messages(int(last_id) if last_id.isdigit() else None),
+                             media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    # Also works as `uvicorn asgi:app --app-dir src`, without run_webapp.py
+    if webapp.pipeline is None:
+        webapp.init_detection_log()
+        webapp.init_camera()
+        webapp.init_model_in_background()
+    yield
+    webapp.shutdown()
+
+
+def create_app(wsgi_threads=10):
+    """
+    The web app on an event loop. /video_feed and /events are served
+    natively as async generators; every other route goes to the Flask app
+    on a pool of wsgi_threads threads. Inference never runs on the loop:
+    it stays on the pipeline threads (and upload jobs on the job queue).
+    """
+    return Starlette(routes=[
+        Route('/video_feed', video_feed),
+        Route('/video_feed/{source_id}', video_feed),
+        Route('/events', detection_events),
+        Mount('/', WSGIMiddleware(webapp.app, workers=wsgi_threads)),
+    ], lifespan=lifespan)
+
+
+app = create_app()
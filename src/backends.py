@@ -0,0 +1,255 @@
+"""
+SpotLight Inference Backends
+PyTorch (ultralytics), ONNX Runtime and OpenVINO behind one predict() call.
+
+Every backend takes a list of BGR frames plus a DetectorConfig and returns
+one (xyxy, conf, cls) tuple of NumPy arrays per frame, ready for
+postprocess.build_detections.
+"""
+
+import hashlib
+import os
+import shutil
+import time
+
+import cv2
+import numpy as np
+
+from postprocess import boxes_to_arrays
+from tiling import TiledBackend, tiling_settings_from_env
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'spotlight', 'models')
+
+
+class TorchBackend:
+    """ultralytics YOLO running on PyTorch"""
+
+    name = 'torch'
+
+    def __init__(self, weights, threads=None):
+        import torch
+        from ultralytics import YOLO
+
+        if threads:
+            torch.set_num_threads(threads)
+        self._torch = torch
+        self.model = YOLO(weights)
+        self.last_timings = {}
+
+    def predict(self, frames, config):
+        with self._torch.no_grad():
+            results = self.model(frames, **config.predict_kwargs())
+        # ultralytics reports per-image milliseconds for each stage
+        self.last_timings = {
+            stage: sum(result.speed[stage] for result in results) / 1000
+            for stage in ('preprocess', 'inference', 'postprocess')
+        }
+        return [boxes_to_arrays(result.boxes) for result in results]
+
+
+class ExportedBackend:
+    """
+    Shared pre/post-processing for exported YOLOv8 graphs, which take a
+    letterboxed NCHW float batch and return raw (batch, 4 + classes, anchors)
+    predictions without NMS. last_timings holds the seconds spent in each
+    stage of the most recent predict() call.
+    """
+
+    last_timings = {}
+
+    def run(self, batch):
+        raise NotImplementedError
+
+    def predict(self, frames, config):
+        kwargs = config.predict_kwargs()
+        imgsz = kwargs['imgsz']
+        start = time.perf_counter()
+        batch, transforms = letterbox_batch(frames, imgsz)
+        preprocessed = time.perf_counter()
+        outputs = self.run(batch)
+        inferred = time.perf_counter()
+        results = [
+            decode_predictions(output, transform, kwargs['conf'], kwargs['iou'],
+                               kwargs['classes'], kwargs['max_det'])
+            for output, transform in zip(outputs, transforms)
+        ]
+        self.last_timings = {
+            'preprocess': preprocessed - start,
+            'inference': inferred - preprocessed,
+            'postprocess': time.perf_counter() - inferred,
+        }
+        return results
+
+
+class OnnxBackend(ExportedBackend):
+    """ONNX Runtime on CPU with a configurable intra-op thread count"""
+
+    name = 'onnx'
+
+    def __init__(self, model_path, threads=None):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def run(self, batch):
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+class OpenVinoBackend(ExportedBackend):
+    """OpenVINO runtime on CPU with a configurable inference thread count"""
+
+    name = 'openvino'
+
+    def __init__(self, model_dir, threads=None):
+        import openvino as ov
+
+        core = ov.Core()
+        xml = next(os.path.join(model_dir, f) for f in os.listdir(model_dir) if f.endswith('.xml'))
+        properties = {'PERFORMANCE_HINT': 'LATENCY'}
+        if threads:
+            properties['INFERENCE_NUM_THREADS'] = threads
+        self.model = core.compile_model(core.read_model(xml), 'CPU', properties)
+
+    def run(self, batch):
+        return self.model(batch)[0]
+
+
+def letterbox_batch(frames, imgsz, stride=32):
+    """
+    Resize and pad frames into one batch, returning it with per-frame transforms.
+    Like ultralytics' rect mode, the canvas is only padded up to the stride,
+    so 640x480 frames run at 640x480 rather than 640x640.
+    """
+    sizes = []
+    for frame in frames:
+        h, w = frame.shape[:2]
+        scale = min(imgsz / h, imgsz / w)
+        sizes.append((scale, int(round(w * scale)), int(round(h * scale))))
+    canvas_w = -(-max(size[1] for size in sizes) // stride) * stride
+    canvas_h = -(-max(size[2] for size in sizes) // stride) * stride
+
+    batch = np.full((len(frames), canvas_h, canvas_w, 3), 114, dtype=np.uint8)
+    transforms = []
+    for i, (frame, (scale, new_w, new_h)) in enumerate(zip(frames, sizes)):
+        pad_x, pad_y = (canvas_w - new_w) // 2, (canvas_h - new_h) // 2
+        batch[i, pad_y:pad_y + new_h, pad_x:pad_x + new_w] = cv2.resize(
+            frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+        transforms.append((scale, pad_x, pad_y, frame.shape[1], frame.shape[0]))
+
+    # BGR HWC uint8 -> RGB CHW float
+    batch = batch[..., ::-1].transpose(0, 3, 1, 2)
+    return np.ascontiguousarray(batch, dtype=np.float32) / 255.0, transforms
+
+
+def decode_predictions(output, transform, conf, iou, classes, max_det):
+    """Class-aware NMS on one image's raw predictions, mapped back to frame pixels"""
+    preds = output.T  # (anchors, 4 + classes)
+    scores = preds[:, 4:]
+    # Best class over all classes first, then filter, like torch/ultralytics:
+    # masking first would relabel a bench as its runner-up, a chair
+    cls = scores.argmax(axis=1)
+    best = scores[np.arange(len(scores)), cls]
+    keep = best > conf
+    if classes is not None:
+        keep &= np.isin(cls, list(classes))
+    if not keep.any():
+        return np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, np.int32)
+
+    boxes, best, cls = preds[keep, :4], best[keep], cls[keep]
+    xywh = boxes.copy()
+    xywh[:, :2] -= xywh[:, 2:] / 2  # center -> top-left for NMSBoxesBatched
+    indices = cv2.dnn.NMSBoxesBatched(xywh.tolist(), best.tolist(), cls.tolist(), conf, iou)
+    indices = np.asarray(indices, dtype=np.int64).reshape(-1)
+    indices = indices[np.argsort(-best[indices])][:max_det]
+
+    scale, pad_x, pad_y, w, h = transform
+    xyxy = np.column_stack([xywh[indices, :2], xywh[indices, :2] + xywh[indices, 2:]])
+    xyxy -= (pad_x, pad_y, pad_x, pad_y)
+    xyxy /= scale
+    xyxy[:, [0, 2]] = xyxy[:, [0, 2]].clip(0, w)
+    xyxy[:, [1, 3]] = xyxy[:, [1, 3]].clip(0, h)
+    return xyxy.astype(np.float32), best[indices].astype(np.float32), cls[indices].astype(np.int32)
+
+
+def file_hash(path, length=12):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:length]
+
+
+def export_model(weights, fmt, imgsz=640, int8=False, cache_dir=None):
+    """
+    Export weights to ONNX or OpenVINO once and cache the artifact, keyed by
+    the weights hash, imgsz and quantization. Returns the cached path.
+    """
+    from ultralytics import YOLO
+
+    cache_dir = cache_dir or os.environ.get('SPOTLIGHT_CACHE_DIR', DEFAULT_CACHE_DIR)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    stem = os.path.splitext(os.path.basename(weights))[0]
+    key = f"{stem}-{file_hash(weights)}-{imgsz}{'-int8' if int8 else ''}"
+    target = os.path.join(cache_dir, f"{key}.onnx" if fmt == 'onnx' else f"{key}_openvino_model")
+    if os.path.exists(target):
+        print(f"Using cached {fmt} model: {target}")
+        return target
+
+    print(f"Exporting {weights} to {fmt} (imgsz={imgsz}, int8={int8})...")
+    if fmt == 'onnx':
+        exported = YOLO(weights).export(format='onnx', imgsz=imgsz, dynamic=True)
+        if int8:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            quantize_dynamic(exported, target, weight_type=QuantType.QUInt8)
+            os.remove(exported)
+        else:
+            shutil.move(exported, target)
+    elif fmt == 'openvino':
+        # INT8 calibration needs a dataset; ultralytics fetches coco8 by default
+        exported = YOLO(weights).export(format='openvino', imgsz=imgsz, dynamic=True, int8=int8)
+        shutil.move(exported, target)
+    else:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    print(f"Cached {fmt} model at {target}")
+    return target
+
+
+BACKENDS = ('torch', 'onnx', 'openvino')
+
+
+def create_backend(name='torch', weights='yolov8m.pt', imgsz=640, threads=None, int8=False, cache_dir=None,
+                   tiling=None):
+    """
+    Build an inference backend, exporting and caching the model if needed.
+    tiling, a dict of TiledBackend settings, wraps it for tiled/ROI inference.
+    """
+    if name == 'torch':
+        backend = TorchBackend(weights, threads)
+    elif name == 'onnx':
+        path = weights if weights.endswith('.onnx') else export_model(weights, 'onnx', imgsz, int8, cache_dir)
+        backend = OnnxBackend(path, threads)
+    elif name == 'openvino':
+        path = weights if os.path.isdir(weights) else export_model(weights, 'openvino', imgsz, int8, cache_dir)
+        backend = OpenVinoBackend(path, threads)
+    else:
+        raise ValueError(f"Unknown backend '{name}', choose from {', '.join(BACKENDS)}")
+    return TiledBackend(backend, **tiling) if tiling else backend
+
+
+def backend_settings_from_env():
+    """Backend choice from SPOTLIGHT_BACKEND / _MODEL / _THREADS / _INT8, tiling from _TILE / _ROIS"""
+    threads = os.environ.get('SPOTLIGHT_THREADS')
+    return {
+        'name': os.environ.get('SPOTLIGHT_BACKEND', 'torch'),
+        'weights': os.environ.get('SPOTLIGHT_MODEL', 'yolov8m.pt'),
+        'threads': int(threads) if threads else None,
+        'int8': os.environ.get('SPOTLIGHT_INT8', '').lower() in ('1', 'true', 'yes'),
+        'tiling': tiling_settings_from_env(),
+    }
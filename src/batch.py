@@ -0,0 +1,297 @@
+"""
+SpotLight Batch Detection
+Offline detection over image folders, globs and video files.
+
+Frames are decoded one at a time, grouped into batches and fanned out to a
+pool of worker processes that each hold their own model; frames reach the
+workers through shared memory rather than pickling. Results are written
+as they come back (one JSONL line or CSV rows per frame), so long videos are
+never held in memory and an interrupted run can pick up where it stopped.
+"""
+
+import argparse
+import csv
+import glob
+import json
+import os
+from collections import deque
+
+import cv2
+from tqdm import tqdm
+
+from backends import BACKENDS, backend_settings_from_env
+from classes import class_table
+from detector import DetectorConfig
+from overlay import draw_detections
+from postprocess import build_detections
+from sources import IMAGE_EXTENSIONS
+from tiling import tiling_settings
+from workers import InferencePool
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.webm', '.m4v')
+DEFAULT_FPS = 30  # annotated video frame rate when a file doesn't report one
+
+CSV_FIELDS = ['source', 'frame', 'name', 'category', 'confidence', 'x1', 'y1', 'x2', 'y2']
+
+
+def expand_inputs(paths):
+    """Turn directories, globs and file paths into a sorted list of media files"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            candidates = sorted(glob.glob(os.path.join(path, '**', '*'), recursive=True))
+        elif any(ch in path for ch in '*?['):
+            candidates = sorted(glob.glob(path, recursive=True))
+        else:
+            candidates = [path]
+        files.extend(f for f in candidates if f.lower().endswith(IMAGE_EXTENSIONS + VIDEO_EXTENSIONS))
+
+    seen = set()
+    return [f for f in files if not (f in seen or seen.add(f))]
+
+
+def is_video(path):
+    return path.lower().endswith(VIDEO_EXTENSIONS)
+
+
+def count_frames(path, stride):
+    if not is_video(path):
+        return 1
+    capture = cv2.VideoCapture(path)
+    total = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    capture.release()
+    return max(0, -(-total // stride))
+
+
+def video_fps(path, stride=1, default=DEFAULT_FPS):
+    """Frame rate of the frames a stride keeps, so annotated videos play at real speed"""
+    capture = cv2.VideoCapture(path)
+    fps = capture.get(cv2.CAP_PROP_FPS)
+    capture.release()
+    return (fps or default) / stride
+
+
+def iter_frames(path, start=0, stride=1):
+    """Yield (frame_index, frame) for an image or video, decoding one frame at a time"""
+    if not is_video(path):
+        if start == 0:
+            frame = cv2.imread(path)
+            if frame is not None:
+                yield 0, frame
+        return
+
+    capture = cv2.VideoCapture(path)
+    if start:
+        capture.set(cv2.CAP_PROP_POS_FRAMES, start)
+    index = start
+    try:
+        while True:
+            # grab() skips decoding for frames the stride leaves out
+            if not capture.grab():
+                break
+            if index % stride == 0:
+                success, frame = capture.retrieve()
+                if success:
+                    yield index, frame
+            index += 1
+    finally:
+        capture.release()
+
+
+def iter_batches(files, resume_from, batch_size, stride):
+    """Yield lists of (source, frame_index, frame) across all inputs"""
+    batch = []
+    for path in files:
+        start = resume_from.get(path, -1) + 1
+        for index, frame in iter_frames(path, start, stride):
+            batch.append((path, index, frame))
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def load_progress(output, fmt):
+    """
+    Last frame index written per source in an existing output file.
+    A partially written trailing line from an interrupted run is cut off.
+    """
+    if not os.path.exists(output):
+        return {}
+
+    with open(output, 'rb+') as f:
+        data = f.read()
+        if data and not data.endswith(b'\n'):
+            f.truncate(data.rfind(b'\n') + 1)
+
+    progress = {}
+    with open(output, newline='') as f:
+        rows = csv.DictReader(f) if fmt == 'csv' else (json.loads(line) for line in f if line.strip())
+        for row in rows:
+            progress[row['source']] = max(progress.get(row['source'], -1), int(row['frame']))
+    return progress
+
+
+class ResultWriter:
+    """Appends one JSONL line, or one CSV row per detection, for every processed frame"""
+
+    def __init__(self, path, fmt, append):
+        self.fmt = fmt
+        exists = append and os.path.exists(path) and os.path.getsize(path) > 0
+        self.file = open(path, 'a' if append else 'w', newline='')
+        self.csv = None
+        if fmt == 'csv':
+            self.csv = csv.DictWriter(self.file, fieldnames=CSV_FIELDS)
+            if not exists:
+                self.csv.writeheader()
+
+    def write(self, source, frame_index, detections):
+        if self.csv is None:
+            self.file.write(json.dumps({'source': source, 'frame': frame_index, 'detections': detections}) + '\n')
+            return
+
+        if not detections:
+            # Keep a row for empty frames so resuming knows they were done
+            self.csv.writerow({'source': source, 'frame': frame_index})
+        for item in detections:
+            x1, y1, x2, y2 = item['bbox']
+            self.csv.writerow({
+                'source': source, 'frame': frame_index, 'name': item['name'],
+                'category': item['category'], 'confidence': item['confidence'],
+                'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2,
+            })
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class Annotator:
+    """Writes annotated copies of images and videos into an output directory"""
+
+    def __init__(self, directory, draw, stride=1):
+        self.directory = directory
+        self.draw = draw
+        self.stride = stride
+        self._source = None
+        self._writer = None
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, source, frame_index, frame, detections):
+        self.draw(frame, detections)
+        stem, ext = os.path.splitext(os.path.basename(source))
+
+        if not is_video(source):
+            cv2.imwrite(os.path.join(self.directory, f"{stem}_annotated{ext}"), frame)
+            return
+
+        if source != self._source:
+            self.close()
+            # A resumed video gets a separate file starting at the resume point
+            suffix = f"_from{frame_index}" if frame_index else ''
+            path = os.path.join(self.directory, f"{stem}_annotated{suffix}.mp4")
+            h, w = frame.shape[:2]
+            fps = video_fps(source, self.stride)
+            self._writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (w, h))
+            self._source = source
+        self._writer.write(frame)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.release()
+        self._writer = None
+        self._source = None
+
+
+def run_batch(files, output, class_table, backend_settings, config_values, fmt='jsonl',
+              workers=2, batch_size=4, stride=1, annotate=None, draw=None, resume=True):
+    """Detect on every frame of every file and stream the results to `output`"""
+    resume_from = load_progress(output, fmt) if resume else {}
+    if resume_from:
+        print(f"Resuming: {len(resume_from)} sources already (partly) processed")
+
+    total = sum(count_frames(path, stride) for path in files)
+    done = sum(-(-(last + 1) // stride) for last in resume_from.values())
+    writer = ResultWriter(output, fmt, append=bool(resume_from))
+    annotator = Annotator(annotate, draw, stride) if annotate else None
+    conf, category = config_values.get('conf', 0.4), config_values.get('category')
+
+    # Bound the frames held in memory to a couple of batches per worker
+    max_in_flight = workers * 2
+    pending = deque()
+    progress = tqdm(total=total, initial=min(done, total), unit='frame')
+
+    def drain_one():
+        batch, future = pending.popleft()
+        for (source, index, frame), (xyxy, scores, cls) in zip(batch, future.result()):
+            detections = build_detections(class_table, xyxy, scores, cls, conf, category)
+            writer.write(source, index, detections)
+            if annotator is not None:
+                annotator.write(source, index, frame, detections)
+        writer.flush()
+        progress.update(len(batch))
+
+    config = DetectorConfig(class_table, **config_values)
+    try:
+        # Room in each worker's ring buffer for the batches it can have in flight
+        with InferencePool(workers, backend_settings, class_table, config, slots=2 * batch_size) as pool:
+            for batch in iter_batches(files, resume_from, batch_size, stride):
+                frames = [frame for _, _, frame in batch]
+                pending.append((batch, pool.submit(frames)))
+                while len(pending) >= max_in_flight:
+                    drain_one()
+            while pending:
+                drain_one()
+    finally:
+        progress.close()
+        writer.close()
+        if annotator is not None:
+            annotator.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='SpotLight batch detection for images and videos')
+    parser.add_argument('inputs', nargs='+', help='image/video files, directories or glob patterns')
+    parser.add_argument('-o', '--output', default='detections.jsonl', help='.jsonl or .csv results file')
+    parser.add_argument('--annotate', metavar='DIR', help='also write annotated images/videos here')
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument('--batch-size', type=int, default=4)
+    parser.add_argument('--stride', type=int, default=1, help='process every Nth video frame')
+    parser.add_argument('--backend', choices=BACKENDS, help='defaults to SPOTLIGHT_BACKEND')
+    parser.add_argument('--model', help='defaults to SPOTLIGHT_MODEL')
+    parser.add_argument('--threads', type=int, help='inference threads per worker')
+    parser.add_argument('--conf', type=float, default=0.4)
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--category', help='only keep one category, e.g. Furniture')
+    parser.add_argument('--tile', type=int, help='detect on overlapping tiles of this size (0: off)')
+    parser.add_argument('--roi', help="only detect inside these regions, 'x1,y1,x2,y2;...'")
+    parser.add_argument('--no-resume', action='store_true', help='overwrite instead of resuming')
+    args = parser.parse_args(argv)
+
+    files = expand_inputs(args.inputs)
+    if not files:
+        print("No images or videos found")
+        return 1
+
+    settings = backend_settings_from_env()
+    if args.backend:
+        settings['name'] = args.backend
+    if args.model:
+        settings['weights'] = args.model
+    settings['tiling'] = tiling_settings(settings['tiling'], args.tile, args.roi)
+    # Split the cores between workers unless told otherwise
+    settings['threads'] = args.threads or max(1, (os.cpu_count() or 1) // args.workers)
+
+    config_values = {'conf': args.conf, 'imgsz': args.imgsz, 'category': args.category}
+    DetectorConfig(class_table, **config_values)  # fail fast on bad values
+    fmt = 'csv' if args.output.lower().endswith('.csv') else 'jsonl'
+
+    print(f"{len(files)} files, {args.workers} workers, batch size {args.batch_size}")
+    run_batch(files, args.output, class_table, settings, config_values, fmt=fmt,
+              workers=args.workers, batch_size=args.batch_size, stride=args.stride,
+              annotate=args.annotate, draw=draw_detections, resume=not args.no_resume)
+    print(f"Results written to {args.output}")
+    return 0
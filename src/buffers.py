@@ -0,0 +1,106 @@
+"""
+SpotLight Frame Buffers
+Reusable frame arrays so capture, drawing and resizing stop allocating per frame
+"""
+
+import threading
+
+import numpy as np
+
+
+class FramePool:
+    """
+    Recycles frame-sized arrays of one shape, with explicit ownership.
+
+    A buffer handed out by acquire(), read() or copy() has one owner. Every
+    extra holder (a queue, another thread) calls retain(), and every holder
+    calls release() when it is done; when the last one has, the buffer goes
+    back to the pool. A frame that is never released is simply never
+    reused, so code that doesn't know about the pool stays correct. Arrays
+    the pool didn't hand out are ignored by retain() and release().
+
+    At most max_buffers are in circulation; past that, fresh arrays are
+    allocated and not tracked. max_buffers=0 disables reuse. A change of
+    frame shape starts the pool over.
+    """
+
+    def __init__(self, max_buffers=8):
+        self.max_buffers = max_buffers
+        self.allocated = 0
+        self.reused = 0
+        self._free = []
+        self._owners = {}  # id(buffer) -> [buffer, holders], for buffers handed out
+        self._shape = None
+        self._lock = threading.Lock()
+
+    def acquire(self, shape=None):
+        """A free buffer of this shape (default: the last one seen), or None"""
+        with self._lock:
+            if shape is not None and shape != self._shape or not self._free:
+                return None
+            buffer = self._free.pop()
+            self._owners[id(buffer)] = [buffer, 1]
+            self.reused += 1
+            return buffer
+
+    def adopt(self, frame):
+        """Track a frame the caller allocated and owns, if there is room"""
+        with self._lock:
+            if id(frame) in self._owners:
+                return frame
+            self.allocated += 1
+            if frame.shape != self._shape:
+                self._free, self._owners, self._shape = [], {}, frame.shape
+            if len(self._free) + len(self._owners) < self.max_buffers and frame.flags.c_contiguous:
+                self._owners[id(frame)] = [frame, 1]
+        return frame
+
+    def retain(self, frame):
+        """One more holder of a pooled frame; returns the frame"""
+        with self._lock:
+            owner = self._owners.get(id(frame))
+            if owner is not None:
+                owner[1] += 1
+        return frame
+
+    def release(self, frame):
+        """A holder is done with the frame; the last one returns it to the pool"""
+        if frame is None:
+            return
+        with self._lock:
+            owner = self._owners.get(id(frame))
+            if owner is None:
+                return
+            owner[1] -= 1
+            if owner[1] == 0:
+                del self._owners[id(frame)]
+                if frame.shape == self._shape:
+                    self._free.append(frame)
+
+    def read(self, read):
+        """read(buffer) -> (success, frame), like cv2.VideoCapture.read(image=...)"""
+        buffer = self.acquire()
+        success, frame = read(buffer)
+        if frame is not buffer:
+            self.release(buffer)
+        if not success:
+            self.release(frame)
+            return success, frame
+        return success, self.adopt(frame)
+
+    def copy(self, frame):
+        """A copy of frame in a pooled buffer"""
+        buffer = self.acquire(frame.shape)
+        if buffer is None:
+            return self.adopt(frame.copy())
+        np.copyto(buffer, frame)
+        return buffer
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'buffers': len(self._free) + len(self._owners),
+                'in_use': len(self._owners),
+                'allocated': self.allocated,
+                'reused': self.reused,
+            }
@@ -0,0 +1,48 @@
+"""
+SpotLight Classes
+The COCO classes SpotLight looks for, their categories and display colors
+"""
+
+from postprocess import ClassTable
+
+# YOLOv8 COCO classes we're interested in
+items_to_detect = {
+    # Furniture
+    56: 'chair', 57: 'couch', 59: 'bed', 60: 'dining table',
+    # Electronics
+    62: 'tv/monitor', 63: 'laptop', 64: 'mouse', 65: 'remote', 
+    66: 'keyboard', 67: 'cell phone',
+    # Kitchen items
+    46: 'banana', 47: 'apple', 49: 'orange', 43: 'knife',
+    44: 'spoon', 45: 'fork', 39: 'bottle', 41: 'cup',
+    40: 'wine glass', 42: 'bowl',
+    # Office/Room items
+    73: 'book', 74: 'clock', 75: 'vase', 76: 'scissors', 84: 'potted plant',
+    # Other
+    0: 'person', 15: 'cat', 16: 'dog', 26: 'handbag', 
+    27: 'suitcase', 28: 'backpack',
+}
+
+# Group items by category for display
+categories = {
+    'Furniture': [56, 57, 59, 60],
+    'Electronics': [62, 63, 64, 65, 66, 67],
+    'Kitchen': [39, 40, 41, 42, 43, 44, 45, 46, 47, 49],
+    'Office/Decor': [73, 74, 75, 76, 84],
+    'Living': [0, 15, 16, 26, 27, 28]
+}
+
+category_colors = {
+    'Furniture': '#4CAF50',      # Green
+    'Electronics': '#2196F3',     # Blue
+    'Kitchen': '#FFEB3B',         # Yellow
+    'Office/Decor': '#9C27B0',    # Purple
+    'Living': '#FF9800'           # Orange
+}
+
+class_table = ClassTable(items_to_detect, categories, category_colors, default_color='#FFFFFF')
+
+
+def get_category(class_id):
+    """Get category name for a class ID"""
+    return class_table.category_of(class_id)
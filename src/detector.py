@@ -0,0 +1,106 @@
+"""
+SpotLight Detector Configuration
+Predict-call settings shared by the web app and the CLI
+"""
+
+import threading
+
+
+class DetectorConfig:
+    """
+    Confidence, NMS and input-size settings handed straight to the
+    ultralytics predict call. The class whitelist (restricted to the active
+    category filter) is passed as classes= so unwanted classes are dropped
+    before NMS instead of after.
+    """
+
+    FIELDS = ('conf', 'iou', 'imgsz', 'max_det', 'half', 'category')
+
+    def __init__(self, class_table, conf=0.4, iou=0.7, imgsz=640, max_det=300, half=False, category=None):
+        self.class_table = class_table
+        values = {'conf': conf, 'iou': iou, 'imgsz': imgsz, 'max_det': max_det,
+                  'half': half, 'category': category}
+        for key, value in values.items():
+            setattr(self, key, self._validate(key, value))
+        self._lock = threading.Lock()
+        self._kwargs = self._build_kwargs()
+
+    def classes(self):
+        """Class ids to keep, limited to the active category if any"""
+        table = self.class_table
+        ids = sorted(table.items_to_detect)
+        if self.category:
+            wanted = table.category_id(self.category)
+            ids = [cls_id for cls_id in ids if table.category_index[cls_id] == wanted]
+        return ids
+
+    def _build_kwargs(self):
+        kwargs = {
+            'classes': self.classes(),
+            'conf': self.conf,
+            'iou': self.iou,
+            'imgsz': self.imgsz,
+            'max_det': self.max_det,
+            'verbose': False,
+        }
+        # FP16 only helps on CUDA; leave the argument out unless asked for
+        if self.half:
+            kwargs['half'] = True
+        return kwargs
+
+    def predict_kwargs(self):
+        """Keyword arguments for model(frames, **kwargs); rebuilt only on update"""
+        return self._kwargs
+
+    def update(self, **changes):
+        """Validate and apply changes; raises ValueError on bad input"""
+        values = {}
+        for key, value in changes.items():
+            if key not in self.FIELDS:
+                raise ValueError(f"Unknown setting: {key}")
+            values[key] = self._validate(key, value)
+
+        with self._lock:
+            for key, value in values.items():
+                setattr(self, key, value)
+            self._kwargs = self._build_kwargs()
+
+    def _validate(self, key, value):
+        if key in ('conf', 'iou'):
+            value = float(value)
+            if not 0.0 <= value <= 1.0:
+                raise ValueError(f"{key} must be between 0 and 1")
+        elif key in ('imgsz', 'max_det'):
+            value = int(value)
+            if value <= 0:
+                raise ValueError(f"{key} must be positive")
+            if key == 'imgsz':
+                # Round up to the model stride like ultralytics does
+                value = -(-value // 32) * 32
+        elif key == 'half':
+            if isinstance(value, str):
+                value = value.lower() in ('1', 'true', 'yes', 'on')
+            value = bool(value)
+        elif key == 'category':
+            if value in (None, '', 'all'):
+                value = None
+            elif value not in self.class_table.category_names:
+                raise ValueError(f"Unknown category: {value}")
+        return value
+
+    def copy(self):
+        """An independent config with the same settings, unaffected by later updates"""
+        with self._lock:
+            values = {key: getattr(self, key) for key in self.FIELDS}
+        return DetectorConfig(self.class_table, **values)
+
+    def to_dict(self):
+        return {
+            'conf': self.conf,
+            'iou': self.iou,
+            'imgsz': self.imgsz,
+            'max_det': self.max_det,
+            'half': self.half,
+            'category': self.category,
+            'classes': self.predict_kwargs()['classes'],
+        }
@@ -0,0 +1,146 @@
+"""
+SpotLight JPEG Encoding
+Quality/width tiers for the MJPEG streams, with TurboJPEG when available
+"""
+
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from buffers import FramePool
+from metrics import STAGE_SECONDS
+
+DEFAULT_QUALITY = 95  # cv2.imencode's own default
+MIN_QUALITY = 10
+MIN_WIDTH = 160
+MAX_WIDTH = 3840
+
+BOUNDARY = 'frame'
+PART_HEADER = f'--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n\r\n'.encode()
+PART_TRAILER = b'\r\n'
+
+
+def mjpeg_part(jpeg):
+    """One multipart/x-mixed-replace part for a JPEG (bytes or memoryview), in a single copy"""
+    return b''.join((PART_HEADER, jpeg, PART_TRAILER))
+
+
+class EncodeTier:
+    """
+    A (quality, width) pair a client can ask for. Values are snapped to
+    steps of 5 quality points and 32 pixels so that clients asking for
+    nearly the same thing share one encode. width None means full size.
+    """
+
+    __slots__ = ('quality', 'width')
+
+    def __init__(self, quality=None, width=None):
+        quality = DEFAULT_QUALITY if quality is None else int(quality)
+        self.quality = min(DEFAULT_QUALITY, max(MIN_QUALITY, 5 * round(quality / 5)))
+        self.width = None if width is None else min(MAX_WIDTH, max(MIN_WIDTH, 32 * round(int(width) / 32)))
+
+    @classmethod
+    def from_args(cls, args):
+        """Tier from query parameters, e.g. ?quality=60&width=480; raises ValueError"""
+        quality, width = args.get('quality'), args.get('width')
+        return cls(int(quality) if quality else None, int(width) if width else None)
+
+    @property
+    def is_default(self):
+        return self.quality == DEFAULT_QUALITY and self.width is None
+
+    def _key(self):
+        return (self.quality, self.width)
+
+    def __eq__(self, other):
+        return isinstance(other, EncodeTier) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __str__(self):
+        return f"q{self.quality}" + (f"@{self.width}w" if self.width else '')
+
+
+def _load_turbojpeg():
+    try:
+        from turbojpeg import TurboJPEG
+        return TurboJPEG()
+    except (ImportError, OSError, RuntimeError):
+        return None
+
+
+class JpegEncoder:
+    """
+    Encodes frames at a given tier with PyTurboJPEG if it is installed (and
+    libturbojpeg can be loaded), otherwise with cv2.imencode. Keeps
+    encode-time and size totals per tier for bandwidth sizing.
+
+    Meant for one thread: resized frames come from a FramePool per width
+    and go back with recycle() once encoded, and TurboJPEG writes into one
+    reusable output buffer, so encode() returns a memoryview that is only
+    valid until the next call.
+    """
+
+    def __init__(self, use_turbo=True):
+        self._turbo = _load_turbojpeg() if use_turbo else None
+        self.name = 'turbojpeg' if self._turbo is not None else 'opencv'
+        self._totals = {}  # tier -> [frames, seconds, bytes]
+        self._lock = threading.Lock()
+        self._resize_pools = {}  # width -> FramePool
+        self._output = np.zeros(0, np.uint8)
+
+    def resize(self, frame, tier):
+        if tier.width is None or tier.width >= frame.shape[1]:
+            return frame
+        height = max(1, round(frame.shape[0] * tier.width / frame.shape[1]))
+        pool = self._resize_pools.setdefault(tier.width, FramePool(4))
+        buffer = pool.acquire((height, tier.width) + frame.shape[2:])
+        resized = cv2.resize(frame, (tier.width, height), dst=buffer, interpolation=cv2.INTER_AREA)
+        if resized is not buffer:
+            pool.release(buffer)
+        return pool.adopt(resized)
+
+    def recycle(self, frame):
+        """Hand a frame from resize() back once it is encoded"""
+        pool = self._resize_pools.get(frame.shape[1])
+        if pool is not None:
+            pool.release(frame)
+
+    def encode(self, frame, tier):
+        """JPEG data for an already resized frame as a memoryview, or None if encoding failed"""
+        start = time.perf_counter()
+        if self._turbo is not None:
+            needed = self._turbo.buffer_size(frame)
+            if self._output.nbytes < needed:
+                self._output = np.empty(needed, np.uint8)
+            _, size = self._turbo.encode(frame, quality=tier.quality, dst=self._output)
+            data = memoryview(self._output)[:size]
+        else:
+            ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, tier.quality])
+            data = memoryview(buffer) if ret else None
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, 'encode')
+        self.record(tier, elapsed, len(data) if data else 0)
+        return data
+
+    def record(self, tier, seconds, size):
+        with self._lock:
+            totals = self._totals.setdefault(tier, [0, 0.0, 0])
+            totals[0] += 1
+            totals[1] += seconds
+            totals[2] += size
+
+    def get_stats(self):
+        with self._lock:
+            totals = {str(tier): list(values) for tier, values in self._totals.items()}
+        return {
+            name: {
+                'frames': frames,
+                'encode_ms': round(1000 * seconds / frames, 2),
+                'bytes_per_frame': round(size / frames),
+            }
+            for name, (frames, seconds, size) in totals.items() if frames
+        }
@@ -0,0 +1,153 @@
+"""
+SpotLight Event Log
+Append-only SQLite record of every detection, written in batches off the frame path
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS detections (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    source TEXT NOT NULL,
+    class TEXT NOT NULL,
+    category TEXT,
+    confidence REAL NOT NULL,
+    x1 INTEGER, y1 INTEGER, x2 INTEGER, y2 INTEGER
+);
+CREATE INDEX IF NOT EXISTS detections_ts ON detections (ts);
+CREATE INDEX IF NOT EXISTS detections_class_ts ON detections (class, ts);
+"""
+
+INSERT = ("INSERT INTO detections (ts, source, class, category, confidence, x1, y1, x2, y2) "
+          "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)")
+
+MAX_LIMIT = 10000
+
+
+def parse_time(value):
+    """Unix seconds or an ISO 8601 date/time (local time unless it has an offset)"""
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+class DetectionLog:
+    """
+    Detections are handed to append(), which only puts them on a queue; a
+    writer thread turns them into rows and commits them in one transaction
+    per batch (every `flush_interval` seconds or `batch_size` rows). The
+    database is in WAL mode, so queries from request threads run while the
+    writer appends. If the writer falls `max_pending` frames behind, new
+    frames are dropped (their detections counted in `dropped`) rather than
+    slowing the caller down.
+    """
+
+    def __init__(self, path, batch_size=500, flush_interval=1.0, max_pending=10000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.rows_written = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._local = threading.local()
+
+        connection = self._connect()
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.executescript(SCHEMA)
+        connection.close()
+
+        self._thread = threading.Thread(target=self._run, name='detection-log', daemon=True)
+        self._thread.start()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=30)
+        # WAL only needs a sync at checkpoints to stay consistent
+        connection.execute('PRAGMA synchronous=NORMAL')
+        return connection
+
+    def append(self, source_id, detections, timestamp=None):
+        """Queue one frame's detections; never blocks"""
+        if not detections:
+            return
+        try:
+            self._queue.put_nowait((timestamp or time.time(), source_id, detections))
+        except queue.Full:
+            self.dropped += len(detections)
+
+    def _run(self):
+        connection = self._connect()
+        running = True
+        while running:
+            rows = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(rows) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    running = False
+                    break
+                ts, source_id, detections = item
+                rows.extend((ts, source_id, d['name'], d['category'], d['confidence'], *d['bbox'])
+                            for d in detections)
+            if rows:
+                try:
+                    with connection:
+                        connection.executemany(INSERT, rows)
+                    self.rows_written += len(rows)
+                except sqlite3.Error as e:
+                    self.dropped += len(rows)
+                    print(f"Detection log write failed: {e}")
+        connection.close()
+
+    def query(self, start=None, end=None, class_name=None, source=None, limit=1000):
+        """Detections between start and end (unix seconds), oldest first"""
+        clauses, params = [], []
+        if class_name:
+            clauses.append('class = ?')
+            params.append(class_name)
+        if start is not None:
+            clauses.append('ts >= ?')
+            params.append(start)
+        if end is not None:
+            clauses.append('ts < ?')
+            params.append(end)
+        if source:
+            clauses.append('source = ?')
+            params.append(source)
+        sql = ('SELECT ts, source, class, category, confidence, x1, y1, x2, y2 FROM detections'
+               + (' WHERE ' + ' AND '.join(clauses) if clauses else '')
+               + ' ORDER BY ts LIMIT ?')
+        params.append(min(int(limit), MAX_LIMIT))
+
+        # One read connection per request thread
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+        return [
+            {
+                'timestamp': ts,
+                'time': datetime.fromtimestamp(ts).isoformat(timespec='milliseconds'),
+                'source': source_id,
+                'name': name,
+                'category': category,
+                'confidence': confidence,
+                'bbox': [x1, y1, x2, y2],
+            }
+            for ts, source_id, name, category, confidence, x1, y1, x2, y2 in connection.execute(sql, params)
+        ]
+
+    def get_stats(self):
+        return {'rows_written': self.rows_written, 'pending': self._queue.qsize(), 'dropped': self.dropped}
+
+    def close(self, timeout=5.0):
+        """Write what is queued and stop the writer"""
+        self._queue.put(None)
+        self._thread.join(timeout)
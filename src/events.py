@@ -0,0 +1,139 @@
+"""
+SpotLight Events
+Server-Sent Events push of detection updates with sequence numbers
+"""
+
+import json
+import threading
+from collections import deque
+
+
+def format_event(event, data, seq=None):
+    """One SSE message; `id:` lets the browser resume with Last-Event-ID"""
+    lines = [] if seq is None else [f"id: {seq}"]
+    lines += [f"event: {event}", f"data: {json.dumps(data, separators=(',', ':'))}"]
+    return '\n'.join(lines) + '\n\n'
+
+
+class DetectionEvents:
+    """
+    Numbered detection updates for Server-Sent Events clients.
+
+    Messages go into a short backlog that every client reads with its own
+    cursor, so publishing costs one append however many clients are
+    connected. Only sequence numbers and the backlog live here: each
+    publish passes the DetectionState snapshot it came from, and the last
+    one published is what snapshot messages are built from, so a snapshot
+    and its sequence number always agree. A client whose cursor fell out
+    of the backlog (slow, or reconnecting after a long gap) is sent a fresh
+    snapshot and continues from there.
+    """
+
+    def __init__(self, state, backlog=256):
+        self.seq = 0
+        self._published = state.snapshot  # the state as of self.seq
+        self._signatures = {}
+        self._backlog = deque(maxlen=backlog)  # (seq, formatted message)
+        self._condition = threading.Condition()
+        self._listeners = []  # called after every publish, e.g. to wake an event loop
+
+    def publish_detections(self, source_id, snapshot, history_entry=None):
+        """
+        Publish a source's detections from a DetectionState snapshot if the
+        set changed; returns the seq or None
+        """
+        detections = list(snapshot.detections.get(source_id, ()))
+        signature = tuple((d['name'], d['confidence'], tuple(d['bbox']), d.get('track_id')) for d in detections)
+        with self._condition:
+            if self._signatures.get(source_id, ()) == signature:
+                return None
+            self._signatures[source_id] = signature
+            if snapshot.version > self._published.version:
+                self._published = snapshot
+
+            self.seq += 1
+            data = {'seq': self.seq, 'source': source_id, 'detections': detections,
+                    'total_detections': snapshot.total_detections}
+            if history_entry is not None:
+                data['history_entry'] = history_entry
+            self._backlog.append((self.seq, format_event('detections', data, self.seq)))
+            self._condition.notify_all()
+            seq, listeners = self.seq, list(self._listeners)
+        for listener in listeners:
+            listener()
+        return seq
+
+    def add_listener(self, listener):
+        with self._condition:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        with self._condition:
+            self._listeners.remove(listener)
+
+    def snapshot(self):
+        with self._condition:
+            return self._snapshot()
+
+    def _snapshot(self):
+        published = self._published
+        return {
+            'seq': self.seq,
+            'detections': {source_id: list(items) for source_id, items in published.detections.items()},
+            'history': list(published.history),
+            'total_detections': published.total_detections,
+        }
+
+    def _pending(self, cursor):
+        """Messages after cursor, or None if some were already dropped"""
+        if cursor is None or cursor > self.seq:
+            return None
+        if cursor == self.seq:
+            return []
+        if not self._backlog or cursor < self._backlog[0][0] - 1:
+            return None
+        return [message for seq, message in self._backlog if seq > cursor]
+
+    def read(self, cursor, extra=None, timeout=0):
+        """
+        (SSE text of the messages after cursor, new cursor), waiting up to
+        timeout for one. The text is '' if nothing arrived, and a snapshot
+        (with extra merged in) if the cursor fell out of the backlog.
+        """
+        with self._condition:
+            pending = self._pending(cursor)
+            if pending == [] and timeout:
+                self._condition.wait(timeout)
+                pending = self._pending(cursor)
+            if pending is None:
+                pending = [format_event('snapshot', dict(self._snapshot(), **(extra or {})), self.seq)]
+            return ''.join(pending), self.seq
+
+    def stream(self, last_seq=None, heartbeat=None, timeout=1.0, extra=None):
+        """
+        Generator of SSE text for one client, starting after last_seq (or
+        with a snapshot). heartbeat(), if given, is sent unnumbered when
+        nothing was published within `timeout` and its value changed.
+        extra is merged into every snapshot (e.g. the default source id).
+        """
+        cursor = last_seq
+        idle = IdleMessages(heartbeat)
+        while True:
+            text, cursor = self.read(cursor, extra, timeout)
+            yield text or idle.next()
+
+
+class IdleMessages:
+    """What an SSE stream sends when nothing was published: a changed heartbeat or a keep-alive"""
+
+    def __init__(self, heartbeat=None):
+        self.heartbeat = heartbeat
+        self.last_beat = None
+
+    def next(self):
+        beat = self.heartbeat() if self.heartbeat is not None else None
+        if beat is not None and beat != self.last_beat:
+            self.last_beat = beat
+            return format_event('heartbeat', beat)
+        # Comment line: keeps proxies from timing out and notices disconnects
+        return ': keep-alive\n\n'
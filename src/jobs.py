@@ -0,0 +1,142 @@
+"""
+SpotLight Upload Jobs
+Background processing of uploaded images/videos with a content-hash cache
+"""
+
+import glob
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobQueue:
+    """
+    Runs uploaded files through process(input_path, result_stem, progress,
+    settings) on a small worker pool so Flask request threads never block
+    on a long video. process() writes its output next to result_stem and
+    returns the output path plus a summary dict.
+
+    settings() is called once per upload, when it is submitted, and the job
+    runs with what it returned (e.g. a copy of the detector settings), so
+    later changes don't affect queued jobs. Results and their summaries are
+    cached by a hash of the file contents plus cache_key(settings), so
+    re-uploading the same file returns the stored result immediately, even
+    after a restart.
+    """
+
+    def __init__(self, process, upload_dir, results_dir, workers=1, settings=None, cache_key=None, max_jobs=200):
+        self.process = process
+        self.upload_dir = upload_dir
+        self.results_dir = results_dir
+        self.settings = settings or (lambda: None)
+        self.cache_key = cache_key or (lambda settings: '')
+        self.max_jobs = max_jobs
+
+        self.jobs = OrderedDict()
+        self._active = {}  # content key -> job id still queued/running
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix='spotlight-job')
+
+        os.makedirs(upload_dir, exist_ok=True)
+        os.makedirs(results_dir, exist_ok=True)
+
+    def _save_upload(self, stream, filename, settings):
+        """Copy the upload to disk in chunks, hashing it on the way"""
+        digest = hashlib.sha256()
+        ext = os.path.splitext(filename)[1].lower()
+        path = os.path.join(self.upload_dir, f"{uuid.uuid4().hex}{ext}")
+        with open(path, 'wb') as f:
+            for chunk in iter(lambda: stream.read(1 << 20), b''):
+                digest.update(chunk)
+                f.write(chunk)
+        settings_hash = hashlib.sha256(self.cache_key(settings).encode()).hexdigest()[:8]
+        return path, f"{digest.hexdigest()[:24]}-{settings_hash}"
+
+    def _summary_path(self, key):
+        return os.path.join(self.results_dir, f"{key}_summary.json")
+
+    def _cached_result(self, key):
+        """(result path, summary) stored for this key, or (None, None)"""
+        matches = glob.glob(os.path.join(self.results_dir, f"{key}_result.*"))
+        if not matches:
+            return None, None
+        try:
+            with open(self._summary_path(key)) as f:
+                summary = json.load(f)
+        except (OSError, ValueError):
+            summary = None
+        return matches[0], summary
+
+    def _store_summary(self, key, summary):
+        # Written under another name first so a half-written file is never read
+        path = self._summary_path(key)
+        with open(path + '.partial', 'w') as f:
+            json.dump(summary, f)
+        os.replace(path + '.partial', path)
+
+    def submit(self, stream, filename):
+        settings = self.settings()
+        path, key = self._save_upload(stream, filename, settings)
+        job = {
+            'job_id': uuid.uuid4().hex[:12],
+            'filename': filename,
+            'status': 'queued',
+            'progress': 0.0,
+            'cached': False,
+            'result': None,
+            'summary': None,
+            'error': None,
+            'created': time.time(),
+        }
+
+        with self._lock:
+            # Same file already being processed: hand back that job
+            if key in self._active:
+                os.remove(path)
+                return self.jobs[self._active[key]]
+
+            cached, summary = self._cached_result(key)
+            if cached:
+                os.remove(path)
+                job.update(status='done', progress=1.0, cached=True, result=cached, summary=summary)
+            else:
+                self._active[key] = job['job_id']
+
+            self.jobs[job['job_id']] = job
+            while len(self.jobs) > self.max_jobs:
+                oldest = next(iter(self.jobs))
+                if self.jobs[oldest]['status'] not in ('done', 'error'):
+                    break
+                self.jobs.popitem(last=False)
+
+        if not job['cached']:
+            self._executor.submit(self._run, job, path, key, settings)
+        return job
+
+    def _run(self, job, path, key, settings):
+        job['status'] = 'running'
+
+        def progress(fraction):
+            job['progress'] = round(min(max(fraction, 0.0), 1.0), 3)
+
+        try:
+            result, summary = self.process(path, os.path.join(self.results_dir, f"{key}_result"), progress,
+                                           settings)
+            self._store_summary(key, summary)
+            job.update(status='done', progress=1.0, result=result, summary=summary)
+        except Exception as e:
+            print(f"Upload job {job['job_id']} failed: {e}")
+            job.update(status='error', error=str(e))
+        finally:
+            with self._lock:
+                self._active.pop(key, None)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
@@ -0,0 +1,165 @@
+"""
+SpotLight Metrics
+Per-stage latency histograms and counters in Prometheus text format
+"""
+
+import bisect
+import threading
+
+# Seconds; covers a sub-millisecond encode up to a slow CPU inference batch
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _format_labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Sharded:
+    """
+    Per-thread storage: each thread only ever writes its own shard, so
+    the per-frame path takes no lock. Shards are summed when scraped, and
+    kept after their thread exits so totals never go backwards.
+    """
+
+    def __init__(self, name, documentation, labelnames):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def _snapshots(self):
+        with self._lock:
+            shards = list(self._shards)
+        # dict() copies in one step under the GIL, even while a thread writes
+        return [dict(shard) for shard in shards]
+
+
+class Counter(_Sharded):
+    type = 'counter'
+
+    def inc(self, amount=1, *labels):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def samples(self):
+        totals = {}
+        for shard in self._snapshots():
+            for labels, value in shard.items():
+                totals[labels] = totals.get(labels, 0) + value
+        return [(self.name, labels, '', value) for labels, value in sorted(totals.items())]
+
+
+class Histogram(_Sharded):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        shard = self._shard()
+        entry = shard.get(labels)
+        if entry is None:
+            # Per-bucket counts (the last one is +Inf) followed by the sum
+            entry = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        entry[bisect.bisect_left(self.buckets, value)] += 1
+        entry[-1] += value
+
+    def samples(self):
+        totals = {}
+        for shard in self._snapshots():
+            for labels, entry in shard.items():
+                total = totals.setdefault(labels, [0] * len(entry))
+                for i, value in enumerate(list(entry)):
+                    total[i] += value
+
+        samples = []
+        for labels, entry in sorted(totals.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), entry[:-1]):
+                cumulative += count
+                samples.append((f'{self.name}_bucket', labels, f'le="{bound}"', cumulative))
+            samples.append((f'{self.name}_sum', labels, '', entry[-1]))
+            samples.append((f'{self.name}_count', labels, '', cumulative))
+        return samples
+
+
+class Collector:
+    """Values read at scrape time from collect() -> [(label_values, value), ...]"""
+
+    def __init__(self, name, documentation, labelnames, collect, type='gauge'):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.collect = collect
+        self.type = type
+
+    def samples(self):
+        return [(self.name, tuple(labels), '', value) for labels, value in self.collect()]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            # Re-registering (e.g. after a module reload) replaces the old metric
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def collector(self, name, documentation, labelnames, collect, type='gauge'):
+        return self._register(Collector(name, documentation, labelnames, collect, type))
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        lines = []
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            for name, labels, extra, value in metric.samples():
+                lines.append(f'{name}{_format_labels(metric.labelnames, labels, extra)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'spotlight_stage_seconds',
+    'Time spent per pipeline stage: capture, preprocess, inference, postprocess, drawing, encode',
+    ('stage',))
+DETECTIONS = REGISTRY.counter(
+    'spotlight_detections_total', 'Objects detected, by class', ('class',))
+CAPTURE_ERRORS = REGISTRY.counter(
+    'spotlight_capture_errors_total', 'Frame reads that raised or failed and stopped a stream, by source', ('source',))
@@ -0,0 +1,72 @@
+"""
+SpotLight Motion Gate
+Cheap frame differencing that skips inference while the scene is static
+"""
+
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """
+    Compares a downscaled, blurred grayscale copy of each frame against the
+    last frame that went to the detector. If fewer than `threshold` (a
+    fraction) of the pixels changed by more than `pixel_delta`, the frame is
+    skipped and the previous detections stay valid. `refresh_interval`
+    forces a detection now and then so slow drift is eventually picked up.
+    Gating is per frame: a frame that moved is detected whole.
+    """
+
+    def __init__(self, threshold=0.01, pixel_delta=25, size=(80, 60), refresh_interval=300):
+        self.threshold = threshold
+        self.pixel_delta = pixel_delta
+        self.size = size
+        self.refresh_interval = refresh_interval
+
+        self.checked = 0
+        self.skipped = 0
+        self.last_change = 0.0
+        self._reference = None
+        self._since_refresh = 0
+
+    def reset(self):
+        self._reference = None
+
+    def _thumbnail(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        small = cv2.resize(gray, self.size, interpolation=cv2.INTER_AREA)
+        return cv2.GaussianBlur(small, (5, 5), 0)
+
+    def check(self, frame):
+        """True if the frame changed enough to be worth running the detector on"""
+        self.checked += 1
+        thumbnail = self._thumbnail(frame)
+
+        if self._reference is None or self._since_refresh >= self.refresh_interval:
+            return self._accept(thumbnail)
+
+        changed = cv2.absdiff(thumbnail, self._reference) > self.pixel_delta
+        self.last_change = float(np.count_nonzero(changed)) / changed.size
+        if self.last_change >= self.threshold:
+            return self._accept(thumbnail)
+
+        self.skipped += 1
+        self._since_refresh += 1
+        return False
+
+    def _accept(self, thumbnail):
+        self._reference = thumbnail
+        self._since_refresh = 0
+        return True
+
+    @property
+    def skip_ratio(self):
+        return self.skipped / self.checked if self.checked else 0.0
+
+    def get_stats(self):
+        return {
+            'checked': self.checked,
+            'skipped': self.skipped,
+            'skip_ratio': round(self.skip_ratio, 3),
+            'last_change': round(self.last_change, 4),
+        }
@@ -0,0 +1,29 @@
+"""
+SpotLight Overlay
+Draws detection boxes and labels onto frames
+"""
+
+import functools
+
+import cv2
+
+
+@functools.lru_cache(maxsize=None)
+def hex_to_bgr(color):
+    return tuple(int(color[i:i+2], 16) for i in (5, 3, 1))
+
+
+def draw_detections(frame, detections):
+    for item in detections:
+        x1, y1, x2, y2 = item['bbox']
+        color = hex_to_bgr(item['color'])
+        
+        cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+        
+        label = f"{item['name']}: {item['confidence']}"
+        if item.get('track_id') is not None:
+            label = f"#{item['track_id']} {label}"
+        label_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 2)[0]
+        cv2.rectangle(frame, (x1, y1-20), (x1+label_size[0], y1), color, -1)
+        cv2.putText(frame, label, (x1, y1-5), 
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
@@ -0,0 +1,508 @@
+"""
+SpotLight Frame Pipeline
+Runs capture, inference and JPEG encoding on separate threads so the
+video stream keeps up with the camera while detection runs in the background
+"""
+
+import threading
+import time
+from collections import deque
+
+from buffers import FramePool
+from encoding import EncodeTier, JpegEncoder, mjpeg_part
+from metrics import CAPTURE_ERRORS, STAGE_SECONDS
+from motion import MotionGate
+from scheduler import AdaptiveScheduler
+
+
+class LatestFrameQueue:
+    """
+    Bounded queue that drops the oldest entry instead of blocking the
+    producer. on_drop(item) is called for entries that are dropped or
+    cleared, so their frames can be handed back.
+    """
+
+    def __init__(self, maxsize=1, on_drop=None):
+        self._items = deque(maxlen=maxsize)
+        self._cond = threading.Condition()
+        self.on_drop = on_drop
+        self.dropped = 0
+
+    def put(self, item):
+        dropped = None
+        with self._cond:
+            if len(self._items) == self._items.maxlen:
+                self.dropped += 1
+                dropped = self._items[0]
+            self._items.append(item)
+            self._cond.notify()
+        if dropped is not None and self.on_drop is not None:
+            self.on_drop(dropped)
+
+    def get(self, timeout=None):
+        """Pop the oldest entry, or return None if nothing arrives before timeout"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items, timeout):
+                return None
+            return self._items.popleft()
+
+    def clear(self):
+        with self._cond:
+            items = list(self._items)
+            self._items.clear()
+        if self.on_drop is not None:
+            for item in items:
+                self.on_drop(item)
+
+    def __len__(self):
+        return len(self._items)
+
+
+class FpsCounter:
+    """Frames-per-second counter refreshed roughly once a second"""
+
+    def __init__(self):
+        self.fps = 0.0
+        self._count = 0
+        self._start = time.time()
+
+    def tick(self):
+        self._count += 1
+        elapsed = time.time() - self._start
+        if elapsed > 1:
+            self.fps = self._count / elapsed
+            self._count = 0
+            self._start = time.time()
+
+
+class FrameBroadcaster:
+    """
+    Fans each encoded frame out to any number of subscribers.
+
+    Every subscriber gets its own single-slot queue, so a slow client only
+    skips frames for itself and never holds up the producer or other clients.
+    A subscriber can also be any object with put(data), `dropped` and
+    optionally `clients` (how many clients it stands for), such as a relay
+    to an event loop.
+    """
+
+    def __init__(self, queue_size=1):
+        self.queue_size = queue_size
+        self.frames_published = 0
+        self._skipped_closed = 0
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    @property
+    def client_count(self):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        return sum(getattr(queue, 'clients', 1) for queue in subscribers)
+
+    def subscribe(self, queue=None):
+        queue = queue if queue is not None else LatestFrameQueue(self.queue_size)
+        with self._lock:
+            self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        with self._lock:
+            if queue in self._subscribers:
+                self._subscribers.discard(queue)
+                self._skipped_closed += queue.dropped
+
+    def publish(self, data):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for queue in subscribers:
+            queue.put(data)
+        self.frames_published += 1
+
+    def stream(self, is_running=None, timeout=0.5):
+        """Yield published frames for one client until it disconnects"""
+        is_running = is_running or (lambda: True)
+        queue = self.subscribe()
+        try:
+            while is_running():
+                data = queue.get(timeout=timeout)
+                if data is not None:
+                    yield data
+        finally:
+            self.unsubscribe(queue)
+
+    def get_stats(self):
+        with self._lock:
+            skipped = self._skipped_closed + sum(queue.dropped for queue in self._subscribers)
+        return {
+            'clients': self.client_count,
+            'frames_published': self.frames_published,
+            'frames_skipped': skipped,
+        }
+
+
+class SourceStream:
+    """
+    Capture and encode threads for a single frame source.
+
+    Captured frames go to a single-slot inference queue that the shared
+    inference stage drains, and to the encoder, which overlays the most
+    recent detections for this source and broadcasts the JPEG. An adaptive
+    scheduler only submits every K-th frame for inference, and a motion gate
+    drops frames where the scene hasn't changed. With an ObjectTracker (the
+    one that assigns the detections' track IDs), the boxes drawn are its
+    predictions, moved along between runs.
+
+    Clients that draw the boxes themselves subscribe to a raw stream
+    instead, and every client can ask for a JPEG quality/width tier. Each
+    (overlay, tier) combination in use is encoded once per frame, framed as
+    a multipart part once, and the same bytes are written to every client.
+    If read_encoded() returns the source's own JPEG bytes for the frame just
+    read, those are passed through for full-size raw clients. read_wait()
+    is how long the last read_frame() slept to play back in real time,
+    which the capture latency leaves out. Annotated
+    copies are drawn into pooled buffers.
+
+    Captured frames may come from the source's frame_pool. The encode
+    queue, the inference queue and latest_frame each hold a frame and
+    release it to that pool when done, so the source can reuse it.
+    """
+
+    def __init__(self, source_id, read_frame, draw, should_detect, frame_ready, queue_size=1,
+                 target_fps=30, motion_threshold=None, gate_motion=None, read_encoded=None, frame_pool=None,
+                 tracker=None, read_wait=None):
+        self.source_id = source_id
+        self.read_frame = read_frame
+        self.read_encoded = read_encoded
+        self.read_wait = read_wait
+        # A pool without buffers tracks nothing, so retain/release do nothing
+        self.frame_pool = frame_pool if frame_pool is not None else FramePool(0)
+        self.draw = draw
+        self.should_detect = should_detect
+        self.frame_ready = frame_ready
+
+        # Each queue only keeps the newest frames; stale ones are dropped
+        self.inference_queue = LatestFrameQueue(1, on_drop=lambda item: self.frame_pool.release(item[1]))
+        self.encode_queue = LatestFrameQueue(queue_size, on_drop=lambda item: self.frame_pool.release(item[1]))
+        self.queue_size = queue_size
+
+        # One broadcaster per (raw, tier) that a client has asked for
+        self.encoder = JpegEncoder()
+        self.draw_pool = FramePool(4)
+        self._outputs = {}
+        self._outputs_lock = threading.Lock()
+
+        self.scheduler = AdaptiveScheduler(target_fps)
+        self.tracker = tracker
+        self.motion_gate = MotionGate(motion_threshold) if motion_threshold else None
+        self.gate_motion = gate_motion or (lambda: True)
+
+        self.latest_frame = None
+        self._latest_lock = threading.Lock()
+        self.detections = []
+        self.running = False
+        self.error = None  # why capture stopped, if it did
+
+        self._fps = {
+            'capture': FpsCounter(),
+            'inference': FpsCounter(),
+            'encode': FpsCounter(),
+        }
+        self._threads = []
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.error = None
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name=f'spotlight-capture-{self.source_id}', daemon=True),
+            threading.Thread(target=self._encode_loop, name=f'spotlight-encode-{self.source_id}', daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self.running = False
+        for thread in self._threads:
+            thread.join(timeout=1)
+        self._threads = []
+
+    def set_detections(self, detections, frame_index, latency):
+        # Already matched to tracks by whoever ran the detector
+        self.detections = detections
+        self.scheduler.record(latency)
+        self._fps['inference'].tick()
+
+    def clear_detections(self):
+        # Tracks (and object counts) survive; only the drawn boxes go
+        self.detections = []
+        self.scheduler.reset()
+        if self.motion_gate is not None:
+            self.motion_gate.reset()
+        self.inference_queue.clear()
+
+    def _capture_loop(self):
+        frame_index = 0
+        while self.running:
+            start = time.perf_counter()
+            try:
+                success, frame = self.read_frame()
+            except Exception as e:
+                self._capture_failed(f"Capture error: {e}")
+                break
+            elapsed = time.perf_counter() - start
+            if self.read_wait is not None:
+                # Only the decode; sleeping to the frame rate isn't capture cost
+                elapsed = max(0.0, elapsed - self.read_wait())
+            STAGE_SECONDS.observe(elapsed, 'capture')
+            if not success:
+                self._capture_failed("Capture failed")
+                break
+
+            frame_index += 1
+            with self._latest_lock:
+                previous, self.latest_frame = self.latest_frame, self.frame_pool.retain(frame)
+            self.frame_pool.release(previous)
+            if self.should_detect() and self.scheduler.due(frame_index) and self._has_motion(frame):
+                self.inference_queue.put((frame_index, self.frame_pool.retain(frame)))
+                self.frame_ready.set()
+            encoded = self.read_encoded() if self.read_encoded is not None else None
+            # The encode queue takes over the capture thread's reference
+            self.encode_queue.put((frame_index, frame, encoded))
+            self._fps['capture'].tick()
+
+    def _capture_failed(self, error):
+        # Stopping ends every client's stream instead of leaving it waiting
+        print(f"{error} on source '{self.source_id}', stopping stream")
+        CAPTURE_ERRORS.inc(1, self.source_id)
+        self.error = error
+        self.running = False
+
+    def copy_latest(self):
+        """A copy of the most recently captured frame, or None"""
+        with self._latest_lock:
+            return self.latest_frame.copy() if self.latest_frame is not None else None
+
+    def _has_motion(self, frame):
+        # A static scene keeps the previous detections instead of re-running the model
+        if self.motion_gate is None or not self.gate_motion():
+            return True
+        return self.motion_gate.check(frame)
+
+    def _encode_loop(self):
+        while self.running:
+            item = self.encode_queue.get(timeout=0.1)
+            if item is None:
+                continue
+            frame_index, frame, encoded = item
+            try:
+                self._encode(frame_index, frame, encoded)
+            finally:
+                self.frame_pool.release(frame)
+
+    def _encode(self, frame_index, frame, encoded):
+        # Nobody is watching, so skip the drawing and encoding work
+        with self._outputs_lock:
+            outputs = [(key, b) for key, b in self._outputs.items() if b.client_count]
+        if not outputs:
+            return
+
+        annotated = None
+        resized = {}  # (id(frame), width) -> resized frame
+        parts = {}  # (id(frame), tier) -> multipart part, so each tier is encoded once
+        for (raw, tier), broadcaster in outputs:
+            image = frame
+            if not raw:
+                if annotated is None:
+                    annotated = self._annotate(frame, frame_index)
+                image = annotated
+
+            key = (id(image), tier)
+            if key not in parts:
+                if image is frame and tier.is_default and encoded is not None:
+                    # The source's own JPEG: pass it through untouched
+                    self.encoder.record(tier, 0.0, len(encoded))
+                    jpeg = encoded
+                else:
+                    size_key = (id(image), tier.width)
+                    if size_key not in resized:
+                        resized[size_key] = self.encoder.resize(image, tier)
+                    jpeg = self.encoder.encode(resized[size_key], tier)
+                parts[key] = mjpeg_part(jpeg) if jpeg is not None else None
+            if parts[key] is not None:
+                broadcaster.publish(parts[key])
+        # Parts are bytes, so the resized and drawn buffers can be reused
+        for image in resized.values():
+            if image is not frame and image is not annotated:
+                self.encoder.recycle(image)
+        if annotated is not frame:
+            self.draw_pool.release(annotated)
+        self._fps['encode'].tick()
+
+    def _annotate(self, frame, frame_index):
+        # Overlay the most recent completed inference, moved along its
+        # tracks to now; copy first so the inference stage never sees the
+        # boxes. With nothing to draw the raw frame (and its JPEGs) is reused.
+        detections = self.detections
+        if detections and self.tracker is not None:
+            detections = self.tracker.predict(time.time())
+        if not detections:
+            return frame
+        start = time.perf_counter()
+        frame = self.draw_pool.copy(frame)
+        self.draw(frame, detections)
+        STAGE_SECONDS.observe(time.perf_counter() - start, 'drawing')
+        return frame
+
+    def frames(self, raw=False, tier=None):
+        """
+        Yield multipart/x-mixed-replace parts (boundary encoding.BOUNDARY),
+        one JPEG each, for one client. Raw frames carry no overlay; tier
+        picks the JPEG quality and width (full size by default).
+        """
+        return self.broadcaster(raw, tier).stream(lambda: self.running)
+
+    def broadcaster(self, raw=False, tier=None):
+        """The FrameBroadcaster for one (overlay, tier) output, created on first use"""
+        key = (raw, tier or EncodeTier())
+        with self._outputs_lock:
+            broadcaster = self._outputs.get(key)
+            if broadcaster is None:
+                broadcaster = self._outputs[key] = FrameBroadcaster(self.queue_size)
+        return broadcaster
+
+    def get_stats(self):
+        stats = {
+            'running': self.running,
+            'error': self.error,
+            'capture_fps': round(self._fps['capture'].fps, 1),
+            'inference_fps': round(self._fps['inference'].fps, 1),
+            'encode_fps': round(self._fps['encode'].fps, 1),
+            'queue_depth': {
+                'inference': len(self.inference_queue),
+                'encode': len(self.encode_queue),
+            },
+            'dropped': {
+                'inference': self.inference_queue.dropped,
+                'encode': self.encode_queue.dropped,
+            },
+            'scheduler': self.scheduler.get_stats(),
+            'motion': self.motion_gate.get_stats() if self.motion_gate is not None else None,
+        }
+        with self._outputs_lock:
+            outputs = {f"{'raw' if raw else 'annotated'} {tier}": broadcaster.get_stats()
+                       for (raw, tier), broadcaster in self._outputs.items()}
+        stats['clients'] = sum(output['clients'] for output in outputs.values())
+        stats['outputs'] = outputs
+        stats['encoder'] = self.encoder.name
+        stats['tiers'] = self.encoder.get_stats()
+        stats['draw_buffers'] = self.draw_pool.get_stats()
+        return stats
+
+
+class DetectionPipeline:
+    """
+    Multi-source capture -> batched inference -> per-source encode pipeline.
+
+    Each source gets its own capture and encode threads. A single inference
+    thread collects the newest pending frame from every source and runs them
+    through detect_batch(frames, source_ids) in one call, which returns one
+    detection list per frame; results are routed back to the matching source.
+    draw(frame, detections) overlays detections in place and
+    should_detect(source_id) decides whether that source's captured frames
+    are handed to inference at all. With a
+    motion_threshold, frames are only detected when the scene changed, as
+    long as gate_motion() is true (the web app gates continuous mode only).
+    """
+
+    def __init__(self, detect_batch, draw, should_detect=None, queue_size=1, target_fps=30,
+                 motion_threshold=None, gate_motion=None):
+        self.detect_batch = detect_batch
+        self.draw = draw
+        self.should_detect = should_detect or (lambda source_id: True)
+        self.queue_size = queue_size
+        self.target_fps = target_fps
+        self.motion_threshold = motion_threshold
+        self.gate_motion = gate_motion
+
+        self.streams = {}
+        self.running = False
+        self.last_batch_size = 0
+
+        self._frame_ready = threading.Event()
+        self._fps = FpsCounter()
+        self._thread = None
+
+    def add_source(self, source_id, read_frame, read_encoded=None, frame_pool=None, tracker=None, read_wait=None):
+        stream = SourceStream(source_id, read_frame, self.draw, lambda: self.should_detect(source_id),
+                              self._frame_ready, self.queue_size, self.target_fps,
+                              self.motion_threshold, self.gate_motion, read_encoded, frame_pool, tracker,
+                              read_wait)
+        self.streams[source_id] = stream
+        if self.running:
+            stream.start()
+        return stream
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        for stream in self.streams.values():
+            stream.start()
+        self._thread = threading.Thread(target=self._inference_loop, name='spotlight-inference', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.running = False
+        for stream in self.streams.values():
+            stream.stop()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def clear_detections(self):
+        for stream in self.streams.values():
+            stream.clear_detections()
+
+    def _inference_loop(self):
+        while self.running:
+            if not self._frame_ready.wait(timeout=0.1):
+                continue
+            self._frame_ready.clear()
+
+            # Gather the newest pending frame from every source into one batch
+            batch = []
+            for stream in list(self.streams.values()):
+                item = stream.inference_queue.get(timeout=0)
+                if item is not None:
+                    batch.append((stream, item[0], item[1]))
+            if not batch:
+                continue
+
+            start = time.perf_counter()
+            try:
+                results = self.detect_batch([frame for _, _, frame in batch],
+                                            [stream.source_id for stream, _, _ in batch])
+            except Exception as e:
+                print(f"Detection error: {e}")
+                continue
+            finally:
+                for stream, _, frame in batch:
+                    stream.frame_pool.release(frame)
+            latency = time.perf_counter() - start
+
+            for (stream, frame_index, _), detections in zip(batch, results):
+                stream.set_detections(detections, frame_index, latency)
+            self.last_batch_size = len(batch)
+            self._fps.tick()
+
+    def frames(self, source_id, raw=False, tier=None):
+        return self.streams[source_id].frames(raw, tier)
+
+    def get_stats(self):
+        return {
+            'sources': len(self.streams),
+            'inference_batches_per_sec': round(self._fps.fps, 1),
+            'last_batch_size': self.last_batch_size,
+            'streams': {source_id: stream.get_stats() for source_id, stream in self.streams.items()},
+        }
@@ -0,0 +1,96 @@
+"""
+SpotLight Post-processing
+Vectorized filtering of YOLO results into detection records
+"""
+
+import numpy as np
+
+
+class ClassTable:
+    """
+    Lookup tables indexed by COCO class id, precomputed once from the
+    items_to_detect / categories / category_colors dictionaries so that
+    per-frame filtering is a handful of NumPy indexing operations.
+    """
+
+    def __init__(self, items_to_detect, categories, category_colors, default_color=None):
+        size = max(list(items_to_detect) + [i for ids in categories.values() for i in ids]) + 1
+
+        self.items_to_detect = items_to_detect
+        self.category_names = list(categories) + ['Other']
+        self.whitelist = np.zeros(size, dtype=bool)
+        self.whitelist[list(items_to_detect)] = True
+
+        other = len(self.category_names) - 1
+        self.category_index = np.full(size, other, dtype=np.int32)
+        for index, (cat, ids) in enumerate(categories.items()):
+            self.category_index[ids] = index
+
+        self.names = [items_to_detect.get(i) for i in range(size)]
+        self.colors = [category_colors.get(cat, default_color) for cat in self.category_names]
+
+    def category_of(self, class_id):
+        if 0 <= class_id < len(self.category_index):
+            return self.category_names[self.category_index[class_id]]
+        return 'Other'
+
+    def category_id(self, category):
+        """Index of a category name, or -1 if it is unknown"""
+        try:
+            return self.category_names.index(category)
+        except ValueError:
+            return -1
+
+
+def boxes_to_arrays(boxes):
+    """Pull xyxy, confidence and class id out of ultralytics Boxes in one transfer"""
+    data = boxes.data
+    if hasattr(data, 'cpu'):
+        data = data.cpu().numpy()
+    data = np.asarray(data, dtype=np.float32)
+    # Columns are x1, y1, x2, y2, [track id,] conf, cls
+    return data[:, :4], data[:, -2], data[:, -1].astype(np.int32)
+
+
+def filter_mask(table, conf, cls, conf_threshold=0.4, category=None):
+    """Boolean mask of boxes on the whitelist, above threshold and in the category"""
+    in_table = (cls >= 0) & (cls < len(table.whitelist))
+    safe_cls = np.where(in_table, cls, 0)
+    mask = in_table & table.whitelist[safe_cls] & (conf > conf_threshold)
+    if category:
+        mask &= table.category_index[safe_cls] == table.category_id(category)
+    return mask
+
+
+def build_detections(table, xyxy, conf, cls, conf_threshold=0.4, category=None):
+    """Filter raw arrays and emit detection records in bulk"""
+    mask = filter_mask(table, conf, cls, conf_threshold, category)
+    if not mask.any():
+        return []
+
+    cls = cls[mask]
+    cat_index = table.category_index[cls]
+    bboxes = xyxy[mask].astype(np.int32).tolist()
+    confidences = np.round(conf[mask].astype(np.float64), 2).tolist()
+    names = table.names
+    category_names = table.category_names
+    colors = table.colors
+
+    return [
+        {
+            'name': names[c],
+            'category': category_names[k],
+            'confidence': score,
+            'bbox': bbox,
+            'color': colors[k],
+        }
+        for c, k, score, bbox in zip(cls.tolist(), cat_index.tolist(), confidences, bboxes)
+    ]
+
+
+def process_result(table, result, conf_threshold=0.4, category=None):
+    """Convert one ultralytics Results object into detection records"""
+    if len(result.boxes) == 0:
+        return []
+    xyxy, conf, cls = boxes_to_arrays(result.boxes)
+    return build_detections(table, xyxy, conf, cls, conf_threshold, category)
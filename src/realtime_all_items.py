@@ -1,277 +1,332 @@
-import cv2
-from ultralytics import YOLO
+"""
+SpotLight CLI
+Real-time detection in an OpenCV window, or headless with JSONL output
+"""
+
+import argparse
+import json
+import os
+import sys
 import time
-import torch
-
-print("Multi-Object Detection with YOLOv8")
-print("=" * 40)
-
-# Load YOLOv8 model
-print("Loading YOLOv8 model...")
-model = YOLO('yolov8m.pt')
-
-# Define categories of items to detect
-# YOLOv8 COCO classes we're interested in:
-items_to_detect = {
-    # Furniture
-    56: 'chair',
-    57: 'couch',
-    59: 'bed',
-    60: 'dining table',
-    
-    # Electronics
-    62: 'tv/monitor',
-    63: 'laptop',
-    64: 'mouse',
-    65: 'remote',
-    66: 'keyboard',
-    67: 'cell phone',
-    
-    # Kitchen items
-    46: 'banana',
-    47: 'apple',
-    49: 'orange',
-    43: 'knife',
-    44: 'spoon',
-    45: 'fork',
-    39: 'bottle',
-    41: 'cup',
-    40: 'wine glass',
-    42: 'bowl',
-    
-    # Office/Room items
-    73: 'book',
-    74: 'clock',
-    75: 'vase',
-    76: 'scissors',
-    84: 'potted plant',
-    
-    # Other useful items
-    0: 'person',
-    15: 'cat',
-    16: 'dog',
-    26: 'handbag',
-    27: 'suitcase',
-    28: 'backpack',
-}
-
-# Group items by category for display
-categories = {
-    'Furniture': [56, 57, 59, 60],
-    'Electronics': [62, 63, 64, 65, 66, 67],
-    'Kitchen': [39, 40, 41, 42, 43, 44, 45, 46, 47, 49],
-    'Office/Decor': [73, 74, 75, 76, 84],
-    'Living': [0, 15, 16, 26, 27, 28]
-}
-
-# Colors for each category
-category_colors = {
-    'Furniture': (0, 255, 0),      # Green
-    'Electronics': (255, 0, 0),     # Blue
-    'Kitchen': (0, 255, 255),       # Yellow
-    'Office/Decor': (255, 0, 255),  # Magenta
-    'Living': (0, 165, 255)         # Orange
-}
-
-print("Model loaded!")
-print(f"\nDetecting {len(items_to_detect)} types of objects:")
-for cat, items in categories.items():
-    print(f"\n{cat}:")
-    for item_id in items:
-        if item_id in items_to_detect:
-            print(f"  - {items_to_detect[item_id]}")
-
-# Open camera
-cap = cv2.VideoCapture(0)
-cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-
-if not cap.isOpened():
-    print("\nError: Cannot open camera")
-    exit()
-
-print("\n✅ Camera ready!")
-print("\nCONTROLS:")
-print("- SPACE: Detect objects")
-print("- 'c': Toggle continuous mode")
-print("- 'f': Filter mode (show only specific categories)")
-print("- 's': Save screenshot")
-print("- 'q': Quit")
-
-cv2.namedWindow('Object Detection', cv2.WINDOW_NORMAL)
-
-continuous_mode = False
-filter_mode = None
-last_results = None
-fps_time = time.time()
-fps_counter = 0
-current_fps = 0
-
-def get_category(class_id):
-    """Get category name for a class ID"""
-    for cat, items in categories.items():
-        if class_id in items:
-            return cat
-    return 'Other'
-
-while True:
-    ret, frame = cap.read()
-    if not ret:
-        continue
-    
-    display_frame = frame.copy()
-    
-    # Calculate FPS
-    fps_counter += 1
-    if time.time() - fps_time > 1:
-        current_fps = fps_counter / (time.time() - fps_time)
-        fps_counter = 0
-        fps_time = time.time()
-    
-    # Show status
-    status_y = 30
-    cv2.putText(display_frame, f"FPS: {current_fps:.1f}", (10, status_y), 
-                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
-    status_y += 25
-    
-    mode_text = "CONTINUOUS" if continuous_mode else "Press SPACE"
-    color = (0, 255, 0) if continuous_mode else (255, 255, 0)
-    cv2.putText(display_frame, f"Mode: {mode_text}", (10, status_y), 
-                cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
-    status_y += 25
-    
-    if filter_mode:
-        cv2.putText(display_frame, f"Filter: {filter_mode}", (10, status_y), 
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 0, 255), 2)
-    
-    # Process frame
-    key = cv2.waitKey(1) & 0xFF
-    
-    if continuous_mode or key == 32:  # SPACE
-        try:
-            # Run detection
-            with torch.no_grad():
-                results = model(frame, verbose=False)
-            
-            # Process results
-            detected_items = []
-            
-            if len(results[0].boxes) > 0:
-                for box in results[0].boxes:
-                    cls_id = int(box.cls[0])
-                    conf = float(box.conf[0])
-                    
-                    # Check if we want to detect this item
-                    if cls_id in items_to_detect and conf > 0.4:
-                        category = get_category(cls_id)
-                        
-                        # Apply filter if active
-                        if filter_mode and category != filter_mode:
-                            continue
-                        
-                        detected_items.append({
-                            'name': items_to_detect[cls_id],
-                            'category': category,
-                            'conf': conf,
-                            'box': box
-                        })
-                
+
+import cv2
+
+from backends import BACKENDS, backend_settings_from_env, create_backend
+from buffers import FramePool
+from classes import categories, category_colors, class_table, items_to_detect
+from detector import DetectorConfig
+from motion import MotionGate
+from overlay import draw_detections, hex_to_bgr
+from postprocess import build_detections
+from scheduler import AdaptiveScheduler
+from sources import open_source, parse_source_specs, source_options_from_env
+from tiling import tiling_settings, tiling_settings_from_env
+from tracking import ObjectTracker
+
+# 'f' cycles through these
+FILTERS = [None] + list(categories)
+
+
+def log(*args):
+    # Status goes to stderr so headless stdout stays one JSON object per line
+    print(*args, file=sys.stderr)
+
+
+class DetectionEngine:
+    """
+    Detection on one stream of frames. In continuous mode only every K-th
+    frame is detected (K tuned from the measured inference time) and only
+    when the scene changed; the tracker moves the boxes along in between.
+    Detections get persistent track IDs, so each object is counted once.
+    """
+
+    def __init__(self, backend, config, target_fps=30, motion_threshold=0.01):
+        self.backend = backend
+        self.config = config
+        self.scheduler = AdaptiveScheduler(target_fps=target_fps)
+        self.motion_gate = MotionGate(threshold=motion_threshold)
+        self.objects = ObjectTracker()
+        self.showing = False  # overlay the tracker's boxes
+
+    @classmethod
+    def from_settings(cls, backend_settings=None, **config_values):
+        """Load the model; anything not in backend_settings comes from SPOTLIGHT_* variables"""
+        settings = dict(backend_settings_from_env(), **(backend_settings or {}))
+        config = DetectorConfig(class_table, **config_values)
+        log(f"Loading {settings['weights']} with the {settings['name']} backend...")
+        backend = create_backend(imgsz=config.imgsz, **settings)
+        log("Model loaded!")
+        return cls(backend, config,
+                   target_fps=float(os.environ.get('SPOTLIGHT_TARGET_FPS', 30)),
+                   motion_threshold=float(os.environ.get('SPOTLIGHT_MOTION_THRESHOLD', 0.01)))
+
+    def due(self, frame, frame_index):
+        return self.scheduler.due(frame_index) and self.motion_gate.check(frame)
+
+    def detect(self, frame, now=None):
+        """now: seconds for the object tracker, wall clock by default"""
+        start = time.perf_counter()
+        xyxy, conf, cls = self.backend.predict([frame], self.config)[0]
+        self.scheduler.record(time.perf_counter() - start)
+        detections = build_detections(class_table, xyxy, conf, cls, self.config.conf, self.config.category)
+        self.showing = True
+        return self.objects.update(detections, time.time() if now is None else now)
+
+    def overlay(self, now=None):
+        """Last detections moved along their tracks to `now` (wall clock by default)"""
+        return self.objects.predict(time.time() if now is None else now) if self.showing else []
+
+    def set_filter(self, category):
+        self.config.update(category=category)
+        self.showing = False
+        self.motion_gate.reset()
+
+    def reset(self):
+        self.showing = False
+        self.objects.clear()
+        self.scheduler.reset()
+        self.motion_gate.reset()
+
+
+def run_headless(engine, source, output, stride=1, max_frames=None):
+    """
+    Detect every `stride`-th frame as fast as the source delivers them and
+    write one JSON line per detected frame (the batch tool's JSONL shape).
+    Stops at the end of a file source, after max_frames, or on Ctrl+C.
+    Files replayed as fast as possible are tracked in video time.
+    """
+    fps = None if source.realtime else getattr(source, 'fps', None)
+    frame_index = detected = 0
+    start = time.perf_counter()
+    try:
+        while max_frames is None or frame_index < max_frames:
+            ret, frame = source.read()
+            if not ret:
+                break
+            if frame_index % stride == 0:
+                detections = engine.detect(frame, frame_index / fps if fps else None)
+                output.write(json.dumps({'source': source.name, 'frame': frame_index,
+                                         'detections': detections}) + '\n')
+                output.flush()
+                detected += 1
+            source.recycle(frame)
+            frame_index += 1
+    except (KeyboardInterrupt, BrokenPipeError):
+        # Ctrl+C, or the reader went away (e.g. piped into head)
+        pass
+    elapsed = time.perf_counter() - start
+    log(f"{detected} frames detected in {elapsed:.1f}s ({detected / elapsed if elapsed else 0:.1f} frames/s)")
+    log_objects(engine.objects.summary())
+
+
+def log_objects(summary):
+    log(f"{summary['unique_total']} unique objects")
+    for name, count in sorted(summary['unique'].items(), key=lambda item: -item[1]):
+        log(f"  {name}: {count} seen, {summary['dwell_seconds'].get(name, 0):.1f}s in view")
+
+
+def print_detections(detected_items):
+    print(f"\n✅ Found {len(detected_items)} items:")
+    # Group by category
+    by_category = {}
+    for item in detected_items:
+        by_category.setdefault(item['category'], []).append(item)
+
+    for cat, items in by_category.items():
+        print(f"\n{cat}:")
+        for item in items:
+            print(f"  - {item['name']}: {item['confidence']:.2f}")
+
+
+def run_interactive(engine, source):
+    print("\nCONTROLS:")
+    print("- SPACE: Detect objects")
+    print("- 'c': Toggle continuous mode")
+    print("- 'f': Filter mode (show only specific categories)")
+    print("- 's': Save screenshot")
+    print("- 'q': Quit")
+
+    cv2.namedWindow('Object Detection', cv2.WINDOW_NORMAL)
+
+    continuous_mode = False
+    filter_mode = None
+    fps_time = time.time()
+    fps_counter = 0
+    current_fps = 0
+    frame_index = 0
+    display_pool = FramePool(2)
+
+    while True:
+        ret, frame = source.read()
+        if not ret:
+            continue
+
+        # The status text goes on a copy; the detector sees the clean frame
+        display_frame = display_pool.copy(frame)
+        frame_index += 1
+
+        # Calculate FPS
+        fps_counter += 1
+        if time.time() - fps_time > 1:
+            current_fps = fps_counter / (time.time() - fps_time)
+            fps_counter = 0
+            fps_time = time.time()
+
+        # Show status
+        status_y = 30
+        cv2.putText(display_frame, f"FPS: {current_fps:.1f}", (10, status_y),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+        status_y += 25
+
+        mode_text = f"CONTINUOUS (detect 1/{engine.scheduler.interval})" if continuous_mode else "Press SPACE"
+        color = (0, 255, 0) if continuous_mode else (255, 255, 0)
+        cv2.putText(display_frame, f"Mode: {mode_text}", (10, status_y),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+        status_y += 25
+
+        if continuous_mode:
+            cv2.putText(display_frame, f"Static skip: {engine.motion_gate.skip_ratio:.0%}", (10, status_y),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+            status_y += 25
+
+        if filter_mode:
+            cv2.putText(display_frame, f"Filter: {filter_mode}", (10, status_y),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 0, 255), 2)
+            status_y += 25
+
+        cv2.putText(display_frame, f"Unique objects: {engine.objects.summary()['unique_total']}", (10, status_y),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
+
+        # Process frame
+        key = cv2.waitKey(1) & 0xFF
+
+        if key == 32 or (continuous_mode and engine.due(frame, frame_index)):  # SPACE
+            try:
+                detected_items = engine.detect(frame)
                 if detected_items:
                     if not continuous_mode or key == 32:
-                        print(f"\n✅ Found {len(detected_items)} items:")
-                        # Group by category
-                        by_category = {}
-                        for item in detected_items:
-                            cat = item['category']
-                            if cat not in by_category:
-                                by_category[cat] = []
-                            by_category[cat].append(item)
-                        
-                        for cat, items in by_category.items():
-                            print(f"\n{cat}:")
-                            for item in items:
-                                print(f"  - {item['name']}: {item['conf']:.2f}")
-                    
-                    last_results = detected_items
-                else:
-                    if not continuous_mode:
-                        print("\n❌ No items detected")
-                        
-        except Exception as e:
-            print(f"\n⚠️ Error: {str(e)}")
-    
-    # Draw detections
-    if last_results:
-        # Count items by category
-        category_counts = {}
-        
-        for item in last_results:
-            box = item['box']
-            x1, y1, x2, y2 = map(int, box.xyxy[0])
-            
-            # Get color for category
-            color = category_colors.get(item['category'], (255, 255, 255))
-            
-            # Draw box
-            cv2.rectangle(display_frame, (x1, y1), (x2, y2), color, 2)
-            
-            # Draw label
-            label = f"{item['name']}: {item['conf']:.2f}"
-            label_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 2)[0]
-            cv2.rectangle(display_frame, (x1, y1-20), (x1+label_size[0], y1), color, -1)
-            cv2.putText(display_frame, label, (x1, y1-5), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-            
-            # Count for summary
-            cat = item['category']
-            category_counts[cat] = category_counts.get(cat, 0) + 1
-        
-        # Show summary
-        summary_y = display_frame.shape[0] - 10
-        for cat, count in sorted(category_counts.items()):
-            color = category_colors.get(cat, (255, 255, 255))
-            text = f"{cat}: {count}"
-            cv2.putText(display_frame, text, (10, summary_y), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
-            summary_y -= 20
-    
-    # Show controls
-    cv2.putText(display_frame, "c:continuous f:filter s:save q:quit", 
-                (10, display_frame.shape[0] - 120), 
-                cv2.FONT_HERSHEY_SIMPLEX, 0.4, (200, 200, 200), 1)
-    
-    cv2.imshow('Object Detection', display_frame)
-    
-    # Handle keys
-    if key == ord('q'):
-        break
-    elif key == ord('c'):
-        continuous_mode = not continuous_mode
-        print(f"\n{'🟢' if continuous_mode else '🔴'} Continuous: {'ON' if continuous_mode else 'OFF'}")
-        if not continuous_mode:
-            last_results = None
-    elif key == ord('f'):
-        # Cycle through filters
-        if filter_mode is None:
-            filter_mode = 'Furniture'
-        elif filter_mode == 'Furniture':
-            filter_mode = 'Electronics'
-        elif filter_mode == 'Electronics':
-            filter_mode = 'Kitchen'
-        elif filter_mode == 'Kitchen':
-            filter_mode = 'Office/Decor'
-        elif filter_mode == 'Office/Decor':
-            filter_mode = 'Living'
+                        print_detections(detected_items)
+                elif not continuous_mode:
+                    print("\n❌ No items detected")
+            except Exception as e:
+                print(f"\n⚠️ Error: {str(e)}")
+
+        # Draw detections
+        overlay = engine.overlay()
+        if overlay:
+            draw_detections(display_frame, overlay)
+
+            # Show summary by category
+            category_counts = {}
+            for item in overlay:
+                category_counts[item['category']] = category_counts.get(item['category'], 0) + 1
+
+            summary_y = display_frame.shape[0] - 10
+            for cat, count in sorted(category_counts.items()):
+                color = hex_to_bgr(category_colors.get(cat, '#FFFFFF'))
+                cv2.putText(display_frame, f"{cat}: {count}", (10, summary_y),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+                summary_y -= 20
+
+        # Show controls
+        cv2.putText(display_frame, "c:continuous f:filter s:save q:quit",
+                    (10, display_frame.shape[0] - 120),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.4, (200, 200, 200), 1)
+
+        cv2.imshow('Object Detection', display_frame)
+
+        # Handle keys
+        if key == ord('q'):
+            break
+        elif key == ord('c'):
+            continuous_mode = not continuous_mode
+            print(f"\n{'🟢' if continuous_mode else '🔴'} Continuous: {'ON' if continuous_mode else 'OFF'}")
+            if continuous_mode:
+                engine.scheduler.reset()
+                engine.motion_gate.reset()
+            else:
+                engine.reset()
+        elif key == ord('f'):
+            filter_mode = FILTERS[(FILTERS.index(filter_mode) + 1) % len(FILTERS)]
+            engine.set_filter(filter_mode)
+            print(f"\n🔍 Filter: {filter_mode if filter_mode else 'OFF'}")
+        elif key == ord('s'):
+            filename = f"detection_{time.strftime('%H%M%S')}.jpg"
+            cv2.imwrite(filename, display_frame)
+            print(f"\n📸 Saved: {filename}")
+
+        # Both buffers can be refilled for the next frame
+        display_pool.release(display_frame)
+        source.recycle(frame)
+
+    cv2.destroyAllWindows()
+    log_objects(engine.objects.summary())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='SpotLight command-line detection')
+    env_sources = parse_source_specs(os.environ.get('SPOTLIGHT_SOURCES', ''))
+    parser.add_argument('--source', default=env_sources[0][1] if env_sources else '0',
+                        help='camera index, video file, image directory, URL or synthetic[:WxH][@fps] '
+                             '(default: the first of SPOTLIGHT_SOURCES, or 0)')
+    parser.add_argument('--fast', action='store_true', help='replay files as fast as possible instead of in real time')
+    parser.add_argument('--read-ahead', type=int, help='frames to decode ahead for file sources')
+    parser.add_argument('--headless', action='store_true',
+                        help='no window: detect every frame and write JSON lines (files replay as fast as possible)')
+    parser.add_argument('--realtime', action='store_true', help='headless: still replay files in real time')
+    parser.add_argument('-o', '--output', default='-', help="headless output file ('-' for stdout)")
+    parser.add_argument('--stride', type=int, default=1, help='headless: detect every Nth frame')
+    parser.add_argument('--max-frames', type=int, help='headless: stop after this many frames')
+    parser.add_argument('--backend', choices=BACKENDS, help='default: SPOTLIGHT_BACKEND or torch')
+    parser.add_argument('--model', help='weights or exported model (default: SPOTLIGHT_MODEL)')
+    parser.add_argument('--conf', type=float, default=0.4)
+    parser.add_argument('--category', choices=list(categories), help='only detect one category')
+    parser.add_argument('--tile', type=int, help='detect on overlapping tiles of this size (0: off)')
+    parser.add_argument('--roi', help="only detect inside these regions, 'x1,y1,x2,y2;...'")
+    args = parser.parse_args(argv)
+    if args.stride < 1:
+        parser.error('--stride must be at least 1')
+
+    backend_settings = {'tiling': tiling_settings(tiling_settings_from_env(), args.tile, args.roi)}
+    if args.backend:
+        backend_settings['name'] = args.backend
+    if args.model:
+        backend_settings['weights'] = args.model
+
+    log("Multi-Object Detection with YOLOv8")
+    log("=" * 40)
+    engine = DetectionEngine.from_settings(backend_settings, conf=args.conf, category=args.category)
+    log(f"\nDetecting {len(items_to_detect)} types of objects:")
+    for cat, items in categories.items():
+        log(f"  {cat}: {', '.join(items_to_detect[i] for i in items if i in items_to_detect)}")
+
+    source_options = source_options_from_env()
+    if args.fast or args.headless and not args.realtime:
+        source_options['realtime'] = False
+    if args.read_ahead is not None:
+        source_options['read_ahead'] = args.read_ahead
+    # Headless runs stop at the end of a file instead of looping it
+    source = open_source(args.source, loop=not args.headless, **source_options)
+    if not source.is_opened():
+        log(f"\nError: Cannot open source {args.source}")
+        return 1
+    log(f"\n✅ Source ready: {source.name}")
+
+    try:
+        if args.headless:
+            output = sys.stdout if args.output == '-' else open(args.output, 'w')
+            try:
+                run_headless(engine, source, output, args.stride, args.max_frames)
+            finally:
+                if output is not sys.stdout:
+                    output.close()
         else:
-            filter_mode = None
-        
-        print(f"\n🔍 Filter: {filter_mode if filter_mode else 'OFF'}")
-        last_results = None
-    elif key == ord('s'):
-        filename = f"detection_{time.strftime('%H%M%S')}.jpg"
-        cv2.imwrite(filename, display_frame)
-        print(f"\n📸 Saved: {filename}")
-
-cap.release()
-cv2.destroyAllWindows()
-print("\n✅ Done!")
\ No newline at end of file
+            run_interactive(engine, source)
+    finally:
+        source.release()
+    log("\n✅ Done!")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
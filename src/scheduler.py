@@ -0,0 +1,56 @@
+"""
+SpotLight Adaptive Scheduler
+Decides which frames go through the detector so output can hold a target FPS
+"""
+
+import math
+
+
+class AdaptiveScheduler:
+    """
+    Runs the detector every K frames, with K tuned from the measured
+    inference latency: K = ceil(latency * target_fps), so the average
+    detection cost per output frame stays within the frame budget.
+    """
+
+    def __init__(self, target_fps=30, max_interval=10, smoothing=0.2):
+        self.target_fps = target_fps
+        self.max_interval = max_interval
+        self.smoothing = smoothing
+        self.latency = None  # seconds, exponential moving average
+        self.frames_seen = 0
+        self.frames_detected = 0
+        self._last_index = None
+
+    @property
+    def interval(self):
+        if self.latency is None or self.target_fps <= 0:
+            return 1
+        return max(1, min(self.max_interval, math.ceil(self.latency * self.target_fps)))
+
+    def record(self, latency):
+        """Feed back how long an inference pass took, in seconds"""
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += self.smoothing * (latency - self.latency)
+
+    def due(self, frame_index):
+        """True if this frame should be sent to the detector"""
+        self.frames_seen += 1
+        if self._last_index is not None and frame_index - self._last_index < self.interval:
+            return False
+        self._last_index = frame_index
+        self.frames_detected += 1
+        return True
+
+    def reset(self):
+        self._last_index = None
+
+    def get_stats(self):
+        return {
+            'interval': self.interval,
+            'inference_ms': round(self.latency * 1000, 1) if self.latency is not None else None,
+            'target_fps': self.target_fps,
+            'detect_ratio': round(self.frames_detected / self.frames_seen, 3) if self.frames_seen else 0,
+        }
@@ -0,0 +1,412 @@
+"""
+SpotLight Frame Sources
+Webcams, video files/streams, image directories and synthetic frames behind
+one read() interface
+"""
+
+import glob
+import os
+import queue
+import re
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from buffers import FramePool
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+
+class FrameSource:
+    """
+    Interface shared by all sources: read() returns (success, frame) like
+    cv2.VideoCapture, read_encoded() may return the JPEG bytes of the frame
+    just read when the source already has them, release() frees the device.
+    File-backed sources play back at their frame rate when `realtime` is
+    true and as fast as they can decode otherwise; `waited` is how long the
+    last read() slept to keep that pace. Sources that can fill an
+    existing array read into buffers from their FramePool: the caller owns
+    each frame and hands it back with recycle() when done, after which the
+    source may overwrite it. Frames that are never recycled stay valid.
+    """
+
+    name = ''
+    realtime = False
+    pool = None
+    waited = 0.0
+
+    def is_opened(self):
+        return True
+
+    def read(self):
+        raise NotImplementedError
+
+    def read_encoded(self):
+        return None
+
+    def recycle(self, frame):
+        """Hand a frame from read() back for reuse"""
+        if self.pool is not None:
+            self.pool.release(frame)
+
+    def release(self):
+        pass
+
+
+class CameraSource(FrameSource):
+    """
+    USB webcam (device index) or network stream URL. A failed read is
+    retried up to `retries` times, reopening the device after a growing
+    pause (starting at `backoff` seconds), so a dropped frame or a short
+    network outage doesn't end the stream.
+    """
+
+    def __init__(self, device, width=640, height=480, fps=30, retries=5, backoff=0.1):
+        self.name = str(device)
+        self.device = device
+        self.settings = {cv2.CAP_PROP_FRAME_WIDTH: width, cv2.CAP_PROP_FRAME_HEIGHT: height, cv2.CAP_PROP_FPS: fps}
+        self.retries = retries
+        self.backoff = backoff
+        self.failed_reads = 0
+        self.capture = self._open()
+        self.pool = FramePool()
+
+    def _open(self):
+        capture = cv2.VideoCapture(self.device)
+        for prop, value in self.settings.items():
+            capture.set(prop, value)
+        return capture
+
+    def is_opened(self):
+        return self.capture.isOpened()
+
+    def read(self):
+        for attempt in range(self.retries + 1):
+            success, frame = self.pool.read(self.capture.read)
+            if success:
+                return success, frame
+            self.failed_reads += 1
+            if attempt < self.retries:
+                delay = min(self.backoff * 2 ** attempt, 2.0)
+                print(f"Camera {self.name}: read failed, reopening in {delay:g}s")
+                time.sleep(delay)
+                self.capture.release()
+                self.capture = self._open()
+        return False, None
+
+    def release(self):
+        self.capture.release()
+
+
+class VideoFileSource(FrameSource):
+    """Video file replayed at its native frame rate, optionally looping"""
+
+    def __init__(self, path, loop=True, fps=None, realtime=True):
+        self.name = path
+        self.loop = loop
+        self.realtime = realtime
+        self.capture = cv2.VideoCapture(path)
+        self.fps = fps or self.capture.get(cv2.CAP_PROP_FPS) or 30
+        self.pool = FramePool()
+        self._next_time = time.time()
+
+    def is_opened(self):
+        return self.capture.isOpened()
+
+    def read(self):
+        success, frame = self.pool.read(self.capture.read)
+        if not success and self.loop:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            success, frame = self.pool.read(self.capture.read)
+        _pace(self)
+        return success, frame
+
+    def release(self):
+        self.capture.release()
+
+
+class ImageDirectorySource(FrameSource):
+    """Images from a directory played back as a video, optionally looping"""
+
+    def __init__(self, path, loop=True, fps=30, realtime=True):
+        self.name = path
+        self.loop = loop
+        self.fps = fps
+        self.realtime = realtime
+        self.files = sorted(
+            f for f in glob.glob(os.path.join(path, '*'))
+            if f.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        self._index = 0
+        self._next_time = time.time()
+        self._encoded = None
+
+    def is_opened(self):
+        return bool(self.files)
+
+    def read(self):
+        if self._index >= len(self.files):
+            if not self.loop or not self.files:
+                return False, None
+            self._index = 0
+
+        path = self.files[self._index]
+        with open(path, 'rb') as f:
+            data = f.read()
+        frame = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        # JPEG files can be streamed to raw clients without re-encoding
+        self._encoded = data if path.lower().endswith(('.jpg', '.jpeg')) else None
+        self._index += 1
+        _pace(self)
+        return frame is not None, frame
+
+    def read_encoded(self):
+        """JPEG bytes of the last frame read, if the file already was one"""
+        return self._encoded
+
+    def release(self):
+        self.files = []
+
+
+class SyntheticSource(FrameSource):
+    """
+    Generated frames (a few coloured shapes drifting over a gradient) for
+    machines without a camera. The same seed always gives the same frames.
+    count limits the number of frames; by default it runs forever.
+    """
+
+    def __init__(self, width=640, height=480, fps=30, count=None, seed=0, realtime=True):
+        self.name = f"synthetic:{width}x{height}@{fps:g}"
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.count = count
+        self.realtime = realtime
+        self.pool = FramePool()
+        self._index = 0
+        self._next_time = time.time()
+
+        rng = np.random.default_rng(seed)
+        gradient = np.linspace(40, 200, width, dtype=np.float32)
+        self._background = np.repeat(gradient[None, :, None], height, axis=0).repeat(3, axis=2).astype(np.uint8)
+        self._shapes = [
+            {
+                'position': rng.uniform((0, 0), (width, height)),
+                'velocity': rng.uniform(-4, 4, 2),
+                'size': int(rng.integers(20, max(21, min(width, height) // 4))),
+                'color': tuple(int(c) for c in rng.integers(0, 256, 3)),
+                'circle': bool(rng.integers(0, 2)),
+            }
+            for _ in range(5)
+        ]
+
+    def read(self):
+        if self.count is not None and self._index >= self.count:
+            return False, None
+
+        frame = self.pool.copy(self._background)
+        for shape in self._shapes:
+            # Bounce off the edges so shapes stay in view
+            x, y = (shape['position'] + shape['velocity'] * self._index) % (2 * np.array([self.width, self.height]))
+            x = int(2 * self.width - x if x > self.width else x)
+            y = int(2 * self.height - y if y > self.height else y)
+            if shape['circle']:
+                cv2.circle(frame, (x, y), shape['size'] // 2, shape['color'], -1)
+            else:
+                cv2.rectangle(frame, (x - shape['size'] // 2, y - shape['size'] // 2),
+                              (x + shape['size'] // 2, y + shape['size'] // 2), shape['color'], -1)
+        cv2.putText(frame, str(self._index), (10, self.height - 10), cv2.FONT_HERSHEY_SIMPLEX,
+                    0.6, (255, 255, 255), 1)
+        self._index += 1
+        _pace(self)
+        return True, frame
+
+
+class ReadAheadSource(FrameSource):
+    """
+    Decodes up to `buffer_size` frames ahead of the consumer on a
+    background thread, so the pipeline never waits on file decoding. The
+    reader blocks when the buffer is full; no frames are dropped. If the
+    wrapped source raises, read() raises the same error once the frames
+    before it are used up, then reports the end of the stream.
+    """
+
+    def __init__(self, source, buffer_size=8):
+        self.source = source
+        self.name = source.name
+        self.realtime = source.realtime
+        self.fps = getattr(source, 'fps', None)
+        # Frames go back to the wrapped source's pool
+        self.pool = source.pool
+        if self.pool is not None:
+            # Frames waiting in the buffer are all in use
+            self.pool.max_buffers += buffer_size
+        self._buffer = queue.Queue(maxsize=buffer_size)
+        self._encoded = None
+        self._running = True
+        self._done = False
+        self._error = None
+        self._thread = threading.Thread(target=self._reader, name=f'spotlight-readahead-{source.name}', daemon=True)
+        self._thread.start()
+
+    def _reader(self):
+        try:
+            while self._running:
+                success, frame = self.source.read()
+                self._put((success, frame, self.source.read_encoded() if success else None))
+                if not success:
+                    break
+        except Exception as e:
+            # Hand the error to the consumer instead of leaving read() waiting
+            self._error = e
+            self._put((False, None, None))
+
+    def _put(self, item):
+        while self._running:
+            try:
+                self._buffer.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def is_opened(self):
+        return self.source.is_opened()
+
+    def read(self):
+        if self._done:
+            return False, None
+        start = time.perf_counter()
+        success, frame, self._encoded = self._buffer.get()
+        # Decoding happens on the reader; waiting for it in real time is pacing
+        self.waited = time.perf_counter() - start if self.realtime else 0.0
+        self._done = not success
+        if self._done and self._error is not None:
+            error, self._error = self._error, None
+            raise error
+        return success, frame
+
+    def read_encoded(self):
+        return self._encoded
+
+    @property
+    def buffered(self):
+        return self._buffer.qsize()
+
+    def release(self):
+        self._running = False
+        self._thread.join(timeout=1)
+        self.source.release()
+
+
+def _pace(source):
+    """Sleep so file-backed sources play back at source.fps (unless not realtime)"""
+    source.waited = 0.0
+    if not source.realtime or not source.fps:
+        return
+    source._next_time += 1.0 / source.fps
+    delay = source._next_time - time.time()
+    if delay > 0:
+        start = time.perf_counter()
+        time.sleep(delay)
+        source.waited = time.perf_counter() - start
+    else:
+        # Fell behind (slow decode); don't try to catch up in a burst
+        source._next_time = time.time()
+
+
+SYNTHETIC_SPEC = re.compile(r'^synthetic(?::(\d+)x(\d+))?(?:@([\d.]+))?$')
+
+
+def open_source(spec, realtime=True, read_ahead=0, loop=True, camera_size=None):
+    """
+    Open a frame source from a spec string: a device index ("0"), an image
+    directory, a video file / stream URL, or "synthetic[:WxH][@fps]".
+
+    loop=False stops files at their end instead of starting over;
+    realtime=False replays files and synthetic frames as fast as possible;
+    read_ahead > 0 decodes that many frames ahead on a background thread
+    (file-backed and synthetic sources only, live cameras are never buffered).
+    camera_size (width, height) is the resolution requested from webcams.
+    """
+    spec = str(spec)
+    synthetic = SYNTHETIC_SPEC.match(spec)
+    if spec.isdigit():
+        return CameraSource(int(spec), *(camera_size or (640, 480)))
+    if synthetic:
+        width, height, fps = synthetic.groups()
+        source = SyntheticSource(int(width or 640), int(height or 480), float(fps or 30), realtime=realtime)
+    elif os.path.isdir(spec):
+        source = ImageDirectorySource(spec, loop=loop, realtime=realtime)
+    elif '://' in spec:
+        return CameraSource(spec)
+    else:
+        source = VideoFileSource(spec, loop=loop, realtime=realtime)
+
+    if read_ahead > 0 and source.is_opened():
+        source = ReadAheadSource(source, read_ahead)
+    return source
+
+
+def source_options_from_env():
+    """
+    open_source() options from SPOTLIGHT_REPLAY (realtime/fast), SPOTLIGHT_READ_AHEAD
+    and SPOTLIGHT_CAMERA_SIZE (e.g. 1920x1080)
+    """
+    camera_size = os.environ.get('SPOTLIGHT_CAMERA_SIZE')
+    return {
+        'realtime': os.environ.get('SPOTLIGHT_REPLAY', 'realtime').lower() != 'fast',
+        'read_ahead': int(os.environ.get('SPOTLIGHT_READ_AHEAD', 0)),
+        'camera_size': tuple(int(v) for v in camera_size.lower().split('x')) if camera_size else None,
+    }
+
+
+def parse_source_specs(value):
+    """
+    Parse "0,lobby=rtsp://host/stream,/data/frames" into [(source_id, spec), ...].
+    Sources without an explicit id are named by their position.
+    """
+    specs = []
+    for i, item in enumerate(filter(None, (part.strip() for part in value.split(',')))):
+        source_id, sep, spec = item.partition('=')
+        if not sep or '/' in source_id or ':' in source_id:
+            source_id, spec = f"cam{i}", item
+        specs.append((source_id, spec))
+    return specs
+
+
+class SourceRegistry:
+    """Named frame sources shared by the capture pipeline"""
+
+    def __init__(self):
+        self._sources = {}
+
+    def add(self, source_id, spec, **options):
+        if source_id in self._sources:
+            raise ValueError(f"Duplicate source id: {source_id}")
+        source = open_source(spec, **options)
+        if not source.is_opened():
+            raise RuntimeError(f"Cannot open source '{source_id}' ({spec})")
+        self._sources[source_id] = source
+        return source
+
+    def get(self, source_id):
+        return self._sources.get(source_id)
+
+    def ids(self):
+        return list(self._sources)
+
+    def items(self):
+        return list(self._sources.items())
+
+    def release_all(self):
+        for source in self._sources.values():
+            source.release()
+        self._sources.clear()
+
+    def __contains__(self, source_id):
+        return source_id in self._sources
+
+    def __len__(self):
+        return len(self._sources)
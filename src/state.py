@@ -0,0 +1,86 @@
+"""
+SpotLight State
+Detection state shared by the pipeline threads and the request handlers
+"""
+
+import threading
+from collections import deque, namedtuple
+from types import MappingProxyType
+
+Snapshot = namedtuple('Snapshot', [
+    'version',            # bumped on every change
+    'detections',         # read-only {source id: tuple of detections}
+    'total_detections',   # unique objects when tracking, else every detection
+    'tracking',           # read-only {source id: ObjectTracker.summary()}
+    'history',            # tuple of the most recent history entries, oldest first
+    'detection_enabled',  # continuous mode, or a single detection still pending
+    'continuous_mode',
+    'pending',            # source ids still owed a single detection
+])
+
+
+class DetectionState:
+    """
+    Copy-on-write store for the live detection state.
+
+    Every change builds a new immutable Snapshot and publishes it with a
+    single attribute assignment, so readers just take `state.snapshot`
+    without locking and always see one consistent version, however many
+    of them there are. Writers serialize among themselves on a lock that
+    readers never touch. History is a fixed-size ring buffer; only its
+    (short) contents are copied into each snapshot.
+    """
+
+    def __init__(self, history=10):
+        self._history = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self.snapshot = Snapshot(0, MappingProxyType({}), 0, MappingProxyType({}), (), False, False, frozenset())
+
+    def _publish(self, **changes):
+        # Called with the lock held
+        self.snapshot = self.snapshot._replace(version=self.snapshot.version + 1, **changes)
+        return self.snapshot
+
+    def add_source(self, source_id):
+        with self._lock:
+            detections = dict(self.snapshot.detections)
+            detections.setdefault(source_id, ())
+            return self._publish(detections=MappingProxyType(detections))
+
+    def record_detections(self, source_id, detections, history_entry=None, tracking=None):
+        """Store a source's latest detections and tracker summary; returns the new snapshot"""
+        with self._lock:
+            current = self.snapshot
+            changes = {'detections': MappingProxyType({**current.detections, source_id: tuple(detections)})}
+            if tracking is not None:
+                changes['tracking'] = MappingProxyType({**current.tracking, source_id: tracking})
+                changes['total_detections'] = sum(s['unique_total'] for s in changes['tracking'].values())
+            else:
+                changes['total_detections'] = current.total_detections + len(detections)
+            if history_entry is not None:
+                self._history.append(history_entry)
+                changes['history'] = tuple(self._history)
+            return self._publish(**changes)
+
+    def request_detection(self):
+        """Arm a single detection on the next frame of every source"""
+        with self._lock:
+            return self._publish(detection_enabled=True, pending=frozenset(self.snapshot.detections))
+
+    def detection_wanted(self, source_id):
+        """True if this source's next frame should go to the detector"""
+        snapshot = self.snapshot
+        return snapshot.continuous_mode or source_id in snapshot.pending
+
+    def detection_done(self, source_id):
+        """A source had its detection; single mode disarms once every source has"""
+        with self._lock:
+            if source_id not in self.snapshot.pending:
+                return self.snapshot
+            pending = self.snapshot.pending - {source_id}
+            return self._publish(pending=pending, detection_enabled=self.snapshot.continuous_mode or bool(pending))
+
+    def toggle_continuous(self):
+        with self._lock:
+            enabled = not self.snapshot.continuous_mode
+            return self._publish(continuous_mode=enabled, detection_enabled=enabled, pending=frozenset())
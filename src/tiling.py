@@ -0,0 +1,177 @@
+"""
+SpotLight Tiling
+Overlapping-tile and region-of-interest inference for high-resolution frames
+"""
+
+import os
+import time
+
+import numpy as np
+
+
+def tile_windows(region, tile, overlap):
+    """
+    (x1, y1, x2, y2) windows of tile x tile pixels covering region,
+    neighbours overlapping by at least `overlap` of a tile. Windows are
+    spread evenly so the last one ends exactly on the region's edge.
+    """
+    def spans(lo, hi):
+        length = hi - lo
+        # Up to an overlap's worth over one tile isn't worth a second row
+        # of tiles; that window is just scaled down slightly
+        if length <= tile * (1 + overlap):
+            return [(lo, hi)]
+        count = int(np.ceil((length - tile) / (tile * (1 - overlap)))) + 1
+        return [(start, start + tile) for start in
+                (lo + round(i * (length - tile) / (count - 1)) for i in range(count))]
+
+    x1, y1, x2, y2 = region
+    return [(wx1, wy1, wx2, wy2) for wy1, wy2 in spans(y1, y2) for wx1, wx2 in spans(x1, x2)]
+
+
+def parse_rois(value):
+    """
+    "x1,y1,x2,y2;x1,y1,x2,y2" -> list of boxes. Values are pixels, or
+    fractions of the frame size if every value of a box is at most 1.
+    """
+    rois = []
+    for part in filter(None, (part.strip() for part in value.split(';'))):
+        box = [float(v) for v in part.split(',')]
+        if len(box) != 4 or box[0] >= box[2] or box[1] >= box[3]:
+            raise ValueError(f"ROI must be x1,y1,x2,y2 with x1 < x2 and y1 < y2: {part}")
+        rois.append(tuple(box))
+    return rois
+
+
+def resolve_rois(rois, width, height):
+    """ROIs in pixels, clipped to the frame; the whole frame if there are none"""
+    regions = []
+    for box in rois or [(0, 0, 1, 1)]:
+        if max(box) <= 1:
+            box = (box[0] * width, box[1] * height, box[2] * width, box[3] * height)
+        x1, y1 = max(0, int(box[0])), max(0, int(box[1]))
+        x2, y2 = min(width, int(round(box[2]))), min(height, int(round(box[3])))
+        if x2 > x1 and y2 > y1:
+            regions.append((x1, y1, x2, y2))
+    return regions
+
+
+def merge_detections(xyxy, conf, cls, threshold=0.6, max_det=300):
+    """
+    Class-aware greedy NMS across tiles. Overlap is measured as intersection
+    over the smaller box, so a box cut off at a tile edge is absorbed by the
+    complete box from the neighbouring tile even when their IoU is low.
+    """
+    order = np.argsort(-conf)
+    xyxy, conf, cls = xyxy[order], conf[order], cls[order]
+    areas = (xyxy[:, 2] - xyxy[:, 0]) * (xyxy[:, 3] - xyxy[:, 1])
+    suppressed = np.zeros(len(conf), dtype=bool)
+    keep = []
+    for i in range(len(conf)):
+        if suppressed[i]:
+            continue
+        keep.append(i)
+        if len(keep) == max_det:
+            break
+        rest = np.flatnonzero(~suppressed[i + 1:] & (cls[i + 1:] == cls[i])) + i + 1
+        if not len(rest):
+            continue
+        w = np.minimum(xyxy[rest, 2], xyxy[i, 2]) - np.maximum(xyxy[rest, 0], xyxy[i, 0])
+        h = np.minimum(xyxy[rest, 3], xyxy[i, 3]) - np.maximum(xyxy[rest, 1], xyxy[i, 1])
+        inter = np.clip(w, 0, None) * np.clip(h, 0, None)
+        smaller = np.minimum(areas[rest], areas[i])
+        suppressed[rest[inter > threshold * np.maximum(smaller, 1e-6)]] = True
+    return xyxy[keep], conf[keep], cls[keep]
+
+
+class TiledBackend:
+    """
+    Wraps any backend. Each frame is reduced to its static regions of
+    interest (the whole frame if none are set), every region is cut into
+    overlapping tile x tile windows, and the windows of all frames go
+    through the wrapped backend in one batched predict call, so small
+    objects are seen near native resolution instead of after downscaling.
+    Boxes are mapped back to frame pixels and merged across windows.
+
+    full_frame adds one downscaled pass over each region that needed more
+    than one window, for objects larger than a tile. tile=None skips tiling
+    and only crops to the ROIs.
+    """
+
+    def __init__(self, backend, tile=640, overlap=0.2, rois=None, full_frame=True, merge_threshold=0.6):
+        self.backend = backend
+        self.name = f"{backend.name}+tiles"
+        self.tile = tile
+        self.overlap = overlap
+        self.rois = rois
+        self.full_frame = full_frame
+        self.merge_threshold = merge_threshold
+        self.last_timings = {}
+        self._views = {}  # frame shape -> windows
+
+    def views(self, width, height):
+        """Crop windows for a frame size, computed once per size"""
+        views = self._views.get((width, height))
+        if views is None:
+            views = []
+            for region in resolve_rois(self.rois, width, height):
+                windows = tile_windows(region, self.tile, self.overlap) if self.tile else [region]
+                if self.full_frame and len(windows) > 1:
+                    windows.append(region)
+                views += windows
+            views = self._views[(width, height)] = views
+        return views
+
+    def predict(self, frames, config):
+        crops, owners = [], []
+        for i, frame in enumerate(frames):
+            for view in self.views(frame.shape[1], frame.shape[0]):
+                x1, y1, x2, y2 = view
+                crops.append(frame[y1:y2, x1:x2])
+                owners.append((i, view))
+        results = self.backend.predict(crops, config) if crops else []
+
+        start = time.perf_counter()
+        parts = [[] for _ in frames]
+        for (i, view), (xyxy, conf, cls) in zip(owners, results):
+            if len(conf):
+                parts[i].append((xyxy + np.float32([view[0], view[1], view[0], view[1]]), conf, cls))
+        merged = []
+        for frame_parts in parts:
+            if not frame_parts:
+                merged.append((np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, np.int32)))
+                continue
+            xyxy, conf, cls = (np.concatenate(arrays) for arrays in zip(*frame_parts))
+            merged.append(merge_detections(xyxy, conf, cls, self.merge_threshold, config.max_det))
+
+        timings = dict(getattr(self.backend, 'last_timings', {}))
+        timings['postprocess'] = timings.get('postprocess', 0) + time.perf_counter() - start
+        self.last_timings = timings
+        return merged
+
+
+def tiling_settings(settings=None, tile=None, rois=None):
+    """Tiling settings with a --tile size and/or --roi string applied on top"""
+    settings = dict(settings or {'tile': None, 'overlap': 0.2, 'rois': None})
+    if tile is not None:
+        settings['tile'] = tile or None
+    if rois:
+        settings['rois'] = parse_rois(rois)
+    return settings if settings['tile'] or settings['rois'] else None
+
+
+def tiling_settings_from_env():
+    """
+    TiledBackend settings from SPOTLIGHT_TILE (tile size in pixels),
+    SPOTLIGHT_TILE_OVERLAP and SPOTLIGHT_ROIS; None when neither tiling
+    nor ROIs are configured.
+    """
+    tile = os.environ.get('SPOTLIGHT_TILE', '').lower()
+    rois = parse_rois(os.environ.get('SPOTLIGHT_ROIS', ''))
+    if tile in ('', 'off', '0') and not rois:
+        return None
+    return {
+        'tile': int(tile) if tile not in ('', 'off', '0') else None,
+        'overlap': float(os.environ.get('SPOTLIGHT_TILE_OVERLAP', 0.2)),
+        'rois': rois or None,
+    }
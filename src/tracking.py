@@ -0,0 +1,190 @@
+"""
+SpotLight Tracking
+Persistent object IDs, and boxes carried forward between detector runs
+"""
+
+import threading
+
+import numpy as np
+
+
+def iou_matrix(a, b):
+    """Pairwise IoU between (N, 4) and (M, 4) xyxy box arrays"""
+    a = np.asarray(a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float32).reshape(-1, 4)
+    top_left = np.maximum(a[:, None, :2], b[None, :, :2])
+    bottom_right = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def greedy_match(iou, threshold):
+    """Match rows to columns by descending IoU; returns (row_indices, col_indices)"""
+    rows, cols = [], []
+    if iou.size == 0:
+        return np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64)
+
+    used_rows, used_cols = set(), set()
+    for flat in np.argsort(-iou, axis=None):
+        r, c = divmod(int(flat), iou.shape[1])
+        if iou[r, c] < threshold:
+            break
+        if r in used_rows or c in used_cols:
+            continue
+        used_rows.add(r)
+        used_cols.add(c)
+        rows.append(r)
+        cols.append(c)
+    return np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64)
+
+
+class ObjectTracker:
+    """
+    Persistent object IDs across detector runs, SORT/ByteTrack style.
+
+    Tracks move along a constant-velocity estimate (pixels per second, as
+    detector runs need not be evenly spaced); each update matches
+    them to the new detections by IoU (same class only) in two passes:
+    confident detections first, then the remaining tracks against the
+    low-confidence ones, which keep a partly hidden object alive but never
+    start a track. Tracks not matched for `max_lost` seconds are closed.
+    Track state is kept as arrays so an update is a handful of vectorized
+    operations however many objects are in view.
+
+    Every track is one real object, so summary() counts unique objects and
+    total dwell time per class instead of per-frame detections. Between
+    detector runs, predict() moves the last detections along their track's
+    velocity (for at most max_extrapolation seconds) so overlays stay
+    smooth while the detector only sees every K-th frame.
+    """
+
+    def __init__(self, iou_threshold=0.3, high_confidence=0.5, max_lost=2.0, smoothing=0.5,
+                 max_extrapolation=0.5):
+        self.iou_threshold = iou_threshold
+        self.high_confidence = high_confidence
+        self.max_lost = max_lost
+        self.smoothing = smoothing
+        self.max_extrapolation = max_extrapolation
+        self.unique = {}  # class name -> tracks ever started
+        self.dwell = {}   # class name -> seconds, closed tracks only
+        self._next_id = 1
+        # update() runs on the inference thread, predict() on the encode thread
+        self._lock = threading.Lock()
+        self._reset_tracks()
+
+    def _reset_tracks(self):
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._names = np.zeros(0, dtype=object)
+        self._boxes = np.zeros((0, 4), dtype=np.float32)
+        self._velocity = np.zeros((0, 4), dtype=np.float32)
+        self._first_seen = np.zeros(0, dtype=np.float64)
+        self._last_seen = np.zeros(0, dtype=np.float64)
+        self._last_update = None  # (now, detections) of the last update
+
+    def _close(self, closing):
+        for name, first, last in zip(self._names[closing], self._first_seen[closing], self._last_seen[closing]):
+            self.dwell[name] = self.dwell.get(name, 0.0) + last - first
+
+    def update(self, detections, now):
+        """
+        Match detections to tracks; returns the detections with a
+        'track_id' added (low-confidence ones that matched nothing get None).
+        now is in seconds (wall clock, or video time for file replays).
+        """
+        with self._lock:
+            return self._update(detections, now)
+
+    def _update(self, detections, now):
+        boxes = np.array([d['bbox'] for d in detections], dtype=np.float32).reshape(-1, 4)
+        names = np.array([d['name'] for d in detections], dtype=object)
+        confident = np.array([d['confidence'] for d in detections], dtype=np.float32) >= self.high_confidence
+        ids = np.full(len(detections), -1, dtype=np.int64)
+
+        elapsed = np.maximum(now - self._last_seen, 1e-3).astype(np.float32)[:, None]
+        iou = iou_matrix(self._boxes + self._velocity * elapsed, boxes)
+        iou[self._names[:, None] != names[None, :]] = 0
+
+        free = np.ones(len(self._ids), dtype=bool)
+        matched_tracks, matched_detections = [], []
+        for wanted in (confident, ~confident):
+            candidates, tracks = np.flatnonzero(wanted), np.flatnonzero(free)
+            rows, cols = greedy_match(iou[np.ix_(tracks, candidates)], self.iou_threshold)
+            free[tracks[rows]] = False
+            ids[candidates[cols]] = self._ids[tracks[rows]]
+            matched_tracks.append(tracks[rows])
+            matched_detections.append(candidates[cols])
+
+        t, d = np.concatenate(matched_tracks), np.concatenate(matched_detections)
+        measured = (boxes[d] - self._boxes[t]) / elapsed[t]
+        self._velocity[t] = self.smoothing * self._velocity[t] + (1 - self.smoothing) * measured
+        self._boxes[t] = boxes[d]
+        self._last_seen[t] = now
+
+        # Confident detections nobody claimed are new objects
+        new = np.flatnonzero(confident & (ids < 0))
+        if len(new):
+            ids[new] = np.arange(self._next_id, self._next_id + len(new))
+            self._next_id += len(new)
+            for name in names[new]:
+                self.unique[name] = self.unique.get(name, 0) + 1
+            self._ids = np.concatenate([self._ids, ids[new]])
+            self._names = np.concatenate([self._names, names[new]])
+            self._boxes = np.concatenate([self._boxes, boxes[new]])
+            self._velocity = np.concatenate([self._velocity, np.zeros((len(new), 4), np.float32)])
+            self._first_seen = np.concatenate([self._first_seen, np.full(len(new), now)])
+            self._last_seen = np.concatenate([self._last_seen, np.full(len(new), now)])
+
+        # Close tracks that have been gone too long
+        lost = now - self._last_seen > self.max_lost
+        if lost.any():
+            self._close(lost)
+            keep = ~lost
+            for attr in ('_ids', '_names', '_boxes', '_velocity', '_first_seen', '_last_seen'):
+                setattr(self, attr, getattr(self, attr)[keep])
+
+        tracked = [dict(det, track_id=int(track_id) if track_id >= 0 else None)
+                   for det, track_id in zip(detections, ids)]
+        self._last_update = (now, tracked)
+        return tracked
+
+    def predict(self, now):
+        """The last update's detections with boxes moved to where they should be at `now`"""
+        with self._lock:
+            if self._last_update is None:
+                return []
+            last_now, detections = self._last_update
+            elapsed = min(now - last_now, self.max_extrapolation)
+            if elapsed <= 0 or not self._velocity.any():
+                return detections
+            velocity = dict(zip(self._ids.tolist(), self._velocity.copy()))
+        moved = []
+        for item in detections:
+            track_velocity = velocity.get(item['track_id'])
+            if track_velocity is not None:
+                bbox = (np.asarray(item['bbox'], np.float32) + track_velocity * elapsed).astype(np.int32)
+                item = dict(item, bbox=bbox.tolist())
+            moved.append(item)
+        return moved
+
+    def summary(self):
+        """Per class: objects in view, unique objects so far and total dwell seconds"""
+        with self._lock:
+            names, first_seen, last_seen = self._names, self._first_seen, self._last_seen
+            active, dwell, unique = {}, dict(self.dwell), dict(self.unique)
+        for name, first, last in zip(names, first_seen, last_seen):
+            active[name] = active.get(name, 0) + 1
+            dwell[name] = dwell.get(name, 0.0) + last - first
+        return {
+            'active': active,
+            'unique': unique,
+            'dwell_seconds': {name: round(float(seconds), 1) for name, seconds in dwell.items()},
+            'unique_total': sum(self.unique.values()),
+        }
+
+    def clear(self):
+        """Forget the current tracks; counts and dwell times are kept"""
+        with self._lock:
+            self._close(np.ones(len(self._ids), dtype=bool))
+            self._reset_tracks()
@@ -1,228 +1,586 @@
-from flask import Flask, render_template, Response, jsonify
+from flask import Flask, render_template, Response, jsonify, request, abort, send_from_directory, url_for
+import atexit
 import cv2
-from ultralytics import YOLO
-import torch
+import numpy as np
+import os
 import json
 import threading
 import time
 from datetime import datetime
 
-app = Flask(__name__)
+from backends import backend_settings_from_env, create_backend
+from batch import VIDEO_EXTENSIONS, is_video, iter_frames
+from classes import class_table
+from detector import DetectorConfig
+from encoding import BOUNDARY, EncodeTier
+from eventlog import DetectionLog, parse_time
+from events import DetectionEvents
+from jobs import JobQueue
+from metrics import DETECTIONS, REGISTRY, STAGE_SECONDS
+from overlay import draw_detections
+from pipeline import DetectionPipeline
+from postprocess import build_detections
+from sources import IMAGE_EXTENSIONS, SourceRegistry, parse_source_specs, source_options_from_env
+from state import DetectionState
+from tracking import ObjectTracker
+from workers import InferencePool
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+UPLOAD_DIR = os.path.join(PROJECT_DIR, 'uploads')
+RESULTS_DIR = os.path.join(PROJECT_DIR, 'results')
+
+# Templates live at the project root, next to src/
+app = Flask(__name__, template_folder=os.path.join(PROJECT_DIR, 'templates'))
 
 # Global variables
-camera = None
-model = None
-detection_enabled = False
-continuous_mode = False
-filter_category = None
-last_detections = []
-stats = {
-    'total_detections': 0,
-    'detection_history': [],
-    'fps': 0
-}
-
-# Define items to detect (same as before)
-items_to_detect = {
-    # Furniture
-    56: 'chair', 57: 'couch', 59: 'bed', 60: 'dining table',
-    # Electronics
-    62: 'tv/monitor', 63: 'laptop', 64: 'mouse', 65: 'remote', 
-    66: 'keyboard', 67: 'cell phone',
-    # Kitchen items
-    46: 'banana', 47: 'apple', 49: 'orange', 43: 'knife',
-    44: 'spoon', 45: 'fork', 39: 'bottle', 41: 'cup',
-    40: 'wine glass', 42: 'bowl',
-    # Office/Room items
-    73: 'book', 74: 'clock', 75: 'vase', 76: 'scissors', 84: 'potted plant',
-    # Other
-    0: 'person', 15: 'cat', 16: 'dog', 26: 'handbag', 
-    27: 'suitcase', 28: 'backpack',
-}
-
-categories = {
-    'Furniture': [56, 57, 59, 60],
-    'Electronics': [62, 63, 64, 65, 66, 67],
-    'Kitchen': [39, 40, 41, 42, 43, 44, 45, 46, 47, 49],
-    'Office/Decor': [73, 74, 75, 76, 84],
-    'Living': [0, 15, 16, 26, 27, 28]
-}
-
-category_colors = {
-    'Furniture': '#4CAF50',      # Green
-    'Electronics': '#2196F3',     # Blue
-    'Kitchen': '#FFEB3B',         # Yellow
-    'Office/Decor': '#9C27B0',    # Purple
-    'Living': '#FF9800'           # Orange
-}
-
-def get_category(class_id):
-    for cat, items in categories.items():
-        if class_id in items:
-            return cat
-    return 'Other'
-
-def init_camera():
-    global camera
-    camera = cv2.VideoCapture(0)
-    camera.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-    camera.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-    camera.set(cv2.CAP_PROP_FPS, 30)
-
-def init_model():
-    global model
-    print("Loading YOLOv8 model...")
-    model = YOLO('yolov8m.pt')
-    print("Model loaded!")
-
-def generate_frames():
-    global camera, detection_enabled, continuous_mode, filter_category, last_detections, stats
-    
-    fps_time = time.time()
-    fps_counter = 0
-    
-    while True:
-        if camera is None:
-            continue
-            
-        success, frame = camera.read()
-        if not success:
-            break
-        
-        # Calculate FPS
-        fps_counter += 1
-        if time.time() - fps_time > 1:
-            stats['fps'] = fps_counter / (time.time() - fps_time)
-            fps_counter = 0
-            fps_time = time.time()
+sources = SourceRegistry()
+default_source = None
+backend = None
+model_ready = threading.Event()  # set once the model is loaded and warmed up
+model_lock = threading.Lock()  # live pipeline and upload jobs share one model
+pipeline = None
+upload_jobs = None
+# Written by the pipeline and the control routes, read by every request;
+# readers take state.snapshot and never lock
+state = DetectionState()
+events = DetectionEvents(state)
+detection_log = None  # every detection, persisted; see init_detection_log
+trackers = {}  # source id -> ObjectTracker, updated by the inference thread
+
+detector_config = DetectorConfig(class_table)
+
+# Seconds per startup phase, for the log, /health and /metrics
+startup = {'started': time.perf_counter(), 'phases': {}, 'model': None, 'error': None}
+
+def record_phase(phase, start):
+    startup['phases'][phase] = round(time.perf_counter() - start, 3)
+    print(f"⏱️  {phase}: {startup['phases'][phase]:.2f}s")
+
+def init_camera(source_specs=None, source_options=None):
+    """
+    Open every configured source and start the capture pipeline.
+    Sources come from the argument or SPOTLIGHT_SOURCES, e.g. "0,door=rtsp://...";
+    replay speed and read-ahead from source_options or SPOTLIGHT_REPLAY/SPOTLIGHT_READ_AHEAD.
+    """
+    global default_source, pipeline
+    start = time.perf_counter()
+    if source_specs is None:
+        source_specs = parse_source_specs(os.environ.get('SPOTLIGHT_SOURCES', '0'))
+    source_options = {**source_options_from_env(), **(source_options or {})}
+    
+    pipeline = DetectionPipeline(run_detection, draw_detections,
+                                 should_detect=lambda source_id: model_ready.is_set() and state.detection_wanted(source_id),
+                                 target_fps=float(os.environ.get('SPOTLIGHT_TARGET_FPS', 30)),
+                                 motion_threshold=float(os.environ.get('SPOTLIGHT_MOTION_THRESHOLD', 0.01)),
+                                 gate_motion=lambda: state.snapshot.continuous_mode)
+    for source_id, spec in source_specs:
+        source = sources.add(source_id, spec, **source_options)
+        # The stream draws this tracker's boxes, moved along between detector runs
+        trackers[source_id] = ObjectTracker()
+        pipeline.add_source(source_id, source.read, getattr(source, 'read_encoded', None), source.pool,
+                            trackers[source_id], read_wait=lambda source=source: source.waited)
+        state.add_source(source_id)
+        print(f"Source '{source_id}': {spec}")
+    
+    default_source = sources.ids()[0]
+    pipeline.start()
+    record_phase('sources', start)
+
+def init_detection_log(path=None):
+    """
+    Open the SQLite detection log behind /history. The path defaults to
+    SPOTLIGHT_HISTORY_DB or detections.db in the project directory;
+    "off" disables it.
+    """
+    global detection_log
+    path = path or os.environ.get('SPOTLIGHT_HISTORY_DB', os.path.join(PROJECT_DIR, 'detections.db'))
+    if path.lower() == 'off':
+        return
+    detection_log = DetectionLog(path)
+    print(f"Logging detections to {path}")
+
+def init_model(**settings):
+    """
+    Load the inference backend. Settings default to SPOTLIGHT_BACKEND
+    (torch/onnx/openvino), SPOTLIGHT_MODEL, SPOTLIGHT_THREADS and SPOTLIGHT_INT8.
+    With SPOTLIGHT_INFERENCE_WORKERS=N the model runs in N worker processes.
+    """
+    global backend, upload_jobs
+    settings = {**backend_settings_from_env(), **settings}
+    workers = int(os.environ.get('SPOTLIGHT_INFERENCE_WORKERS', 0))
+    startup['model'] = f"{settings['weights']} ({settings['name']})"
+    print(f"Loading {settings['weights']} with the {settings['name']} backend...")
+    start = time.perf_counter()
+    if workers > 0:
+        # The live batch has one frame per source and is split over at most
+        # that many workers, so split the cores between the workers that run
+        # at the same time, not between all of them (unless told otherwise)
+        busy = max(1, min(workers, len(sources.ids())))
+        settings['threads'] = settings['threads'] or max(1, (os.cpu_count() or 1) // busy)
+        backend = InferencePool(workers, settings, class_table, detector_config,
+                                slots=max(4, 2 * len(sources.ids())))
+        print(f"Inference in {workers} worker processes, {settings['threads']} threads each")
+    else:
+        backend = create_backend(imgsz=detector_config.imgsz, **settings)
+    record_phase('model_load', start)
+    
+    start = time.perf_counter()
+    warm_up()
+    record_phase('warmup', start)
+    
+    upload_jobs = JobQueue(process_upload, UPLOAD_DIR, RESULTS_DIR,
+                           workers=int(os.environ.get('SPOTLIGHT_UPLOAD_WORKERS', 1)),
+                           settings=detector_config.copy,
+                           cache_key=lambda config: json.dumps(config.to_dict(), sort_keys=True))
+    model_ready.set()
+    startup['phases']['ready'] = round(time.perf_counter() - startup['started'], 3)
+    print(f"✅ Model ready, {startup['phases']['ready']:.2f}s after start")
+
+def init_model_in_background(**settings):
+    """
+    Load the model on a daemon thread so the web server can start
+    accepting requests right away; /health reports when it is ready.
+    """
+    def load():
+        try:
+            init_model(**settings)
+        except Exception as e:
+            startup['error'] = str(e)
+            print(f"❌ Model failed to load: {e}")
+    
+    thread = threading.Thread(target=load, name='model-loader', daemon=True)
+    thread.start()
+    return thread
+
+def shutdown():
+    """
+    Stop capture and inference, release the cameras and read-ahead threads,
+    then write out the queued detection log rows. Called by the launchers
+    and at exit; safe to call more than once.
+    """
+    global detection_log
+    if pipeline is not None:
+        pipeline.stop()
+    # Only once the capture threads have stopped reading from them
+    sources.release_all()
+    if isinstance(backend, InferencePool):
+        backend.close()
+    if detection_log is not None:
+        detection_log.close()
+        detection_log = None
+
+atexit.register(shutdown)
+
+def warm_up():
+    """
+    One untimed inference so the first real detection doesn't pay for lazy
+    initialization (kernel selection, memory pools, ultralytics setup).
+    Uses a batch shaped like the live one: one frame per source.
+    """
+    streams = list(pipeline.streams.values()) if pipeline is not None else []
+    frames = [frame for frame in (stream.copy_latest() for stream in streams) if frame is not None]
+    if len(frames) < len(streams) or not frames:
+        frames = [np.zeros((480, 640, 3), dtype=np.uint8)] * max(1, len(streams))
+    with model_lock:
+        if isinstance(backend, InferencePool):
+            backend.warm_up(frames, detector_config)
+        else:
+            backend.predict(frames, detector_config)
+
+def detect_frames(frames, config=None):
+    # Whitelist, category filter and thresholds are applied inside the
+    # predict call, so NMS only ever sees the classes we care about
+    config = config or detector_config
+    with model_lock:
+        results = backend.predict(frames, config)
+        timings = backend.last_timings
+    
+    start = time.perf_counter()
+    detections = [build_detections(class_table, xyxy, conf, cls, config.conf, config.category)
+                  for xyxy, conf, cls in results]
+    for stage, seconds in timings.items():
+        if stage == 'postprocess':
+            seconds += time.perf_counter() - start
+        STAGE_SECONDS.observe(seconds, stage)
+    return detections
+
+def run_detection(frames, source_ids):
+    """Detect on one frame per source in a single batched model call"""
+    batch_detections = detect_frames(frames)
+    if len(batch_detections) != len(source_ids):
+        raise RuntimeError(f"The backend returned {len(batch_detections)} results for {len(source_ids)} frames")
+    now = time.time()
+    tracked = []
+    for source_id, detected_items in zip(source_ids, batch_detections):
+        # Persistent IDs, so an object standing still is counted once
+        tracker = trackers[source_id]
+        detected_items = tracker.update(detected_items, now)
+        tracked.append(detected_items)
+        for item in detected_items:
+            DETECTIONS.inc(1, item['name'])
         
-        # Run detection if enabled
-        if detection_enabled and (continuous_mode or detection_enabled):
-            try:
-                with torch.no_grad():
-                    results = model(frame, verbose=False)
-                
-                detected_items = []
-                
-                if len(results[0].boxes) > 0:
-                    for box in results[0].boxes:
-                        cls_id = int(box.cls[0])
-                        conf = float(box.conf[0])
-                        
-                        if cls_id in items_to_detect and conf > 0.4:
-                            category = get_category(cls_id)
-                            
-                            # Apply filter
-                            if filter_category and category != filter_category:
-                                continue
-                            
-                            x1, y1, x2, y2 = map(int, box.xyxy[0])
-                            
-                            detected_items.append({
-                                'name': items_to_detect[cls_id],
-                                'category': category,
-                                'confidence': round(conf, 2),
-                                'bbox': [x1, y1, x2, y2],
-                                'color': category_colors.get(category, '#FFFFFF')
-                            })
-                
-                last_detections = detected_items
-                
-                # Update stats
-                if detected_items:
-                    stats['total_detections'] += len(detected_items)
-                    stats['detection_history'].append({
-                        'timestamp': datetime.now().strftime('%H:%M:%S'),
-                        'count': len(detected_items),
-                        'items': [item['name'] for item in detected_items[:5]]  # First 5 items
-                    })
-                    # Keep only last 10 entries
-                    stats['detection_history'] = stats['detection_history'][-10:]
-                
-                # Draw on frame
-                for item in detected_items:
-                    x1, y1, x2, y2 = item['bbox']
-                    # Convert hex color to BGR
-                    color = tuple(int(item['color'][i:i+2], 16) for i in (5, 3, 1))
-                    
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-                    
-                    label = f"{item['name']}: {item['confidence']}"
-                    label_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 2)[0]
-                    cv2.rectangle(frame, (x1, y1-20), (x1+label_size[0], y1), color, -1)
-                    cv2.putText(frame, label, (x1, y1-5), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-                
-                # Reset single detection
-                if not continuous_mode:
-                    detection_enabled = False
-                    
-            except Exception as e:
-                print(f"Detection error: {e}")
+        entry = None
+        if detected_items:
+            entry = {
+                'timestamp': datetime.now().strftime('%H:%M:%S'),
+                'source': source_id,
+                'count': len(detected_items),
+                'items': [item['name'] for item in detected_items[:5]]  # First 5 items
+            }
+        snapshot = state.record_detections(source_id, detected_items, entry, tracker.summary())
+        if detection_log is not None:
+            detection_log.append(source_id, detected_items)
         
-        # Encode frame
-        ret, buffer = cv2.imencode('.jpg', frame)
-        frame = buffer.tobytes()
+        # Pushed to /events listeners only when the detection set changed
+        events.publish_detections(source_id, snapshot, entry)
         
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+        # A single detection is done for this source once it has had one;
+        # a frame queued before that is dropped so it isn't detected twice
+        state.detection_done(source_id)
+        if not state.detection_wanted(source_id) and pipeline is not None:
+            pipeline.streams[source_id].inference_queue.clear()
+    
+    return tracked
+
+def process_upload(path, result_stem, progress, config=None, batch_size=4):
+    """
+    Annotate an uploaded image or video; runs on an upload job worker with
+    the detector settings the job was submitted with.
+    """
+    counts = {}
+    frames_done = 0
+    
+    def annotate(frames):
+        for frame, detections in zip(frames, detect_frames(frames, config)):
+            draw_detections(frame, detections)
+            for item in detections:
+                counts[item['name']] = counts.get(item['name'], 0) + 1
+    
+    if not is_video(path):
+        frame = cv2.imread(path)
+        if frame is None:
+            raise ValueError("Could not read image")
+        annotate([frame])
+        result = result_stem + '.jpg'
+        # Written under another name first so a half-written file is never served
+        cv2.imwrite(result_stem + '_partial.jpg', frame)
+        os.replace(result_stem + '_partial.jpg', result)
+        return result, {'frames': 1, 'counts': counts}
+    
+    capture = cv2.VideoCapture(path)
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30
+    total = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    capture.release()
+    
+    result = result_stem + '.mp4'
+    partial = result_stem + '_partial.mp4'
+    writer = None
+    batch = []
+    try:
+        for index, frame in iter_frames(path):
+            if writer is None:
+                h, w = frame.shape[:2]
+                writer = cv2.VideoWriter(partial, cv2.VideoWriter_fourcc(*'mp4v'), fps, (w, h))
+            batch.append(frame)
+            if len(batch) == batch_size:
+                annotate(batch)
+                for annotated in batch:
+                    writer.write(annotated)
+                frames_done += len(batch)
+                progress(frames_done / total if total else 0)
+                batch = []
+        if batch:
+            annotate(batch)
+            for annotated in batch:
+                writer.write(annotated)
+            frames_done += len(batch)
+    except BaseException:
+        # Never leave a half-written video behind
+        if writer is not None:
+            writer.release()
+            writer = None
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    finally:
+        if writer is not None:
+            writer.release()
+    
+    if writer is None:
+        raise ValueError("Could not read video")
+    os.replace(partial, result)
+    return result, {'frames': frames_done, 'counts': counts}
+
+def job_status(job):
+    done = job['status'] == 'done'
+    return {
+        'success': job['status'] != 'error',
+        'job_id': job['job_id'],
+        'status': job['status'],
+        'progress': job['progress'],
+        'filename': job['filename'],
+        'cached': job['cached'],
+        'summary': job['summary'],
+        'error': job['error'],
+        'status_url': url_for('upload_status', job_id=job['job_id']),
+        'result_url': url_for('result_file', name=os.path.basename(job['result'])) if done else None,
+    }
+
+def stream_metrics(key):
+    """Per-source samples for /metrics, read from the pipeline stats at scrape time"""
+    if pipeline is None:
+        return []
+    samples = []
+    for source_id, stream in list(pipeline.streams.items()):
+        stream_stats = stream.get_stats()
+        if key == 'dropped':
+            skipped = sum(output['frames_skipped'] for output in stream_stats['outputs'].values())
+            samples += [((source_id, 'inference'), stream_stats['dropped']['inference']),
+                        ((source_id, 'encode'), stream_stats['dropped']['encode']),
+                        ((source_id, 'client'), skipped)]
+        else:
+            samples.append(((source_id,), stream_stats['clients']))
+    return samples
+
+REGISTRY.collector('spotlight_frames_dropped_total',
+                   'Frames dropped by a full queue (inference, encode) or a slow client',
+                   ('source', 'queue'), lambda: stream_metrics('dropped'), type='counter')
+REGISTRY.collector('spotlight_startup_seconds', 'Duration of each startup phase',
+                   ('phase',), lambda: [((phase,), seconds) for phase, seconds in startup['phases'].items()])
+REGISTRY.collector('spotlight_model_ready', '1 once the model is loaded and warmed up',
+                   (), lambda: [((), int(model_ready.is_set()))])
+REGISTRY.collector('spotlight_history_rows_total', 'Detections written to or dropped from the detection log',
+                   ('result',), lambda: [(('written',), detection_log.rows_written),
+                                         (('dropped',), detection_log.dropped)] if detection_log else [],
+                   type='counter')
+REGISTRY.collector('spotlight_objects_total', 'Unique tracked objects per source and class',
+                   ('source', 'class'), lambda: [((source_id, name), count)
+                                                 for source_id, summary in state.snapshot.tracking.items()
+                                                 for name, count in summary['unique'].items()],
+                   type='counter')
+REGISTRY.collector('spotlight_dwell_seconds_total', 'Seconds tracked objects have spent in view',
+                   ('source', 'class'), lambda: [((source_id, name), seconds)
+                                                 for source_id, summary in state.snapshot.tracking.items()
+                                                 for name, seconds in summary['dwell_seconds'].items()],
+                   type='counter')
+REGISTRY.collector('spotlight_stream_clients', 'Connected video stream clients',
+                   ('source',), lambda: stream_metrics('clients'))
+
+def current_fps():
+    stream = pipeline.streams.get(default_source) if pipeline is not None else None
+    return stream.get_stats()['encode_fps'] if stream is not None else 0
+
+def heartbeat():
+    """Sent on /events when no detections changed"""
+    return {'fps': round(current_fps()), 'ready': model_ready.is_set()}
+
+def resolve_source(source_id):
+    source_id = source_id or default_source
+    if pipeline is None or source_id not in pipeline.streams:
+        abort(404, description=f"Unknown source: {source_id}")
+    return source_id
+
+def generate_frames(source_id, raw=False, tier=None):
+    # Capture, inference and encoding run once on the pipeline threads and
+    # every client subscribes to the shared stream of ready-made parts
+    return pipeline.streams[source_id].frames(raw, tier)
 
 @app.route('/')
 def index():
-    return render_template('detection.html')
+    # 'client' streams frames without boxes and draws them in the browser
+    overlay = request.args.get('overlay', os.environ.get('SPOTLIGHT_OVERLAY', 'client'))
+    return render_template('detection.html', overlay=overlay)
 
 @app.route('/video_feed')
-def video_feed():
-    return Response(generate_frames(),
-                    mimetype='multipart/x-mixed-replace; boundary=frame')
+@app.route('/video_feed/<source_id>')
+def video_feed(source_id=None):
+    source_id = resolve_source(source_id)
+    raw = request.args.get('overlay') == 'client'
+    try:
+        tier = EncodeTier.from_args(request.args)
+    except ValueError:
+        abort(400, description="quality and width must be integers")
+    return Response(generate_frames(source_id, raw, tier),
+                    mimetype=f'multipart/x-mixed-replace; boundary={BOUNDARY}')
+
+def stopped_sources():
+    """Source id -> why its capture stopped, for sources that are no longer streaming"""
+    if pipeline is None or not pipeline.running:
+        return {}
+    return {source_id: stream.error for source_id, stream in list(pipeline.streams.items()) if not stream.running}
+
+@app.route('/sources')
+def list_sources():
+    return jsonify({
+        'default': default_source,
+        'sources': {source_id: source.name for source_id, source in sources.items()},
+        'stopped': stopped_sources(),
+    })
 
 @app.route('/detect', methods=['POST'])
 def detect():
-    global detection_enabled
-    detection_enabled = True
+    if not model_ready.is_set():
+        return jsonify({'error': 'Model is still loading'}), 503
+    state.request_detection()
     return jsonify({'status': 'detection_triggered'})
 
+def clear_detections():
+    """Drop the current boxes everywhere: drawn streams, state and /events clients"""
+    if pipeline is not None:
+        pipeline.clear_detections()
+    for source_id, tracker in trackers.items():
+        snapshot = state.record_detections(source_id, [], tracking=tracker.summary())
+        events.publish_detections(source_id, snapshot)
+
 @app.route('/toggle_continuous', methods=['POST'])
 def toggle_continuous():
-    global continuous_mode, detection_enabled
-    continuous_mode = not continuous_mode
-    detection_enabled = continuous_mode
+    continuous_mode = state.toggle_continuous().continuous_mode
+    if not continuous_mode:
+        clear_detections()
     return jsonify({'continuous': continuous_mode})
 
-@app.route('/set_filter/<category>', methods=['POST'])
+@app.route('/set_filter/<path:category>', methods=['POST'])
 def set_filter(category):
-    global filter_category
-    if category == 'all':
-        filter_category = None
+    try:
+        detector_config.update(category=category)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    clear_detections()
+    return jsonify({'filter': detector_config.category})
+
+@app.route('/config', methods=['GET', 'POST'])
+def config():
+    if request.method == 'POST':
+        try:
+            detector_config.update(**(request.get_json(silent=True) or {}))
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': str(e)}), 400
+    return jsonify(detector_config.to_dict())
+
+@app.route('/events')
+def detection_events():
+    """
+    Server-Sent Events: a snapshot, then a numbered message whenever a
+    source's detection set changes. Reconnecting browsers send
+    Last-Event-ID and get the missed messages, or a new snapshot.
+    """
+    last_id = request.headers.get('Last-Event-ID') or request.args.get('since', '')
+    last_seq = int(last_id) if last_id.isdigit() else None
+    stream = events.stream(last_seq, heartbeat=heartbeat, extra={'default': default_source})
+    return Response(stream, mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/health')
+def health():
+    """Readiness: 200 once the model is loaded and warmed up, 503 before"""
+    if startup['error']:
+        status = 'error'
     else:
-        filter_category = category
-    return jsonify({'filter': filter_category})
+        status = 'ready' if model_ready.is_set() else 'loading'
+    body = {'status': status, 'model': startup['model'], 'sources': sources.ids(),
+            'stopped': stopped_sources(), 'startup_seconds': startup['phases']}
+    if startup['error']:
+        body['error'] = startup['error']
+    return jsonify(body), 200 if status == 'ready' else 503
+
+@app.route('/metrics')
+def metrics():
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/history')
+def history():
+    """
+    Logged detections, oldest first: /history?from=&to=&class=&source=&limit=
+    from/to are unix seconds or ISO 8601 times; to is exclusive.
+    """
+    if detection_log is None:
+        return jsonify({'error': 'Detection log is disabled'}), 404
+    args = request.args
+    try:
+        start = parse_time(args['from']) if args.get('from') else None
+        end = parse_time(args['to']) if args.get('to') else None
+        limit = int(args.get('limit', 1000))
+    except ValueError:
+        return jsonify({'error': 'from/to must be unix seconds or ISO 8601, limit an integer'}), 400
+    if limit <= 0:
+        return jsonify({'error': 'limit must be positive'}), 400
+    
+    detections = detection_log.query(start, end, args.get('class'), args.get('source'), limit)
+    return jsonify({
+        'from': start,
+        'to': end,
+        'class': args.get('class'),
+        'count': len(detections),
+        'detections': detections,
+    })
 
 @app.route('/get_detections')
-def get_detections():
-    global last_detections, stats
+@app.route('/get_detections/<source_id>')
+def get_detections(source_id=None):
+    source_id = resolve_source(source_id)
+    # One snapshot for the whole response, so counts and history agree
+    snapshot = state.snapshot
+    detections = snapshot.detections.get(source_id, ())
     
     # Count by category
     category_counts = {}
-    for item in last_detections:
+    for item in detections:
         cat = item['category']
         category_counts[cat] = category_counts.get(cat, 0) + 1
     
     return jsonify({
-        'detections': last_detections,
+        'source': source_id,
+        'detections': detections,
         'category_counts': category_counts,
-        'stats': stats,
+        'stats': {
+            'total_detections': snapshot.total_detections,
+            'tracking': snapshot.tracking.get(source_id),
+            'detection_history': snapshot.history,
+            'fps': current_fps(),
+            'pipeline': pipeline.get_stats(),
+        },
         'timestamp': datetime.now().strftime('%H:%M:%S')
     })
 
+@app.route('/upload', methods=['GET', 'POST'])
+def upload():
+    if request.method == 'GET':
+        return render_template('index.html')
+    if upload_jobs is None:
+        return jsonify({'success': False, 'error': 'Model is still loading'}), 503
+    
+    file = request.files.get('file')
+    if file is None or not file.filename:
+        return jsonify({'success': False, 'error': 'No file uploaded'}), 400
+    if not file.filename.lower().endswith(IMAGE_EXTENSIONS + VIDEO_EXTENSIONS):
+        return jsonify({'success': False, 'error': f"Unsupported file type: {file.filename}"}), 400
+    
+    # Only the copy to disk happens here; detection runs on the job workers
+    job = upload_jobs.submit(file.stream, file.filename)
+    return jsonify(job_status(job)), 200 if job['status'] == 'done' else 202
+
+@app.route('/jobs/<job_id>')
+def upload_status(job_id):
+    job = upload_jobs.get(job_id) if upload_jobs is not None else None
+    if job is None:
+        abort(404, description=f"Unknown job: {job_id}")
+    return jsonify(job_status(job))
+
+@app.route('/results/<path:name>')
+def result_file(name):
+    # Streamed from disk in chunks, with Range support for video seeking
+    return send_from_directory(RESULTS_DIR, name, conditional=True)
+
 @app.route('/save_screenshot', methods=['POST'])
 def save_screenshot():
-    if camera is None:
+    if pipeline is None:
         return jsonify({'error': 'Camera not initialized'}), 400
+    source_id = resolve_source(request.args.get('source'))
     
-    success, frame = camera.read()
-    if success:
-        filename = f"screenshot_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg"
+    # The capture thread owns the camera, so grab its most recent frame
+    frame = pipeline.streams[source_id].copy_latest()
+    if frame is not None:
+        filename = f"screenshot_{source_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg"
         cv2.imwrite(filename, frame)
         return jsonify({'filename': filename})
     
@@ -230,8 +588,9 @@ def save_screenshot():
 
 if __name__ == '__main__':
     print("Initializing camera and model...")
+    init_detection_log()
     init_camera()
-    init_model()
+    init_model_in_background()
     print("Starting web server...")
     print("Open http://localhost:8080 in your browser")
     app.run(debug=False, threaded=True, port=8080)
\ No newline at end of file
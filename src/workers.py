@@ -0,0 +1,318 @@
+"""
+SpotLight Inference Workers
+A pool of model processes fed through shared-memory frame ring buffers
+"""
+
+import atexit
+import itertools
+import multiprocessing
+import signal
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import connection, shared_memory
+
+import numpy as np
+
+DEFAULT_SLOT_BYTES = 1920 * 1080 * 3  # one 1080p BGR frame
+DISPATCH = ('least-loaded', 'round-robin')
+POLL_SECONDS = 0.5  # how often the collector checks that workers are alive
+
+
+def _config_values(config):
+    return {key: getattr(config, key) for key in config.FIELDS}
+
+
+def _worker_main(index, shm_name, slot_bytes, requests, results, backend_settings, class_table, config_values):
+    # Ctrl+C reaches the whole process group; the parent closes the pool
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Model libraries are only imported in the workers
+    from backends import create_backend
+    from detector import DetectorConfig
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        config = DetectorConfig(class_table, **config_values)
+        backend = create_backend(imgsz=config.imgsz, **backend_settings)
+    except Exception as e:
+        results.send((None, index, None, None, f"{type(e).__name__}: {e}"))
+        shm.close()
+        return
+    results.send((None, index, None, None, None))
+
+    while True:
+        message = requests.get()
+        if message is None:
+            break
+        job_id, items, values = message
+        try:
+            if values != config_values:
+                config.update(**values)
+                config_values = values
+            # Frames are read in place from this worker's ring buffer
+            frames = [frame if frame is not None else
+                      np.ndarray(shape, np.uint8, buffer=shm.buf, offset=slot * slot_bytes)
+                      for slot, shape, frame in items]
+            output = backend.predict(frames, config)
+            del frames
+            results.send((job_id, index, output, backend.last_timings, None))
+        except Exception as e:
+            results.send((job_id, index, None, None, f"{type(e).__name__}: {e}"))
+    try:
+        shm.close()
+    except BufferError:
+        pass  # the model still holds a view of the last batch; the OS cleans up
+
+
+class _Worker:
+    def __init__(self, index, context, slots, slot_bytes, args):
+        self.index = index
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.shm = shared_memory.SharedMemory(create=True, size=slots * slot_bytes)
+        self.requests = context.Queue()
+        # A pipe of its own: a worker killed mid-write can't block the others' results
+        self.results, results = context.Pipe(duplex=False)
+        self.in_flight = 0  # frames submitted and not yet returned
+        self.ready = False  # model loaded; set by the startup handshake
+        self.dead = False
+        # Slots are handed out in ring order and come back in the same
+        # order, because a worker answers its jobs one by one
+        self.free = threading.Semaphore(slots)
+        self.head = 0
+        self.lock = threading.Lock()
+        self.process = context.Process(target=_worker_main, name=f"inference-{index}", daemon=True,
+                                       args=(index, self.shm.name, slot_bytes, self.requests, results) + args)
+        self.process.start()
+        results.close()
+
+    def write(self, frames):
+        """Copy frames into the next free slots; oversized frames travel pickled"""
+        items = []
+        for frame in frames:
+            self.free.acquire()
+            slot = self.head
+            self.head = (self.head + 1) % self.slots
+            if frame.nbytes <= self.slot_bytes and frame.dtype == np.uint8:
+                np.ndarray(frame.shape, np.uint8, buffer=self.shm.buf, offset=slot * self.slot_bytes)[...] = frame
+                items.append((slot, frame.shape, None))
+            else:
+                items.append((slot, frame.shape, frame))
+        return items
+
+
+class InferencePool:
+    """
+    N processes, each holding its own model, so inference runs outside this
+    process's GIL and PyTorch thread pool. Every worker owns a
+    shared-memory ring buffer of `slots` frame-sized slots: frames are
+    copied into it and only (slot, shape) goes through the request queue,
+    and workers answer over their own pipe with the (xyxy, conf, cls)
+    arrays per frame.
+
+    submit() sends one batch to one worker, picked round-robin or by the
+    fewest frames in flight, and returns a Future. predict() has the
+    backend interface: it splits the batch over the workers, waits for all
+    parts and sends the current DetectorConfig along, so setting changes
+    reach every worker.
+
+    A worker process that dies fails its pending Futures and is started
+    again; until its model is loaded it gets no work. Waits are bounded:
+    startup_timeout for loading the models, timeout for each result.
+    """
+
+    def __init__(self, workers, backend_settings, class_table, config, slots=4,
+                 slot_bytes=DEFAULT_SLOT_BYTES, dispatch='least-loaded', timeout=60, startup_timeout=300):
+        if dispatch not in DISPATCH:
+            raise ValueError(f"Unknown dispatch '{dispatch}', choose from {', '.join(DISPATCH)}")
+        self.name = f"{backend_settings.get('name', 'torch')} x{workers} processes"
+        self.dispatch = dispatch
+        self.config = config
+        self.timeout = timeout
+        self.startup_timeout = startup_timeout
+        self.restarts = 0
+        self.last_timings = {}
+        self.closed = False
+        self._jobs = {}  # job id -> (future, worker, frame count)
+        self._ids = itertools.count()
+        self._next = itertools.count()
+        self._lock = threading.Lock()
+        self._retired = []  # dead workers, their shared memory is freed on close()
+
+        self._context = multiprocessing.get_context('spawn')
+        self._slots = slots
+        self._slot_bytes = slot_bytes
+        self._args = (backend_settings, class_table, _config_values(config))
+        self.workers = [self._start_worker(i) for i in range(workers)]
+        atexit.register(self.close)
+
+        # Wait for every model to load before taking work
+        deadline = time.monotonic() + startup_timeout
+        while not all(worker.ready for worker in self.workers):
+            dead = [worker for worker in self.workers if not worker.process.is_alive()]
+            if dead:
+                self.close()
+                raise RuntimeError(f"Inference worker {dead[0].index} exited with code {dead[0].process.exitcode}")
+            if time.monotonic() > deadline:
+                self.close()
+                raise RuntimeError(f"Inference workers did not load the model within {startup_timeout}s")
+            for worker, message in self._receive([worker for worker in self.workers if not worker.ready]):
+                error = message[4]
+                if error is not None:
+                    self.close()
+                    raise RuntimeError(f"Inference worker {worker.index} failed to start: {error}")
+                worker.ready = True
+        self._collector = threading.Thread(target=self._collect, name='inference-results', daemon=True)
+        self._collector.start()
+
+    def _start_worker(self, index):
+        return _Worker(index, self._context, self._slots, self._slot_bytes, self._args)
+
+    def _receive(self, workers):
+        """(worker, message) for every message waiting within POLL_SECONDS"""
+        by_pipe = {worker.results: worker for worker in workers}
+        messages = []
+        for pipe in connection.wait(list(by_pipe), timeout=POLL_SECONDS):
+            try:
+                messages.append((by_pipe[pipe], pipe.recv()))
+            except (EOFError, OSError):
+                pass  # the worker exited; _check_workers deals with it
+        return messages
+
+    def _pick(self):
+        # Called with the lock held
+        ready = [worker for worker in self.workers if worker.ready and not worker.dead]
+        if not ready:
+            raise RuntimeError("No inference worker is running")
+        if self.dispatch == 'round-robin':
+            return ready[next(self._next) % len(ready)]
+        return min(ready, key=lambda worker: worker.in_flight)
+
+    def submit(self, frames, config=None, worker=None):
+        """Detect on frames in one worker; Future of [(xyxy, conf, cls), ...]"""
+        future = Future()
+        job_id = next(self._ids)
+        with self._lock:
+            if self.closed:
+                raise RuntimeError("Inference pool is closed")
+            worker = worker or self._pick()
+            if len(frames) > worker.slots:
+                raise ValueError(f"Batch of {len(frames)} frames exceeds the {worker.slots}-slot ring buffer")
+            worker.in_flight += len(frames)
+            self._jobs[job_id] = (future, worker, len(frames))
+        # Slots and requests in the same order; may wait for free slots.
+        # If the worker dies meanwhile, the collector fails this job.
+        with worker.lock:
+            items = worker.write(frames)
+            worker.requests.put((job_id, items, _config_values(config or self.config)))
+        return future
+
+    def _finish(self, job_id, output=None, timings=None, error=None):
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+            if job is None:
+                return  # already failed because its worker died
+            future, worker, count = job
+            worker.in_flight -= count
+        for _ in range(count):
+            worker.free.release()
+        if error is not None:
+            future.set_exception(RuntimeError(error))
+        else:
+            future.timings = timings
+            future.set_result(output)
+
+    def _check_workers(self):
+        """Fail the jobs of dead workers and start replacements"""
+        with self._lock:
+            for worker in list(self.workers):
+                if worker.dead or worker.process.is_alive():
+                    continue
+                worker.dead = True
+                self._retired.append(worker)
+                worker.results.close()
+                print(f"Inference worker {worker.index} exited with code {worker.process.exitcode}, restarting")
+                # A worker that never loaded its model won't do better next time
+                if worker.ready:
+                    self.workers[worker.index] = self._start_worker(worker.index)
+                    self.restarts += 1
+            orphaned = [(job_id, job[1]) for job_id, job in self._jobs.items() if job[1].dead]
+        for job_id, worker in orphaned:
+            self._finish(job_id, error=f"Inference worker {worker.index} died")
+
+    def _collect(self):
+        while not self.closed:
+            with self._lock:
+                workers = [worker for worker in self.workers if not worker.dead]
+            for worker, (job_id, index, output, timings, error) in self._receive(workers):
+                if job_id is None:
+                    # Startup handshake of a restarted worker
+                    if error is None:
+                        worker.ready = True
+                    else:
+                        print(f"Inference worker {index} failed to restart: {error}")
+                else:
+                    self._finish(job_id, output, timings, error)
+            self._check_workers()
+
+    def predict(self, frames, config):
+        """Backend interface: the batch is split over the workers and run in parallel"""
+        with self._lock:
+            if self.closed:
+                raise RuntimeError("Inference pool is closed")
+            running = sum(worker.ready and not worker.dead for worker in self.workers)
+        parts = min(len(frames), max(running, 1))
+        bounds = np.linspace(0, len(frames), parts + 1).astype(int)
+        futures = [self.submit(frames[start:end], config) for start, end in zip(bounds[:-1], bounds[1:])]
+        results, timings = [], {}
+        for future in futures:
+            results += future.result(timeout=self.timeout)
+            for stage, seconds in future.timings.items():
+                # Parts run side by side, so the slowest one sets the pace
+                timings[stage] = max(timings.get(stage, 0), seconds)
+        self.last_timings = timings
+        return results
+
+    def warm_up(self, frames, config):
+        """Run frames once on every worker"""
+        futures = [self.submit(frames[:worker.slots], config, worker) for worker in self.workers]
+        for future in futures:
+            future.result(timeout=self.timeout)
+
+    def get_stats(self):
+        stats = {f"worker{worker.index}": {'in_flight': worker.in_flight, 'alive': worker.process.is_alive(),
+                                           'ready': worker.ready}
+                 for worker in self.workers}
+        stats['restarts'] = self.restarts
+        return stats
+
+    def close(self):
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            workers, self.workers = self.workers, []
+            pending, self._jobs = list(self._jobs.values()), {}
+        for future, _, _ in pending:
+            future.set_exception(RuntimeError("Inference pool is closed"))
+        # Stop reading before the pipes are closed under the collector
+        if getattr(self, '_collector', None) is not None:
+            self._collector.join(timeout=2 * POLL_SECONDS)
+            self._collector = None
+        for worker in workers:
+            if worker.process.is_alive():
+                worker.requests.put(None)
+        for worker in workers + self._retired:
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.terminate()
+            worker.results.close()
+            worker.shm.close()
+            worker.shm.unlink()
+        self._retired = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Modules are imported by name from src/, as the launchers do
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
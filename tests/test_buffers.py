@@ -0,0 +1,109 @@
+"""
+FramePool ownership: buffers come back only when every holder has released them
+"""
+
+import threading
+import time
+
+import numpy as np
+
+from buffers import FramePool
+from pipeline import SourceStream
+from sources import ReadAheadSource, SyntheticSource
+
+SHAPE = (48, 64, 3)
+
+
+def reader(pool, success=True):
+    """A cv2.VideoCapture.read stand-in that fills the buffer it is given"""
+    def read(image=None):
+        if not success:
+            return False, None
+        frame = image if image is not None else np.empty(SHAPE, np.uint8)
+        frame[...] = 7
+        return True, frame
+    return read
+
+
+def test_buffer_is_reused_after_the_last_holder_releases_it():
+    pool = FramePool(2)
+    success, frame = pool.read(reader(pool))
+    # Capture hands the frame to inference and to the encoder
+    pool.retain(frame)
+    pool.release(frame)  # inference done
+    assert pool.get_stats()['in_use'] == 1
+    assert pool.acquire(SHAPE) is None  # the encoder still holds it
+
+    pool.release(frame)  # encoder done
+    assert pool.get_stats() == {'buffers': 1, 'in_use': 0, 'allocated': 1, 'reused': 0}
+    assert pool.read(reader(pool))[1] is frame
+    assert pool.get_stats()['reused'] == 1
+
+
+def test_failed_read_hands_the_buffer_back():
+    pool = FramePool(2)
+    frame = pool.read(reader(pool))[1]
+    pool.release(frame)
+    assert pool.read(reader(pool, success=False)) == (False, None)
+    assert pool.get_stats()['in_use'] == 0
+    assert pool.acquire(SHAPE) is frame
+
+
+def test_frames_the_pool_did_not_hand_out_are_ignored():
+    pool = FramePool(2)
+    foreign = np.zeros(SHAPE, np.uint8)
+    assert pool.retain(foreign) is foreign
+    pool.release(foreign)
+    pool.release(None)
+    assert pool.get_stats() == {'buffers': 0, 'in_use': 0, 'allocated': 0, 'reused': 0}
+    assert pool.acquire(SHAPE) is None
+
+
+def test_full_pool_stops_tracking_new_frames():
+    pool = FramePool(1)
+    first = pool.read(reader(pool))[1]
+    second = pool.read(reader(pool))[1]  # first is still held: a fresh array, untracked
+    pool.release(second)
+    pool.release(first)
+    assert pool.get_stats()['buffers'] == 1
+    assert pool.acquire(SHAPE) is first
+
+
+def test_read_ahead_makes_room_for_its_buffered_frames():
+    source = SyntheticSource(64, 48, realtime=False, count=30)
+    before = source.pool.max_buffers
+    read_ahead = ReadAheadSource(source, buffer_size=4)
+    assert read_ahead.pool is source.pool
+    assert source.pool.max_buffers == before + 4
+    time.sleep(0.2)  # let the reader fill its buffer
+    for _ in range(30):
+        success, frame = read_ahead.read()
+        assert success
+        read_ahead.recycle(frame)
+    # Frames were recycled, so the reader never outgrew the pool
+    stats = source.pool.get_stats()
+    assert stats['buffers'] <= source.pool.max_buffers
+    assert stats['reused'] > 0
+    read_ahead.release()
+
+
+def test_stream_releases_every_captured_frame():
+    source = SyntheticSource(64, 48, realtime=False, count=200)
+    stream = SourceStream('cam0', source.read, lambda image, detections: None, lambda: True,
+                          threading.Event(), frame_pool=source.pool)
+    client = stream.broadcaster().subscribe()
+    stream.start()
+    try:
+        # Inference takes a frame now and then, and hands it back when done
+        for _ in range(20):
+            item = stream.inference_queue.get(timeout=1)
+            if item is not None:
+                source.pool.release(item[1])
+            client.get(timeout=1)
+    finally:
+        stream.stop()
+    stream.inference_queue.clear()
+    stream.encode_queue.clear()
+    # Only latest_frame is still held, by the stream
+    assert source.pool.get_stats()['in_use'] == 1
+    assert source.pool.get_stats()['reused'] > 0
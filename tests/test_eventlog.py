@@ -0,0 +1,25 @@
+"""
+DetectionLog: rows written in the background and queried by time, class and source
+"""
+
+from eventlog import DetectionLog
+
+
+def detection(name, category='Kitchen'):
+    return {'name': name, 'category': category, 'confidence': 0.9, 'bbox': [1, 2, 3, 4]}
+
+
+def test_query_filters(tmp_path):
+    log = DetectionLog(str(tmp_path / 'detections.db'), flush_interval=0.05)
+    log.append('door', [detection('cup'), detection('person', 'Living')], timestamp=100)
+    log.append('desk', [detection('cup')], timestamp=200)
+    log.append('door', [], timestamp=300)  # nothing to write
+    log.close()
+
+    assert log.rows_written == 3
+    assert len(log.query()) == 3
+    assert [row['name'] for row in log.query(class_name='cup')] == ['cup', 'cup']
+    assert [row['source'] for row in log.query(source='desk')] == ['desk']
+    assert [row['timestamp'] for row in log.query(start=150)] == [200]
+    assert len(log.query(end=200)) == 2
+    assert len(log.query(limit=1)) == 1
@@ -0,0 +1,52 @@
+"""
+DetectionEvents: per-client cursors into the backlog, and snapshots from the detection state
+"""
+
+from events import DetectionEvents
+from state import DetectionState
+
+
+def detection(x):
+    return {'name': 'cup', 'confidence': 0.5, 'bbox': [x, 0, x + 10, 10]}
+
+
+def make_events(backlog=3):
+    state = DetectionState()
+    state.add_source('a')
+    events = DetectionEvents(state, backlog=backlog)
+
+    def publish(detections, entry=None):
+        return events.publish_detections('a', state.record_detections('a', detections, entry), entry)
+    return events, publish
+
+
+def test_unchanged_detections_are_not_published():
+    events, publish = make_events()
+    assert publish([detection(1)]) == 1
+    assert publish([detection(1)]) is None
+    assert publish([]) == 2
+
+
+def test_cursor_reads_only_missed_messages():
+    events, publish = make_events()
+    publish([detection(1)])
+    publish([detection(2)])
+    text, cursor = events.read(1)
+    assert cursor == 2
+    assert text.startswith('id: 2\nevent: detections\n')
+    assert '"bbox":[2,0,12,10]' in text
+    assert events.read(2) == ('', 2)
+
+
+def test_cursor_out_of_backlog_gets_a_snapshot():
+    events, publish = make_events(backlog=2)
+    for x in range(5):
+        publish([detection(x)], {'count': x})
+    text, cursor = events.read(1, extra={'default': 'a'})
+    assert cursor == 5
+    assert text.startswith('id: 5\nevent: snapshot\n')
+    assert '"a":[{"name":"cup","confidence":0.5,"bbox":[4,0,14,10]}]' in text
+    assert '"default":"a"' in text
+    # A new client (no cursor) and one from the future also start from a snapshot
+    assert 'event: snapshot' in events.read(None)[0]
+    assert 'event: snapshot' in events.read(99)[0]
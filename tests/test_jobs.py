@@ -0,0 +1,96 @@
+"""
+JobQueue: uploads run with the settings they were submitted with, and cached results keep their summary
+"""
+
+import io
+import os
+import threading
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+import pytest
+
+import webapp
+from jobs import JobQueue
+
+
+def wait(job):
+    for _ in range(200):
+        if job['status'] in ('done', 'error'):
+            return job
+        threading.Event().wait(0.01)
+    raise AssertionError(f"job still {job['status']}")
+
+
+@pytest.fixture
+def uploads(tmp_path):
+    settings = {'conf': 0.4}
+    gate = threading.Event()
+    gate.set()
+    calls = []
+
+    def process(path, result_stem, progress, snapshot):
+        gate.wait(5)
+        calls.append(dict(snapshot))
+        result = result_stem + '.txt'
+        with open(result, 'w') as f:
+            f.write(str(snapshot['conf']))
+        return result, {'conf': snapshot['conf']}
+
+    jobs = JobQueue(process, str(tmp_path / 'uploads'), str(tmp_path / 'results'),
+                    settings=lambda: dict(settings), cache_key=lambda snapshot: str(snapshot['conf']))
+    return SimpleNamespace(jobs=jobs, settings=settings, gate=gate, calls=calls)
+
+
+def test_job_runs_with_the_settings_it_was_submitted_with(uploads):
+    uploads.gate.clear()
+    job = uploads.jobs.submit(io.BytesIO(b'clip'), 'clip.mp4')
+    # Changed while the job is still queued
+    uploads.settings['conf'] = 0.8
+    uploads.gate.set()
+    wait(job)
+    assert uploads.calls == [{'conf': 0.4}]
+    with open(job['result']) as f:
+        assert f.read() == '0.4'
+
+    # The new settings are a different cache entry, the old ones still hit
+    fresh = wait(uploads.jobs.submit(io.BytesIO(b'clip'), 'clip.mp4'))
+    assert not fresh['cached'] and fresh['summary'] == {'conf': 0.8}
+    uploads.settings['conf'] = 0.4
+    cached = uploads.jobs.submit(io.BytesIO(b'clip'), 'clip.mp4')
+    assert cached['cached'] and cached['result'] == job['result']
+
+
+def test_cached_result_keeps_its_summary(uploads, tmp_path):
+    first = wait(uploads.jobs.submit(io.BytesIO(b'clip'), 'clip.mp4'))
+    # A new queue over the same directory, as after a restart
+    restarted = JobQueue(None, str(tmp_path / 'uploads'), str(tmp_path / 'results'),
+                         settings=lambda: {'conf': 0.4}, cache_key=lambda snapshot: str(snapshot['conf']))
+    cached = restarted.submit(io.BytesIO(b'clip'), 'clip.mp4')
+    assert cached['status'] == 'done' and cached['cached']
+    assert cached['summary'] == first['summary'] == {'conf': 0.4}
+    assert len(uploads.calls) == 1
+
+
+def test_failed_video_leaves_no_partial_file(tmp_path, monkeypatch):
+    path = str(tmp_path / 'clip.avi')
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 10, (64, 48))
+    for _ in range(12):
+        writer.write(np.zeros((48, 64, 3), np.uint8))
+    writer.release()
+
+    calls = []
+
+    def detect_frames(frames, config=None):
+        calls.append(len(frames))
+        if len(calls) == 2:
+            raise RuntimeError('backend went away')
+        return [[] for _ in frames]
+
+    monkeypatch.setattr(webapp, 'detect_frames', detect_frames)
+    stem = str(tmp_path / 'result')
+    with pytest.raises(RuntimeError):
+        webapp.process_upload(path, stem, lambda fraction: None)
+    assert not os.path.exists(stem + '_partial.mp4')
+    assert not os.path.exists(stem + '.mp4')
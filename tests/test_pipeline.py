@@ -0,0 +1,185 @@
+"""
+Pipeline building blocks: drop-oldest queues, per-client fan-out and the per-source threads
+"""
+
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from encoding import PART_HEADER, EncodeTier
+from metrics import CAPTURE_ERRORS, STAGE_SECONDS
+from pipeline import FrameBroadcaster, LatestFrameQueue, SourceStream
+from sources import SyntheticSource
+
+
+def test_queue_drops_the_oldest_entry():
+    dropped = []
+    queue = LatestFrameQueue(2, on_drop=dropped.append)
+    for i in range(5):
+        queue.put(i)
+    assert len(queue) == 2
+    assert queue.dropped == 3
+    assert dropped == [0, 1, 2]
+    assert [queue.get(timeout=0), queue.get(timeout=0)] == [3, 4]
+    assert queue.get(timeout=0) is None
+
+
+def test_queue_clear_hands_back_every_entry():
+    dropped = []
+    queue = LatestFrameQueue(3, on_drop=dropped.append)
+    queue.put('a')
+    queue.put('b')
+    queue.clear()
+    assert dropped == ['a', 'b']
+    assert len(queue) == 0
+    # Clearing is not dropping: the counter is for frames nobody got to
+    assert queue.dropped == 0
+
+
+def test_queue_get_waits_for_a_put():
+    queue = LatestFrameQueue()
+    threading.Timer(0.05, queue.put, ('late',)).start()
+    assert queue.get(timeout=2) == 'late'
+
+
+def test_broadcaster_gives_every_subscriber_every_frame():
+    broadcaster = FrameBroadcaster(queue_size=4)
+    first, second = broadcaster.subscribe(), broadcaster.subscribe()
+    for data in (b'1', b'2'):
+        broadcaster.publish(data)
+    assert [first.get(timeout=0), first.get(timeout=0)] == [b'1', b'2']
+    assert [second.get(timeout=0), second.get(timeout=0)] == [b'1', b'2']
+    assert broadcaster.get_stats() == {'clients': 2, 'frames_published': 2, 'frames_skipped': 0}
+
+
+def test_slow_subscriber_only_skips_frames_for_itself():
+    broadcaster = FrameBroadcaster(queue_size=1)
+    slow, fast = broadcaster.subscribe(), broadcaster.subscribe()
+    for i in range(3):
+        broadcaster.publish(i)
+        assert fast.get(timeout=0) == i
+    assert slow.get(timeout=0) == 2
+    broadcaster.unsubscribe(slow)
+    # Frames skipped by a client that left still count
+    assert broadcaster.get_stats()['frames_skipped'] == 2
+    assert broadcaster.client_count == 1
+
+
+def test_relay_subscriber_counts_as_its_clients():
+    class Relay:
+        clients = 5
+        dropped = 0
+
+        def put(self, data):
+            pass
+
+    broadcaster = FrameBroadcaster()
+    broadcaster.subscribe(Relay())
+    broadcaster.subscribe()
+    assert broadcaster.client_count == 6
+
+
+def make_stream(**options):
+    frame = np.zeros((240, 320, 3), np.uint8)
+
+    def read_frame():
+        time.sleep(0.005)
+        return True, frame.copy()
+
+    def draw(image, detections):
+        cv2.rectangle(image, (0, 0), (10, 10), (255, 255, 255), -1)
+
+    return SourceStream('cam0', read_frame, draw, lambda: True, threading.Event(), **options)
+
+
+def test_one_broadcaster_per_overlay_and_tier():
+    stream = make_stream()
+    assert stream.broadcaster() is stream.broadcaster(False, EncodeTier())
+    assert stream.broadcaster(True) is not stream.broadcaster(False)
+    assert stream.broadcaster(tier=EncodeTier(60)) is stream.broadcaster(tier=EncodeTier(61))
+    assert stream.broadcaster(tier=EncodeTier(60)) is not stream.broadcaster(tier=EncodeTier(60, 320))
+
+
+def test_stream_encodes_each_tier_for_its_clients():
+    stream = make_stream()
+    full = stream.broadcaster().subscribe()
+    small = stream.broadcaster(True, EncodeTier(50, 160)).subscribe()
+    stream.start()
+    try:
+        full_part, small_part = full.get(timeout=5), small.get(timeout=5)
+    finally:
+        stream.stop()
+    for part, width in ((full_part, 320), (small_part, 160)):
+        assert part.startswith(PART_HEADER)
+        image = cv2.imdecode(np.frombuffer(part[len(PART_HEADER):-2], np.uint8), cv2.IMREAD_COLOR)
+        assert image.shape[1] == width
+    assert stream.get_stats()['clients'] == 2
+
+
+def test_detected_frames_reach_the_inference_queue():
+    stream = make_stream()
+    stream.start()
+    try:
+        assert stream.frame_ready.wait(timeout=5)
+        frame_index, frame = stream.inference_queue.get(timeout=1)
+    finally:
+        stream.stop()
+    assert frame_index >= 1
+    assert frame.shape == (240, 320, 3)
+
+
+def test_stop_joins_the_threads():
+    stream = make_stream()
+    stream.start()
+    threads = list(stream._threads)
+    assert all(thread.is_alive() for thread in threads)
+    stream.stop()
+    assert not stream.running
+    assert not any(thread.is_alive() for thread in threads)
+
+
+def test_capture_latency_leaves_out_pacing():
+    source = SyntheticSource(64, 48, fps=40, count=20)
+    stream = SourceStream('paced', source.read, lambda image, detections: None, lambda: False,
+                          threading.Event(), read_wait=lambda: source.waited)
+    before = {name: value for name, labels, extra, value in STAGE_SECONDS.samples() if labels == ('capture',)}
+    stream.start()
+    for _ in range(200):
+        if not stream.running:
+            break
+        time.sleep(0.05)
+    stream.stop()
+    after = {name: value for name, labels, extra, value in STAGE_SECONDS.samples() if labels == ('capture',)}
+    count = after['spotlight_stage_seconds_count'] - before.get('spotlight_stage_seconds_count', 0)
+    total = after['spotlight_stage_seconds_sum'] - before.get('spotlight_stage_seconds_sum', 0)
+    # 20 frames at 40 fps take 0.5 s of wall time, nearly all of it sleeping
+    # (the first read on a new thread pays for OpenCV's setup)
+    assert count == 21
+    assert total < 0.25
+
+
+def test_capture_error_stops_the_stream_and_its_clients():
+    reads = []
+
+    def read_frame():
+        reads.append(1)
+        if len(reads) > 3:
+            raise IOError('device unplugged')
+        time.sleep(0.005)
+        return True, np.zeros((240, 320, 3), np.uint8)
+
+    stream = SourceStream('flaky', read_frame, lambda image, detections: None, lambda: False, threading.Event())
+    errors = dict(((name, labels), value) for name, labels, extra, value in CAPTURE_ERRORS.samples())
+    clients = stream.frames(raw=True)
+    stream.start()
+    # The client's stream ends instead of waiting for frames forever
+    parts = list(clients)
+    stream.stop()
+    assert len(parts) <= 3
+    assert not stream.running
+    assert stream.get_stats()['error'] == 'Capture error: device unplugged'
+    after = dict(((name, labels), value) for name, labels, extra, value in CAPTURE_ERRORS.samples())
+    key = ('spotlight_capture_errors_total', ('flaky',))
+    assert after[key] - errors.get(key, 0) == 1
@@ -0,0 +1,71 @@
+"""
+Frame sources: camera retries, and read-ahead errors reaching the reader
+"""
+
+import numpy as np
+import pytest
+
+from sources import CameraSource, FrameSource, ReadAheadSource
+
+
+class FakeCapture:
+    def __init__(self, results):
+        self.results = results
+        self.released = False
+
+    def isOpened(self):
+        return True
+
+    def read(self, image=None):
+        return self.results.pop(0) if self.results else (False, None)
+
+    def release(self):
+        self.released = True
+
+
+def camera(monkeypatch, captures, retries=3):
+    monkeypatch.setattr(CameraSource, '_open', lambda self: captures.pop(0))
+    monkeypatch.setattr('time.sleep', lambda seconds: None)
+    return CameraSource(0, retries=retries)
+
+
+def test_camera_reopens_after_a_failed_read(monkeypatch):
+    frame = np.zeros((4, 4, 3), np.uint8)
+    first = FakeCapture([(True, frame), (False, None)])
+    second = FakeCapture([(True, frame)])
+    source = camera(monkeypatch, [first, second])
+    assert source.read()[0]
+    assert source.read()[0]
+    assert first.released
+    assert source.failed_reads == 1
+
+
+def test_camera_gives_up_after_its_retries(monkeypatch):
+    captures = [FakeCapture([]) for _ in range(4)]
+    source = camera(monkeypatch, list(captures), retries=3)
+    assert source.read() == (False, None)
+    assert source.failed_reads == 4
+    assert all(capture.released for capture in captures[:3])
+
+
+class Failing(FrameSource):
+    name = 'failing'
+
+    def __init__(self, frames):
+        self.frames = frames
+
+    def read(self):
+        if not self.frames:
+            raise IOError('decoder died')
+        return True, self.frames.pop(0)
+
+
+def test_read_ahead_raises_the_reader_error_after_buffered_frames():
+    source = ReadAheadSource(Failing([np.zeros((4, 4, 3), np.uint8)] * 2))
+    assert source.read()[0]
+    assert source.read()[0]
+    with pytest.raises(IOError):
+        source.read()
+    # Then it is simply over, rather than blocking
+    assert source.read() == (False, None)
+    source.release()
@@ -0,0 +1,83 @@
+"""
+ObjectTracker: each real object is counted once however many frames it is seen in
+"""
+
+from tracking import ObjectTracker
+
+
+def detection(name, bbox, confidence=0.9):
+    return {'name': name, 'confidence': confidence, 'bbox': bbox}
+
+
+def test_static_object_is_counted_once():
+    tracker = ObjectTracker()
+    ids = {tracker.update([detection('cup', [10, 10, 50, 50])], now=t / 10)[0]['track_id'] for t in range(30)}
+    assert ids == {1}
+    summary = tracker.summary()
+    assert summary['unique'] == {'cup': 1}
+    assert summary['unique_total'] == 1
+    assert summary['active'] == {'cup': 1}
+    assert summary['dwell_seconds']['cup'] == 2.9
+
+
+def test_moving_object_keeps_its_id():
+    tracker = ObjectTracker()
+    ids = set()
+    for t in range(20):
+        x = 10 + 8 * t
+        ids.add(tracker.update([detection('person', [x, 20, x + 40, 120])], now=t / 10)[0]['track_id'])
+    assert ids == {1}
+    assert tracker.summary()['unique_total'] == 1
+
+
+def test_two_objects_and_classes_are_kept_apart():
+    tracker = ObjectTracker()
+    for t in range(5):
+        items = tracker.update([detection('cup', [10, 10, 50, 50]), detection('bottle', [12, 10, 52, 50]),
+                                detection('cup', [200, 10, 240, 50])], now=t / 10)
+    assert [item['track_id'] for item in items] == [1, 2, 3]
+    assert tracker.summary()['unique'] == {'cup': 2, 'bottle': 1}
+
+
+def test_low_confidence_continues_but_never_starts_a_track():
+    tracker = ObjectTracker()
+    assert tracker.update([detection('cup', [10, 10, 50, 50], 0.3)], now=0)[0]['track_id'] is None
+    assert tracker.update([detection('cup', [10, 10, 50, 50], 0.9)], now=0.1)[0]['track_id'] == 1
+    # Partly hidden: confidence drops, the object is still the same one
+    assert tracker.update([detection('cup', [10, 10, 50, 50], 0.3)], now=0.2)[0]['track_id'] == 1
+    assert tracker.summary()['unique_total'] == 1
+
+
+def test_object_gone_longer_than_max_lost_is_a_new_object():
+    tracker = ObjectTracker(max_lost=2.0)
+    tracker.update([detection('cup', [10, 10, 50, 50])], now=0)
+    tracker.update([], now=1.0)
+    assert tracker.update([detection('cup', [10, 10, 50, 50])], now=1.5)[0]['track_id'] == 1
+    tracker.update([], now=4.0)
+    assert tracker.update([detection('cup', [10, 10, 50, 50])], now=4.1)[0]['track_id'] == 2
+    summary = tracker.summary()
+    assert summary['unique'] == {'cup': 2}
+    assert summary['dwell_seconds']['cup'] == 1.5
+
+
+def test_clear_keeps_counts():
+    tracker = ObjectTracker()
+    tracker.update([detection('cup', [10, 10, 50, 50])], now=0)
+    tracker.update([detection('cup', [10, 10, 50, 50])], now=1)
+    tracker.clear()
+    summary = tracker.summary()
+    assert summary['active'] == {}
+    assert summary['unique_total'] == 1
+    assert summary['dwell_seconds'] == {'cup': 1.0}
+    assert tracker.predict(2) == []
+
+
+def test_predict_moves_boxes_along_their_track():
+    tracker = ObjectTracker(smoothing=0.0, max_extrapolation=0.5)
+    tracker.update([detection('car', [0, 0, 10, 10])], now=0)
+    tracker.update([detection('car', [5, 0, 15, 10])], now=1)  # 5 px/s to the right
+    assert tracker.predict(1)[0]['bbox'] == [5, 0, 15, 10]
+    assert tracker.predict(1.2)[0]['bbox'] == [6, 0, 16, 10]
+    # Not further than max_extrapolation seconds
+    assert tracker.predict(3)[0]['bbox'] == [7, 0, 17, 10]
+    assert tracker.predict(1.2)[0]['track_id'] == 1
@@ -0,0 +1,85 @@
+"""
+run_detection: routing one batched model call back to each source
+"""
+
+import numpy as np
+import pytest
+
+import webapp
+from state import DetectionState
+from tracking import ObjectTracker
+
+
+@pytest.fixture
+def app_state(monkeypatch):
+    state = DetectionState()
+    monkeypatch.setattr(webapp, 'state', state)
+    monkeypatch.setattr(webapp, 'events', webapp.DetectionEvents(state))
+    monkeypatch.setattr(webapp, 'detection_log', None)
+    monkeypatch.setattr(webapp, 'trackers', {})
+    for source_id in ('a', 'b'):
+        state.add_source(source_id)
+        webapp.trackers[source_id] = ObjectTracker()
+    return state
+
+
+def detection(name, x):
+    return {'name': name, 'confidence': 0.9, 'bbox': [x, 0, x + 20, 20]}
+
+
+def test_each_source_gets_its_own_tracked_detections(app_state, monkeypatch):
+    batch = [[detection('cup', 0)], [detection('dog', 50), detection('cat', 100)]]
+    monkeypatch.setattr(webapp, 'detect_frames', lambda frames: batch)
+    frames = [np.zeros((20, 20, 3), np.uint8)] * 2
+    results = webapp.run_detection(frames, ['a', 'b'])
+    assert [[item['name'] for item in items] for items in results] == [['cup'], ['dog', 'cat']]
+    assert all(item['track_id'] for items in results for item in items)
+    # The backend's lists are left as they were
+    assert 'track_id' not in batch[0][0]
+    snapshot = app_state.snapshot
+    assert [item['name'] for item in snapshot.detections['b']] == ['dog', 'cat']
+
+
+def test_short_batch_from_the_backend_is_an_error(app_state, monkeypatch):
+    monkeypatch.setattr(webapp, 'detect_frames', lambda frames: [[detection('cup', 0)]])
+    with pytest.raises(RuntimeError):
+        webapp.run_detection([np.zeros((20, 20, 3), np.uint8)] * 2, ['a', 'b'])
+    assert app_state.snapshot.detections['a'] == ()
+
+
+def test_single_detection_waits_for_every_source(app_state, monkeypatch):
+    monkeypatch.setattr(webapp, 'detect_frames', lambda frames: [[] for _ in frames])
+    frame = np.zeros((20, 20, 3), np.uint8)
+    app_state.request_detection()
+    # Source a's frame made it into a batch first; b's is still coming
+    webapp.run_detection([frame], ['a'])
+    assert not app_state.detection_wanted('a')
+    assert app_state.detection_wanted('b')
+    assert app_state.snapshot.detection_enabled
+    # A second batch for a alone doesn't disarm b
+    webapp.run_detection([frame], ['a'])
+    assert app_state.detection_wanted('b')
+    webapp.run_detection([frame], ['b'])
+    assert not app_state.snapshot.detection_enabled
+
+
+def test_continuous_mode_keeps_every_source_armed(app_state, monkeypatch):
+    monkeypatch.setattr(webapp, 'detect_frames', lambda frames: [[] for _ in frames])
+    app_state.toggle_continuous()
+    webapp.run_detection([np.zeros((20, 20, 3), np.uint8)] * 2, ['a', 'b'])
+    assert app_state.detection_wanted('a') and app_state.detection_wanted('b')
+    assert app_state.snapshot.detection_enabled
+
+
+def test_shutdown_releases_the_sources(monkeypatch):
+    from sources import SourceRegistry
+    registry = SourceRegistry()
+    source = registry.add('cam0', 'synthetic:160x120', realtime=False, read_ahead=2)
+    monkeypatch.setattr(webapp, 'sources', registry)
+    monkeypatch.setattr(webapp, 'pipeline', None)
+    monkeypatch.setattr(webapp, 'backend', None)
+    monkeypatch.setattr(webapp, 'detection_log', None)
+    webapp.shutdown()
+    assert len(registry) == 0
+    assert not source._thread.is_alive()
+    webapp.shutdown()
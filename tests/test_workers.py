@@ -0,0 +1,99 @@
+"""
+InferencePool: ring-slot accounting, and a dead worker failing its jobs and coming back
+"""
+
+import time
+
+import numpy as np
+import pytest
+
+onnx = pytest.importorskip('onnx')
+pytest.importorskip('onnxruntime')
+from onnx import TensorProto, helper
+
+from classes import class_table
+from detector import DetectorConfig
+from workers import InferencePool
+
+IMGSZ = 64
+
+
+@pytest.fixture(scope='module')
+def model(tmp_path_factory):
+    """A YOLOv8-shaped graph: (N, 3, 64, 64) in, (N, 84, 64) out, one box per anchor"""
+    bias = np.zeros(84, np.float32)
+    bias[:5] = [32, 32, 16, 16, 0.9]  # cx, cy, w, h, score of class 0
+    graph = helper.make_graph(
+        [helper.make_node('Conv', ['images', 'weight', 'bias'], ['grid'], kernel_shape=[8, 8], strides=[8, 8]),
+         helper.make_node('Reshape', ['grid', 'shape'], ['output0'])],
+        'fake-yolo',
+        [helper.make_tensor_value_info('images', TensorProto.FLOAT, ['N', 3, IMGSZ, IMGSZ])],
+        [helper.make_tensor_value_info('output0', TensorProto.FLOAT, ['N', 84, 64])],
+        [helper.make_tensor('weight', TensorProto.FLOAT, [84, 3, 8, 8], np.zeros(84 * 3 * 64, np.float32)),
+         helper.make_tensor('bias', TensorProto.FLOAT, [84], bias),
+         helper.make_tensor('shape', TensorProto.INT64, [3], [0, 84, -1])])
+    path = tmp_path_factory.mktemp('model') / 'fake.onnx'
+    onnx.save(helper.make_model(graph, opset_imports=[helper.make_opsetid('', 13)], ir_version=8), str(path))
+    return str(path)
+
+
+@pytest.fixture
+def config():
+    return DetectorConfig(class_table, imgsz=IMGSZ)
+
+
+def make_pool(model, config, **options):
+    return InferencePool(1, {'name': 'onnx', 'weights': model, 'threads': 1}, class_table, config,
+                         timeout=30, **options)
+
+
+def frames(count, size=48):
+    return [np.full((size, size, 3), i, np.uint8) for i in range(count)]
+
+
+def test_slots_come_back_after_every_batch(model, config):
+    with make_pool(model, config, slots=3, slot_bytes=48 * 48 * 3) as pool:
+        worker = pool.workers[0]
+        # More frames in total than slots: slots are reused in ring order
+        for count in (3, 2, 3, 1):
+            results = pool.predict(frames(count), config)
+            assert len(results) == count
+            assert all(len(conf) == 1 for _, conf, _ in results)
+        assert worker.head == (3 + 2 + 3 + 1) % 3
+        assert worker.in_flight == 0
+        assert worker.free._value == 3
+
+        # Too big for a slot: sent pickled, still takes (and returns) a slot
+        assert len(pool.predict(frames(2, size=64), config)) == 2
+        assert worker.free._value == 3
+
+        with pytest.raises(ValueError):
+            pool.submit(frames(4), config)
+        assert worker.in_flight == 0
+
+
+def test_dead_worker_fails_its_jobs_and_is_restarted(model, config):
+    with make_pool(model, config, slots=2) as pool:
+        worker = pool.workers[0]
+        worker.process.kill()
+        worker.process.join()
+        future = pool.submit(frames(2), config, worker)
+        with pytest.raises(RuntimeError, match='died'):
+            future.result(timeout=10)
+        # The failed job handed its slots back
+        assert worker.free._value == 2
+
+        deadline = time.monotonic() + 60
+        while not (pool.workers[0] is not worker and pool.workers[0].ready):
+            assert time.monotonic() < deadline, 'worker was not restarted'
+            time.sleep(0.1)
+        assert pool.restarts == 1
+        assert len(pool.predict(frames(2), config)) == 2
+
+
+def test_closed_pool_refuses_work(model, config):
+    pool = make_pool(model, config)
+    pool.close()
+    with pytest.raises(RuntimeError, match='closed'):
+        pool.predict(frames(1), config)
+    pool.close()